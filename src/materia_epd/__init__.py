@@ -1 +1,14 @@
 # src/materia/__init__.py
+from __future__ import annotations
+
+__all__ = ["ProcessResult", "compute"]
+
+
+def __getattr__(name: str):
+    # Imported on first use, so that importing a submodule such as
+    # materia_epd.resources does not load the whole pipeline stack.
+    if name in __all__:
+        from materia_epd.epd import pipeline
+
+        return getattr(pipeline, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,13 +1,292 @@
 # materia/cli.py
 import click
 from pathlib import Path
-from materia_epd.epd.pipeline import run_materia
+from materia_epd.core.constants import (
+    FLOW_CACHE_SIZE,
+    ICONS,
+    MARKET_CACHE_SIZE,
+    SERVE_HOST,
+    SERVE_PORT,
+    WATCH_INTERVAL,
+)
+from materia_epd.epd.extract import FLOW_CACHE
+from materia_epd.epd.filters import FILTER_STATS
+from materia_epd.epd.index import EPDIndex, default_index_path
+from materia_epd.epd.pipeline import recompute_materia, run_materia
+from materia_epd.epd.watch import Watcher
+from materia_epd.geo.bundle import write_geo_bundle
+from materia_epd.resources import MARKET_CACHE
+from materia_epd.server import MateriaService, serve
 
 
-@click.command()
+workers_option = click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of processes used to parse EPD files.",
+)
+market_cache_option = click.option(
+    "--market-cache-size",
+    type=click.IntRange(min=0),
+    default=MARKET_CACHE_SIZE,
+    show_default=True,
+    help="Number of market-share tables kept in memory.",
+)
+jobs_option = click.option(
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of processes aggregating generic processes in parallel.",
+)
+index_path_option = click.option(
+    "--index-path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="Index built with 'index build --index-path' to read the EPDs from.",
+)
+
+
+class DefaultGroup(click.Group):
+    """Command group that runs ``default_cmd`` when no subcommand is given."""
+
+    default_cmd = "run"
+
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands and args[0] not in ("--help", "-h"):
+            args = [self.default_cmd, *args]
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=DefaultGroup)
+def main():
+    """Generic EPD Aggregator."""
+
+
+@main.command("run")
 @click.argument("input_path", type=click.Path(exists=True, path_type=Path))
 @click.argument("epd_folder_path", type=click.Path(exists=True, path_type=Path))
 @click.option("--output_path", "-o", type=click.Path(path_type=Path), required=False)
-def main(input_path: Path, epd_folder_path: Path, output_path: Path | None):
+@click.option(
+    "--flow-cache-size",
+    type=click.IntRange(min=0),
+    default=FLOW_CACHE_SIZE,
+    show_default=True,
+    help="Number of parsed reference flows kept in memory.",
+)
+@market_cache_option
+@workers_option
+@jobs_option
+@index_path_option
+@click.option(
+    "--force",
+    is_flag=True,
+    help="Recompute generic processes whose inputs did not change.",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Skip the generic processes finished by the previous, interrupted run.",
+)
+@click.option(
+    "--filter-stats",
+    is_flag=True,
+    help="Print the EPDs each selection step evaluated and rejected, its time "
+    "and the hits and misses of the flow cache.",
+)
+def run(
+    input_path: Path,
+    epd_folder_path: Path,
+    output_path: Path | None,
+    flow_cache_size: int,
+    market_cache_size: int,
+    workers: int,
+    jobs: int,
+    index_path: Path | None,
+    force: bool,
+    resume: bool,
+    filter_stats: bool,
+):
     """Process the given file or folder path."""
-    run_materia(input_path, epd_folder_path, output_path)
+    FLOW_CACHE.maxsize = flow_cache_size
+    MARKET_CACHE.maxsize = market_cache_size
+    run_materia(
+        input_path,
+        epd_folder_path,
+        output_path,
+        workers=workers,
+        jobs=jobs,
+        force=force,
+        resume=resume,
+        index_path=index_path,
+    )
+    if filter_stats:
+        for name, stats in FILTER_STATS.items():
+            click.echo(
+                f"{name}: {stats.evaluated} evaluated, {stats.rejected} rejected, "
+                f"{stats.seconds:.3f} s"
+            )
+        info = FLOW_CACHE.cache_info()
+        click.echo(f"Flow cache: {info.hits} hits, {info.misses} misses")
+
+
+@main.command("recompute")
+@click.argument("input_path", type=click.Path(exists=True, path_type=Path))
+@click.argument("epd_folder_path", type=click.Path(exists=True, path_type=Path))
+@click.option("--output_path", "-o", type=click.Path(path_type=Path), required=True)
+@click.option(
+    "--changed-epd",
+    "changed_epds",
+    multiple=True,
+    required=True,
+    help="UUID of a revised EPD; repeat for several.",
+)
+@workers_option
+@jobs_option
+@index_path_option
+def recompute(
+    input_path: Path,
+    epd_folder_path: Path,
+    output_path: Path,
+    changed_epds: tuple[str, ...],
+    workers: int,
+    jobs: int,
+    index_path: Path | None,
+):
+    """Rewrite only the generic processes matched to the changed EPDs."""
+    recompute_materia(
+        input_path,
+        epd_folder_path,
+        output_path,
+        changed_epds,
+        workers=workers,
+        jobs=jobs,
+        index_path=index_path,
+    )
+
+
+@main.command("watch")
+@click.argument("input_path", type=click.Path(exists=True, path_type=Path))
+@click.argument("epd_folder_path", type=click.Path(exists=True, path_type=Path))
+@click.option("--output_path", "-o", type=click.Path(path_type=Path), required=True)
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=0, min_open=True),
+    default=WATCH_INTERVAL,
+    show_default=True,
+    help="Seconds between two polls of the watched folders.",
+)
+@workers_option
+@index_path_option
+def watch(
+    input_path: Path,
+    epd_folder_path: Path,
+    output_path: Path,
+    interval: float,
+    workers: int,
+    index_path: Path | None,
+):
+    """Keep the outputs up to date as generic, matches and EPD files change."""
+    watcher = Watcher(
+        input_path, epd_folder_path, output_path, workers=workers, index_path=index_path
+    )
+    watcher.watch(interval)
+
+
+@main.command("serve")
+@click.argument("epd_folder_path", type=click.Path(exists=True, path_type=Path))
+@click.option(
+    "--gen-folder",
+    type=click.Path(exists=True, path_type=Path),
+    default=None,
+    help="Generic data folder whose flows/ resolve reference flows not posted.",
+)
+@click.option(
+    "--host", default=SERVE_HOST, show_default=True, help="Address to listen on."
+)
+@click.option(
+    "--port",
+    type=click.IntRange(0, 65535),
+    default=SERVE_PORT,
+    show_default=True,
+    help="Port to listen on.",
+)
+@market_cache_option
+@workers_option
+@index_path_option
+def serve_command(
+    epd_folder_path: Path,
+    gen_folder: Path | None,
+    host: str,
+    port: int,
+    market_cache_size: int,
+    workers: int,
+    index_path: Path | None,
+):
+    """Aggregate generic processes posted as JSON to a local HTTP server."""
+    MARKET_CACHE.maxsize = market_cache_size
+    service = MateriaService(
+        epd_folder_path, gen_folder, workers=workers, index_path=index_path
+    )
+    serve(service, host, port)
+
+
+@main.group("index")
+def index():
+    """Manage the persistent EPD index."""
+
+
+@index.command("build")
+@click.argument("epd_folder_path", type=click.Path(exists=True, path_type=Path))
+@click.option(
+    "--index-path",
+    type=click.Path(path_type=Path),
+    default=None,
+    help="Where to store the index (default: <epd_folder>/.materia/index.sqlite).",
+)
+@workers_option
+def index_build(epd_folder_path: Path, index_path: Path | None, workers: int):
+    """Parse the processes/ and flows/ folders once into an SQLite index."""
+    epd_index = EPDIndex.build(epd_folder_path, index_path, workers=workers)
+    click.echo(f"{ICONS.SUCCESS} Indexed {len(epd_index)} EPDs in {epd_index.db_path}")
+    epd_index.close()
+
+
+@index.command("refresh")
+@click.argument("epd_folder_path", type=click.Path(exists=True, path_type=Path))
+@click.option(
+    "--index-path",
+    type=click.Path(path_type=Path),
+    default=None,
+    help="Location of the index (default: <epd_folder>/.materia/index.sqlite).",
+)
+@workers_option
+def index_refresh(epd_folder_path: Path, index_path: Path | None, workers: int):
+    """Re-parse only the EPD and flow files that changed since the last refresh."""
+    index_path = index_path or default_index_path(epd_folder_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    epd_index = EPDIndex(index_path, workers=workers)
+    stats = epd_index.refresh(epd_folder_path)
+    for kind, counts in stats.items():
+        summary = ", ".join(f"{n} {what}" for what, n in counts.items())
+        click.echo(f"{ICONS.SUCCESS} {kind}: {summary}")
+    epd_index.close()
+
+
+@main.group("data")
+def data():
+    """Maintain the package data."""
+
+
+@data.command("build")
+@click.option(
+    "--data-folder",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    default=None,
+    help="Folder holding locations/ and regions_mapping.json (default: package data).",
+)
+def data_build(data_folder: Path | None):
+    """Bundle the location files, regions mapping and ILCD aliases into one file."""
+    path = write_geo_bundle(data_folder)
+    click.echo(f"{ICONS.SUCCESS} Wrote {path}")
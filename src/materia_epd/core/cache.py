@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Callable, Hashable, NamedTuple
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Size-bounded mapping that evicts its least recently used entries.
+
+    Like ``functools.lru_cache`` it counts hits and misses, but entries can be
+    looked up, stored and invalidated by key, and ``maxsize`` can be changed
+    at any time. A ``maxsize`` of 0 disables caching.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self._data: OrderedDict = OrderedDict()
+        self._maxsize = maxsize
+        self.hits = self.misses = 0
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, value: int) -> None:
+        if value < 0:
+            raise ValueError(f"maxsize must be >= 0, got {value}")
+        self._maxsize = value
+        self._evict()
+
+    def get(self, key: Hashable, default=None):
+        value = self._data.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        self._evict()
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], object]):
+        """Return the cached value of ``key``, computing and storing it on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop one entry; return whether it was cached."""
+        return self._data.pop(key, _MISSING) is not _MISSING
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = self.misses = 0
+
+    def add_counts(self, hits: int, misses: int) -> None:
+        """Add hits and misses counted elsewhere, e.g. by a worker's copy."""
+        self.hits += hits
+        self.misses += misses
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self._maxsize, len(self._data))
+
+    def _evict(self) -> None:
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self):
+        info = self.cache_info()
+        return (
+            f"{self.__class__.__name__}(hits={info.hits}, misses={info.misses}, "
+            f"maxsize={info.maxsize}, currsize={info.currsize})"
+        )
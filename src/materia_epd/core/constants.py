@@ -8,6 +8,7 @@ class ICONS:
     SUCCESS = "✅"
     WARNING = "⚠️"
     ERROR = "❌"
+    SKIP = "⏭️"
 
 
 # ----------------------------- TRADE ----------------------------------------
@@ -17,6 +18,35 @@ TRADE_TARGET = "442"  # Luxembourg
 TRADE_FLOW = "M"  # Imports
 TRADE_ROW_REGIONS = {"E19", "S19", "E27", "OED", "EUU", "EEC", "ROW", "_X "}
 
+# ----------------------------- INDEX ----------------------------------------
+
+INDEX_DIRNAME = ".materia"
+INDEX_FILENAME = "index.sqlite"
+INDEX_SCHEMA_VERSION = 3
+INDEX_BUSY_TIMEOUT = 60.0  # seconds to wait for another process writing the index
+PARALLEL_MIN_FILES = 64  # fewer process files are parsed in the calling process
+
+# ----------------------------- LOCATIONS ------------------------------------
+
+LOCATION_ESCALATIONS = 4  # location sets tried before giving up on a country
+ILCD_LOCATION_ALIASES = {"GLO": "GLO", "UK": "GBR"}  # ILCD codes that are not ISO
+GEO_BUNDLE_FILENAME = "geo.json"
+GEO_BUNDLE_VERSION = 2
+
+# ----------------------------- CACHE ----------------------------------------
+
+FLOW_CACHE_SIZE = 4096  # parsed flow summaries kept in memory
+MARKET_CACHE_SIZE = 256  # market-share tables kept in memory, by (loc, HS code)
+
+# ----------------------------- RUNS -----------------------------------------
+
+MANIFEST_FILENAME = "manifest.json"  # stored in <output>/.materia/
+MANIFEST_VERSION = 1
+JOURNAL_FILENAME = "journal.jsonl"  # stored in <output>/.materia/
+WATCH_INTERVAL = 2.0  # seconds between two polls of the watched folders
+SERVE_HOST = "127.0.0.1"
+SERVE_PORT = 8765
+
 # ----------------------------- ILCD -----------------------------------------
 
 
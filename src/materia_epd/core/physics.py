@@ -282,3 +282,35 @@ class Material:
 
         self.scaled_baseline = self.to_dict()
         self._clean(targets)
+
+
+def rescaling_bit(targets: Dict[str, Optional[float]]) -> int:
+    """Bit of the ACCEPTED_RESCALINGS combination set by ``targets``, 0 if none."""
+    targets = {k: v for k, v in targets.items() if v is not None}
+    if any(k not in VARS or v <= 0 for k, v in targets.items()):
+        return 0
+    for i, combo in enumerate(ACCEPTED_RESCALINGS):
+        if set(targets) == combo:
+            return 1 << i
+    return 0
+
+
+def feasible_rescalings(kwargs: Dict[str, Optional[float]]) -> int:
+    """Bitmask of the ACCEPTED_RESCALINGS a material could be rescaled with.
+
+    A bit is cleared when ``Material.rescale`` is bound to fail whatever the
+    target values: a rescaled variable or, for a layer thickness, the surface
+    or density stays unknown once the relations are propagated. Set bits only
+    mean the rescaling gets as far as the projection, which may still fail.
+    """
+    material = Material(**kwargs)
+    material._compute()
+    known = {name for name, value in material.to_dict().items() if value is not None}
+    mask = 0
+    for i, combo in enumerate(ACCEPTED_RESCALINGS):
+        needed = combo | (
+            {"surface", "gross_density"} if "layer_thickness" in combo else set()
+        )
+        if needed <= known:
+            mask |= 1 << i
+    return mask
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from materia_epd.core.constants import ICONS
+from materia_epd.epd.extract import (
+    FlowLookup,
+    FolderFlows,
+    extract_records,
+    index_uuid_files,
+)
+from materia_epd.epd.filters import EPDFilter, UUIDFilter, record_preselection
+from materia_epd.epd.index import EPDIndex, default_index_path
+from materia_epd.epd.models import EPDRecord
+from materia_epd.io.files import file_digest, folder_file_key
+from materia_epd.metrics.tensor import LCIATensor
+
+
+class EPDCorpus:
+    """EPDs of a processes folder, each parsed at most once and shared across runs.
+
+    A corpus built with ``from_folder`` only knows which files hold which
+    UUIDs; a process is streamed into an EPDRecord the first time it is asked
+    for, so UUID-filtered lookups touch the matched files only.
+    """
+
+    def __init__(
+        self,
+        epds: Iterable[EPDRecord] = (),
+        files: dict[str | None, list[Path]] | None = None,
+        flows: FlowLookup | None = None,
+        workers: int = 1,
+        folder: Path | None = None,
+    ):
+        self._loaded = list(epds)
+        self.folder = folder
+        self.files = files or {}
+        self.flows = flows
+        self.workers = workers
+        self._parsed: dict[Path, EPDRecord | None] = {}
+
+    @classmethod
+    def from_folder(cls, folder_path: Path | str, workers: int = 1) -> "EPDCorpus":
+        """Index the UUIDs of a processes folder without parsing the EPDs.
+
+        ``workers`` > 1 parses files in that many processes once many of them
+        are needed at the same time.
+        """
+        folder = Path(folder_path)
+        return cls(
+            files=index_uuid_files(folder),
+            flows=FolderFlows(folder.parent / "flows"),
+            workers=workers,
+            folder=folder,
+        )
+
+    @property
+    def epds(self) -> list[EPDRecord]:
+        """Every EPD of the corpus, parsing the files not read yet."""
+        paths = sorted(p for paths in self.files.values() for p in paths)
+        return self._loaded + self._records(paths)
+
+    def candidates(self, filters: Iterable[EPDFilter]) -> list[EPDRecord]:
+        """Return the EPDs the given filters still have to be applied to.
+
+        UUID filters are answered from the file index, so only the files of
+        the wanted UUIDs are parsed. The EPDs left out are counted in
+        FILTER_STATS.
+        """
+        start = time.perf_counter()
+        uuids = None
+        for filt in filters:
+            if isinstance(filt, UUIDFilter):
+                wanted = set(filt.uuids)
+                uuids = wanted if uuids is None else uuids & wanted
+        if uuids is None:
+            return self.epds
+        epds = self._uuid_records(uuids)
+        total = len(self._loaded) + sum(len(paths) for paths in self.files.values())
+        record_preselection(total, len(epds), time.perf_counter() - start)
+        return epds
+
+    def refresh(
+        self, changed: Iterable[Path] = (), flow_uuids: Iterable[str] = ()
+    ) -> None:
+        """Pick up files changed on disk since they were parsed.
+
+        The processes folder is listed again, and the records of the
+        ``changed`` files and of the EPDs referencing ``flow_uuids`` are
+        dropped so they are parsed again when next needed.
+        """
+        if self.folder is not None:
+            self.files = index_uuid_files(self.folder)
+        flow_uuids = set(flow_uuids)
+        stale = {Path(path) for path in changed} | {
+            path
+            for path, record in self._parsed.items()
+            if record is not None and record.ref_flow_uuid in flow_uuids
+        }
+        for path in stale:
+            self._parsed.pop(path, None)
+
+    def uuids_using_flows(self, flow_uuids: Iterable[str]) -> set[str]:
+        """Return the UUIDs of the parsed EPDs referencing some flows."""
+        flow_uuids = set(flow_uuids)
+        records = self._loaded + [r for r in self._parsed.values() if r is not None]
+        return {r.uuid for r in records if r.ref_flow_uuid in flow_uuids}
+
+    def file_digests(self, uuids: Iterable[str]) -> dict[str, str | None]:
+        """Map the files of some EPD UUIDs, by folder_file_key, to their SHA-256."""
+        paths = sorted(p for uuid in set(uuids) for p in self.files.get(uuid, ()))
+        return {folder_file_key(path): file_digest(path) for path in paths}
+
+    def flow_digests(self, uuids: Iterable[str]) -> dict[str, str | None]:
+        """Map the latest reference-flow files of some EPD UUIDs, likewise."""
+        flow_uuids = {epd.ref_flow_uuid for epd in self._uuid_records(set(uuids))}
+        flows = [self.flows.get(uuid) for uuid in flow_uuids if uuid and self.flows]
+        paths = sorted(flow["path"] for flow in flows if flow is not None)
+        return {folder_file_key(path): file_digest(path) for path in paths}
+
+    def lcia_tensor(self, epds: Iterable[EPDRecord]) -> LCIATensor:
+        """Return the scaled LCIA results of some EPDs as one tensor."""
+        return LCIATensor.from_results([epd.get_lcia_results() for epd in epds])
+
+    def _uuid_records(self, uuids: set[str]) -> list[EPDRecord]:
+        paths = sorted(p for uuid in uuids for p in self.files.get(uuid, ()))
+        return [e for e in self._loaded if e.uuid in uuids] + self._records(paths)
+
+    def _records(self, paths: Iterable[Path]) -> list[EPDRecord]:
+        paths = list(paths)
+        missing = [path for path in paths if path not in self._parsed]
+        for path, result in zip(
+            missing, extract_records(missing, self.flows, self.workers)
+        ):
+            if isinstance(result, ET.ParseError):
+                print(f"{ICONS.ERROR} Error reading {path.name}: {result}")
+                result = None
+            self._parsed[path] = result
+        return [self._parsed[p] for p in paths if self._parsed[p] is not None]
+
+    def __iter__(self) -> Iterator[EPDRecord]:
+        return iter(self.epds)
+
+    def __len__(self) -> int:
+        return len(self.epds)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(n={len(self)})"
+
+
+def load_corpus(
+    epd_folder: Path | str, workers: int = 1, index_path: Path | str | None = None
+) -> EPDCorpus | EPDIndex:
+    """Open and refresh the EPD index of an ILCD folder, or parse its processes.
+
+    ``index_path`` points to an index stored elsewhere than the folder's
+    ``.materia`` one, as ``materia index build --index-path`` writes.
+    """
+    index_path = Path(index_path or default_index_path(epd_folder))
+    if index_path.is_file():
+        index = EPDIndex(index_path, workers=workers)
+        index.refresh(epd_folder)
+        return index
+    return EPDCorpus.from_folder(Path(epd_folder) / "processes", workers=workers)
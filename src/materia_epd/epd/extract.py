@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import os
+import re
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Iterable, Protocol, Sequence
+
+from materia_epd.core.cache import LRUCache
+from materia_epd.core.constants import (
+    ATTR,
+    FLOW_CACHE_SIZE,
+    ICONS,
+    NS,
+    PARALLEL_MIN_FILES,
+    XP,
+)
+from materia_epd.core.physics import feasible_rescalings
+from materia_epd.core.utils import _extract_version, qn_uri, sort_key, to_float
+from materia_epd.epd.models import (
+    EPDRecord,
+    IlcdFlow,
+    declared_unit,
+    flow_material_kwargs,
+    read_lcia_result,
+)
+from materia_epd.geo.locations import ilcd_to_iso_location
+from materia_epd.io.files import latest_flow_file
+from materia_epd.io.xml_backend import PARSE_ERRORS, findall, iterparse, parse
+
+_UUID = qn_uri(NS["common"], "UUID")
+_CLASSIFICATION = qn_uri(NS["common"], "classification")
+_LOCATION = qn_uri(NS["proc"], "locationOfOperationSupplyOrProduction")
+_QUANT_REF = qn_uri(NS["proc"], "quantitativeReference")
+_REF_TO_REF_FLOW = qn_uri(NS["proc"], "referenceToReferenceFlow")
+_EXCHANGE = qn_uri(NS["proc"], "exchange")
+_REF_TO_FLOW = qn_uri(NS["proc"], "referenceToFlowDataSet")
+_MEAN_AMOUNT = qn_uri(NS["proc"], "meanAmount")
+_LCIA_RESULT = qn_uri(NS["proc"], "LCIAResult")
+
+# ILCD files are named {uuid}.xml or {uuid}_version{x.y.z}.xml.
+_UUID_FILENAME = re.compile(
+    r"^([0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12})(?:_version.*)?\.xml$"
+)
+
+# Top-level sections of a process dataset, dropped once fully parsed.
+_SECTIONS = {
+    qn_uri(NS["proc"], name)
+    for name in (
+        "processInformation",
+        "modellingAndValidation",
+        "administrativeInformation",
+        "exchanges",
+        "LCIAResults",
+    )
+}
+_TAGS = {
+    _UUID,
+    _LOCATION,
+    _QUANT_REF,
+    _EXCHANGE,
+    _LCIA_RESULT,
+    _CLASSIFICATION,
+    *_SECTIONS,
+}
+
+
+class FlowLookup(Protocol):
+    def get(self, uuid: str) -> dict | None:
+        ...
+
+
+def summarize_flow(path: Path, root: ET.Element) -> dict:
+    """Reduce a flow dataset to the fields needed to build EPD materials."""
+    flow = IlcdFlow(root=root)
+    return {
+        "path": str(path),
+        "uuid": flow.uuid,
+        "dec_unit": declared_unit(root),
+        "units": flow.units,
+        "props": flow.props,
+    }
+
+
+def latest_flows(flows: Iterable[dict]) -> dict[str, dict]:
+    """Map each flow UUID to its most recent summary, as latest_flow_file does."""
+    latest: dict[str, dict] = {}
+    for flow in flows:
+        current = latest.get(flow["uuid"])
+        if current is None or sort_key(Path(flow["path"])) > sort_key(
+            Path(current["path"])
+        ):
+            latest[flow["uuid"]] = flow
+    return latest
+
+
+# Parsed flow summaries shared by every FolderFlows, keyed by flow file version.
+FLOW_CACHE = LRUCache(FLOW_CACHE_SIZE)
+
+
+def _parse_flow(path: Path) -> dict | None:
+    try:
+        return summarize_flow(path, parse(str(path)))
+    except PARSE_ERRORS:
+        return None
+
+
+class FolderFlows:
+    """Resolve flow summaries on demand from an ILCD flows folder.
+
+    Many EPDs share reference flows, so parsed summaries are kept in a
+    bounded LRU cache keyed by flow UUID, version and file mtime.
+    """
+
+    def __init__(self, folder: Path | str, cache: LRUCache = FLOW_CACHE):
+        self.folder = Path(folder)
+        self.cache = cache
+
+    def __getstate__(self) -> dict:
+        # Worker processes fill their own FLOW_CACHE rather than a copy of ours.
+        return {"folder": self.folder}
+
+    def __setstate__(self, state: dict) -> None:
+        self.folder = state["folder"]
+        self.cache = FLOW_CACHE
+
+    def get(self, uuid: str) -> dict | None:
+        try:
+            path = latest_flow_file(self.folder, uuid)
+            key = (uuid, _extract_version(path.name), path.stat().st_mtime_ns)
+        except FileNotFoundError:
+            return None
+        return self.cache.get_or_set(key, lambda: _parse_flow(path))
+
+
+def read_uuid(path: Path | str) -> str | None:
+    """Return the first UUID of an ILCD file, parsing no further than needed."""
+    with open(path, "rb") as f:
+        for _, elem in iterparse(f):
+            if elem.tag == _UUID:
+                return elem.text.strip() if elem.text else None
+    return None
+
+
+def file_uuid(path: Path | str) -> str | None:
+    """Return the dataset UUID of an ILCD file, from its name where possible.
+
+    Other files are opened and their first UUID read, which raises one of
+    PARSE_ERRORS for malformed XML.
+    """
+    match = _UUID_FILENAME.match(Path(path).name)
+    return match.group(1) if match else read_uuid(path)
+
+
+def index_uuid_files(folder: Path | str) -> dict[str | None, list[Path]]:
+    """Map each dataset UUID of a folder to its XML files, sorted by path.
+
+    UUIDs are taken from the file names where they follow the ILCD naming
+    scheme; other files are opened and their first UUID read instead.
+    Unreadable files are reported and left out.
+    """
+    folder = Path(folder)
+    files: dict[str | None, list[Path]] = {}
+    if not folder.is_dir():
+        return files
+    with os.scandir(folder) as entries:
+        names = sorted(e.name for e in entries if e.name.endswith(".xml"))
+    for name in names:
+        path = folder / name
+        try:
+            uuid = file_uuid(path)
+        except PARSE_ERRORS as e:
+            print(f"{ICONS.ERROR} Error reading {name}: {e}")
+            continue
+        files.setdefault(uuid, []).append(path)
+    return files
+
+
+def extract_record(
+    path: Path | str, flows: FlowLookup, source: IO[bytes] | None = None
+) -> EPDRecord:
+    """Stream an ILCD process file into an EPDRecord.
+
+    Only the UUID, location, quantitative reference, exchanges, HS
+    classification and LCIA results are looked at. Each of those is cleared
+    once read and every top-level section once it closes, so at most one
+    section is held in memory however much documentation a dataset carries.
+    ``source`` may be an open binary stream of the file's content; it
+    defaults to reading ``path``. Malformed XML raises one of PARSE_ERRORS.
+    """
+    uuid = loc_code = ref_id = hs_class = None
+    hs_seen = False
+    exchanges: dict[str, tuple[str | None, str | None]] = {}
+    lcia: list[dict] = []
+
+    for _, elem in iterparse(source if source is not None else str(path), _TAGS):
+        tag = elem.tag
+        if tag == _EXCHANGE:
+            # The quantitative reference normally precedes the exchanges, so
+            # only the reference exchange needs reading in that case.
+            internal_id = elem.attrib.get(ATTR.INTERNAL_ID)
+            if internal_id not in exchanges and ref_id in (None, internal_id):
+                ref = elem.find(_REF_TO_FLOW)
+                exchanges[internal_id] = (
+                    ref.attrib.get(ATTR.REF_OBJECT_ID) if ref is not None else None,
+                    elem.findtext(_MEAN_AMOUNT),
+                )
+        elif tag == _LCIA_RESULT:
+            result = read_lcia_result(elem, scaling_factor=1.0)
+            if result is not None:
+                lcia.append(result)
+        elif tag == _UUID:
+            if uuid is None:
+                uuid = elem.text.strip() if elem.text else None
+        elif tag == _LOCATION:
+            if loc_code is None:
+                loc_code = elem.attrib.get(ATTR.LOCATION)
+        elif tag == _QUANT_REF:
+            if ref_id is None:
+                ref_id = (elem.findtext(_REF_TO_REF_FLOW) or "").strip() or None
+        elif tag == _CLASSIFICATION:
+            if not hs_seen and elem.attrib.get(ATTR.NAME) == "HS Classification":
+                hs_seen = True
+                hs_class = next(
+                    (
+                        c.attrib.get(ATTR.CLASS_ID)
+                        for c in findall(elem, XP.CLASS_LEVEL_2, NS)
+                    ),
+                    None,
+                )
+        elif tag not in _SECTIONS:
+            continue
+        elem.clear()
+
+    ref_flow_uuid, amount = exchanges.get(ref_id, (None, None))
+    record = EPDRecord(
+        uuid=uuid,
+        path=Path(path),
+        loc=ilcd_to_iso_location(loc_code) if loc_code else None,
+        hs_class=hs_class,
+        ref_flow_uuid=ref_flow_uuid,
+        lcia=lcia,
+    )
+
+    exchange_amount = to_float(amount, positive=True)
+    flow = flows.get(ref_flow_uuid) if ref_flow_uuid else None
+    if flow is not None and exchange_amount is not None:
+        record.dec_unit = flow["dec_unit"]
+        record.material_kwargs = flow_material_kwargs(
+            uuid, flow["units"], flow["props"], exchange_amount
+        )
+        record.rescalings = feasible_rescalings(record.material_kwargs)
+    else:
+        record.rescalings = 0
+    return record
+
+
+_worker_flows: FlowLookup | None = None
+
+
+def _init_worker(flows: FlowLookup) -> None:
+    global _worker_flows
+    _worker_flows = flows
+
+
+def _extract_task(
+    path: Path, flows: FlowLookup | None = None
+) -> EPDRecord | ET.ParseError:
+    try:
+        return extract_record(path, flows if flows is not None else _worker_flows)
+    except PARSE_ERRORS as e:
+        # lxml errors do not pickle; hand back a plain ElementTree one
+        return ET.ParseError(str(e))
+
+
+def extract_records(
+    paths: Sequence[Path], flows: FlowLookup, workers: int = 1
+) -> list[EPDRecord | ET.ParseError]:
+    """Extract many process files, in order, optionally in worker processes.
+
+    With ``workers`` > 1 and at least PARALLEL_MIN_FILES files, they are parsed
+    in a ProcessPoolExecutor; each worker reads its files from disk and only
+    the compact records travel back, in the order of ``paths``. Smaller
+    batches are parsed here, where starting a pool would cost more than it
+    saves. Unreadable files yield their ParseError so the caller can report it.
+    """
+    paths = list(paths)
+    if workers <= 1 or len(paths) < max(2, PARALLEL_MIN_FILES):
+        return [_extract_task(path, flows) for path in paths]
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(flows,)
+    ) as pool:
+        return list(pool.map(_extract_task, paths, chunksize=chunksize))
@@ -1,17 +1,97 @@
 from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Iterable
+
+from materia_epd.core.physics import rescaling_bit
 from materia_epd.epd.models import IlcdProcess
 
 
+class FilterCost(IntEnum):
+    """How expensive a filter is per EPD; chains apply the cheapest first."""
+
+    LOOKUP = 0
+    SOLVE = 1
+
+
+@dataclass
+class FilterStats:
+    evaluated: int = 0
+    rejected: int = 0
+    seconds: float = 0.0
+
+    def record(self, matched: bool, seconds: float) -> None:
+        self.evaluated += 1
+        self.rejected += not matched
+        self.seconds += seconds
+
+    def merge(self, other: "FilterStats") -> None:
+        self.evaluated += other.evaluated
+        self.rejected += other.rejected
+        self.seconds += other.seconds
+
+
+# Statistics of every filter applied in this process, by filter class name.
+FILTER_STATS: dict[str, FilterStats] = {}
+
+
+def merge_filter_stats(stats: dict[str, FilterStats]) -> None:
+    """Add statistics gathered elsewhere, e.g. in a worker, to FILTER_STATS."""
+    for name, other in stats.items():
+        FILTER_STATS.setdefault(name, FilterStats()).merge(other)
+
+
+def record_stage(name: str, total: int, kept: int, seconds: float) -> None:
+    """Count a selection step that bypasses the filters' ``check`` in FILTER_STATS."""
+    stats = FILTER_STATS.setdefault(name, FilterStats())
+    stats.evaluated += total
+    stats.rejected += total - kept
+    stats.seconds += seconds
+
+
+def record_preselection(total: int, kept: int, seconds: float) -> None:
+    """Count a corpus pre-selection of candidates in FILTER_STATS.
+
+    Corpora answer UUID filters, and an index also location filters and the
+    rescaling mask, before any filter's ``check`` runs; the EPDs they leave
+    out are counted here under "Preselection".
+    """
+    record_stage("Preselection", total, kept, seconds)
+
+
+def by_cost(filters: Iterable["EPDFilter"]) -> list["EPDFilter"]:
+    """Order filters from cheapest to most expensive, keeping ties in order."""
+    return sorted(filters, key=lambda filt: filt.cost)
+
+
 class EPDFilter:
+    cost = FilterCost.LOOKUP
+
+    def __init__(self):
+        self.stats = FilterStats()
+
     def matches(self, epd: IlcdProcess) -> bool:
         return True
 
+    def check(self, epd: IlcdProcess) -> bool:
+        """Like ``matches``, timing the call and counting it in FILTER_STATS."""
+        start = time.perf_counter()
+        matched = self.matches(epd)
+        seconds = time.perf_counter() - start
+        self.stats.record(matched, seconds)
+        name = self.__class__.__name__
+        FILTER_STATS.setdefault(name, FilterStats()).record(matched, seconds)
+        return matched
+
     def __repr__(self):
         return self.__class__.__name__
 
 
 class UUIDFilter(EPDFilter):
     def __init__(self, matches: list):
+        super().__init__()
         self.uuids = (
             matches.get("uuids", matches) if isinstance(matches, dict) else matches
         )
@@ -24,10 +104,24 @@ class UUIDFilter(EPDFilter):
 
 
 class UnitConformityFilter(EPDFilter):
+    """Keep the EPDs whose material can be rescaled to the target.
+
+    EPDs carrying a ``rescalings`` bitmask are rejected by a lookup when the
+    target's combination is not feasible for them; the others are rescaled,
+    which the pipeline needs anyway and which may still fail in projection.
+    """
+
+    cost = FilterCost.SOLVE
+
     def __init__(self, target_kwargs):
+        super().__init__()
         self.target_kwargs = target_kwargs
+        self.rescaling = rescaling_bit(target_kwargs)
 
     def matches(self, epd: IlcdProcess) -> bool:
+        rescalings = getattr(epd, "rescalings", None)
+        if rescalings is not None and not rescalings & self.rescaling:
+            return False
         try:
             epd.get_ref_flow()
             epd.material.rescale(self.target_kwargs)
@@ -41,6 +135,7 @@ class UnitConformityFilter(EPDFilter):
 
 class LocationFilter(EPDFilter):
     def __init__(self, locations):
+        super().__init__()
         self.locations = locations
 
     def matches(self, epd: IlcdProcess) -> bool:
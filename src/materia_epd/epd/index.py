@@ -0,0 +1,511 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from materia_epd.core.constants import (
+    ICONS,
+    INDEX_BUSY_TIMEOUT,
+    INDEX_DIRNAME,
+    INDEX_FILENAME,
+    INDEX_SCHEMA_VERSION,
+)
+from materia_epd.epd.extract import extract_records, latest_flows, summarize_flow
+from materia_epd.epd.filters import (
+    EPDFilter,
+    LocationFilter,
+    UnitConformityFilter,
+    UUIDFilter,
+    record_preselection,
+)
+from materia_epd.epd.models import EPDRecord
+from materia_epd.io.files import file_digest, folder_file_key
+from materia_epd.io.xml_backend import PARSE_ERRORS, parse
+from materia_epd.metrics.tensor import LCIATensor, read_tensor_meta
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS flows (
+    path TEXT PRIMARY KEY,
+    uuid TEXT,
+    dec_unit TEXT,
+    units TEXT NOT NULL,
+    props TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS epds (
+    path TEXT PRIMARY KEY,
+    uuid TEXT,
+    loc TEXT,
+    hs_class TEXT,
+    dec_unit TEXT,
+    ref_flow_uuid TEXT,
+    material_kwargs TEXT,
+    lcia TEXT NOT NULL,
+    rescalings INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS epds_uuid ON epds (uuid);
+CREATE INDEX IF NOT EXISTS epds_loc ON epds (loc);
+CREATE INDEX IF NOT EXISTS epds_ref_flow ON epds (ref_flow_uuid);
+CREATE INDEX IF NOT EXISTS flows_uuid ON flows (uuid);
+"""
+
+_TABLES = ("meta", "files", "flows", "epds")
+
+_EPD_COLUMNS = (
+    "path",
+    "uuid",
+    "loc",
+    "hs_class",
+    "dec_unit",
+    "ref_flow_uuid",
+    "material_kwargs",
+    "lcia",
+    "rescalings",
+)
+
+
+def default_index_path(epd_folder: Path | str) -> Path:
+    """Return the location of the index for an ILCD folder."""
+    return Path(epd_folder) / INDEX_DIRNAME / INDEX_FILENAME
+
+
+def lcia_cache_path(db_path: Path | str) -> Path:
+    """Return the folder holding the memory-mapped LCIA arrays of an index."""
+    db_path = Path(db_path)
+    return db_path.parent / f"{db_path.stem}.lcia"
+
+
+def _scan_xml_files(folder: Path) -> dict[str, tuple[int, int]]:
+    """Map each XML file of a folder to its (mtime_ns, size) with one scandir."""
+    if not folder.is_dir():
+        return {}
+    with os.scandir(folder) as entries:
+        return {
+            str(Path(entry.path)): (stat.st_mtime_ns, stat.st_size)
+            for entry in entries
+            if entry.name.endswith(".xml") and entry.is_file()
+            for stat in (entry.stat(),)
+        }
+
+
+def _parse_xml_file(path: str) -> ET.Element | None:
+    try:
+        return parse(path)
+    except PARSE_ERRORS + (OSError,) as e:
+        print(f"{ICONS.ERROR} Error reading {Path(path).name}: {e}")
+        return None
+
+
+def _record_row(record: EPDRecord) -> tuple:
+    return (
+        str(record.path),
+        record.uuid,
+        record.loc,
+        record.hs_class,
+        record.dec_unit,
+        record.ref_flow_uuid,
+        json.dumps(record.material_kwargs),
+        json.dumps(record.lcia),
+        record.rescalings or 0,
+    )
+
+
+def _row_record(row: tuple) -> EPDRecord:
+    path, uuid, loc, hs_class, dec_unit, ref_flow_uuid, kwargs, lcia, rescalings = row
+    return EPDRecord(
+        uuid=uuid,
+        path=Path(path),
+        loc=loc,
+        hs_class=hs_class,
+        dec_unit=dec_unit,
+        ref_flow_uuid=ref_flow_uuid,
+        material_kwargs=json.loads(kwargs),
+        lcia=json.loads(lcia),
+        rescalings=rescalings,
+    )
+
+
+class EPDIndex:
+    """Persistent SQLite index of the EPDs of an ILCD folder.
+
+    The index stores one EPDRecord per process file so that pipeline runs can
+    query EPDs without parsing XML. Every indexed file is tracked by mtime,
+    size and SHA-256 so that ``refresh`` only re-parses what actually changed.
+    The LCIA results of all EPDs are also kept as .npy arrays next to the
+    database, which later runs memory-map instead of decoding JSON.
+    """
+
+    def __init__(self, db_path: Path | str, workers: int = 1):
+        self.db_path = Path(db_path)
+        self.workers = workers
+        # WAL lets runs read the index while another process refreshes it.
+        self.conn = sqlite3.connect(self.db_path, timeout=INDEX_BUSY_TIMEOUT)
+        if self.conn.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self._flows: dict[str, dict] | None = None
+        self._lcia: tuple[str, LCIATensor, dict[str, int]] | None = None
+        version = self._get_meta("schema_version")
+        if version is not None and int(version) != INDEX_SCHEMA_VERSION:
+            # Tables of older versions may lack columns; start from scratch.
+            with self.conn:
+                for table in _TABLES:
+                    self.conn.execute(f"DROP TABLE {table}")
+            self.conn.executescript(_SCHEMA)
+
+    @classmethod
+    def build(
+        cls,
+        epd_folder: Path | str,
+        db_path: Path | str | None = None,
+        workers: int = 1,
+    ) -> "EPDIndex":
+        """Build the index of the processes/ and flows/ folders from scratch."""
+        epd_folder = Path(epd_folder)
+        db_path = Path(db_path) if db_path else default_index_path(epd_folder)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        index = cls(db_path, workers=workers)
+        index.clear()
+        index.refresh(epd_folder)
+        return index
+
+    @property
+    def epd_folder(self) -> Path | None:
+        folder = self._get_meta("epd_folder")
+        return Path(folder) if folder else None
+
+    def clear(self) -> None:
+        with self.conn:
+            for table in _TABLES:
+                self.conn.execute(f"DELETE FROM {table}")
+
+    def refresh(self, epd_folder: Path | str | None = None) -> dict[str, dict]:
+        """Re-parse files added or changed since the last refresh, drop deleted ones.
+
+        A file whose mtime and size are unchanged is skipped without being read;
+        one whose content hash is unchanged is only re-stamped. Processes whose
+        reference flow changed are re-extracted as well. Files are keyed on
+        their resolved path, so relative and absolute folders share rows.
+        Refreshing an unchanged folder writes nothing, so it does not wait on
+        other processes using the index.
+        """
+        epd_folder = epd_folder if epd_folder is not None else self.epd_folder
+        if epd_folder is None:
+            raise ValueError("No EPD folder given or stored in the index")
+        epd_folder = Path(epd_folder).resolve()
+        stats = {}
+        self._flows = None
+        with self.conn:
+            stats["flows"], changed_flows = self._sync(
+                epd_folder / "flows", "flows", self._index_flows
+            )
+            stats["processes"], reparsed = self._sync(
+                epd_folder / "processes", "processes", self._index_processes
+            )
+            stats["processes"]["dependent"] = self._reindex_dependents(
+                changed_flows - {None}, reparsed
+            )
+            changed = any(
+                n
+                for counts in stats.values()
+                for what, n in counts.items()
+                if what != "unchanged"
+            )
+            meta = [
+                ("schema_version", str(INDEX_SCHEMA_VERSION)),
+                ("epd_folder", str(epd_folder)),
+            ]
+            if changed or any(self._get_meta(key) != value for key, value in meta):
+                self.conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", meta)
+        self._flows = None
+        if changed or not self._lcia_cache_current():
+            self._write_lcia_cache()
+        return stats
+
+    @property
+    def lcia_cache_path(self) -> Path:
+        return lcia_cache_path(self.db_path)
+
+    def _lcia_cache_current(self) -> bool:
+        meta = read_tensor_meta(self.lcia_cache_path)
+        return meta is not None and meta["token"] == self._get_meta("lcia_token")
+
+    def _write_lcia_cache(self) -> None:
+        records = self.records()
+        tensor = LCIATensor.from_results([record.lcia for record in records])
+        token = tensor.save(
+            self.lcia_cache_path, [str(record.path) for record in records]
+        )
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)", ("lcia_token", token)
+            )
+        self._lcia = None
+
+    def lcia_tensor(self, epds: Iterable[EPDRecord]) -> LCIATensor:
+        """Return the scaled LCIA results of some indexed EPDs as one tensor.
+
+        Rows come from the memory-mapped arrays, so only the pages of the
+        selected EPDs are read; the arrays are mapped again once a refresh,
+        from this or another process, replaced them. EPDs missing from those
+        arrays fall back to building the tensor from their records.
+        """
+        epds = list(epds)
+        token = self._get_meta("lcia_token")
+        if self._lcia is None or self._lcia[0] != token:
+            # Another process may have refreshed the index since it was mapped.
+            self._lcia = None
+            if self._lcia_cache_current():
+                tensor, keys = LCIATensor.load(self.lcia_cache_path)
+                self._lcia = token, tensor, {key: i for i, key in enumerate(keys)}
+        positions = self._lcia[2] if self._lcia is not None else {}
+        rows = [positions.get(str(epd.path)) for epd in epds]
+        if self._lcia is None or None in rows:
+            return LCIATensor.from_results([epd.get_lcia_results() for epd in epds])
+        scaling = [epd.material.scaling_factor for epd in epds]
+        return self._lcia[1].take(rows, scaling)
+
+    def _get_meta(self, key: str) -> str | None:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,))
+        row = row.fetchone()
+        return row[0] if row else None
+
+    def _sync(self, folder: Path, kind: str, handler) -> tuple[dict, set[str]]:
+        """Bring the rows of one folder in line with the files on disk.
+
+        ``handler`` receives the (path, exists) pairs to re-index, with
+        ``exists`` False for deleted files, and returns the keys it touched.
+        Files are hashed in chunks and only their paths are kept, so a cold
+        build never holds the content of the whole folder.
+        """
+        known = {
+            path: (mtime_ns, size, digest)
+            for path, mtime_ns, size, digest in self.conn.execute(
+                "SELECT path, mtime_ns, size, sha256 FROM files WHERE kind = ?",
+                (kind,),
+            )
+        }
+        scanned = _scan_xml_files(folder)
+        stats = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+        pending: list[tuple[str, bool]] = []
+
+        for path in known.keys() - scanned.keys():
+            pending.append((path, False))
+            self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            stats["removed"] += 1
+
+        for path, (mtime_ns, size) in sorted(scanned.items()):
+            old = known.get(path)
+            if old is not None and old[:2] == (mtime_ns, size):
+                stats["unchanged"] += 1
+                continue
+            digest = file_digest(path)
+            if digest is None:
+                continue
+            if old is None or old[2] != digest:
+                pending.append((path, True))
+                stats["added" if old is None else "changed"] += 1
+            else:
+                stats["unchanged"] += 1
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                (path, kind, mtime_ns, size, digest),
+            )
+        return stats, handler(pending)
+
+    def _index_flows(self, items: list[tuple[str, bool]]) -> set[str]:
+        """Replace the flow rows of ``items``; return the flow UUIDs affected."""
+        affected = set()
+        for path, exists in items:
+            affected.update(
+                uuid
+                for (uuid,) in self.conn.execute(
+                    "SELECT uuid FROM flows WHERE path = ?", (path,)
+                )
+            )
+            self.conn.execute("DELETE FROM flows WHERE path = ?", (path,))
+            root = _parse_xml_file(path) if exists else None
+            if root is None:
+                continue
+            flow = summarize_flow(Path(path), root)
+            self.conn.execute(
+                "INSERT INTO flows VALUES (?, ?, ?, ?, ?)",
+                (
+                    flow["path"],
+                    flow["uuid"],
+                    flow["dec_unit"],
+                    json.dumps(flow["units"]),
+                    json.dumps(flow["props"]),
+                ),
+            )
+            affected.add(flow["uuid"])
+        return affected
+
+    def _index_processes(self, items: list[tuple[str, bool]]) -> set[str]:
+        """Replace the EPD rows of ``items``; return the paths re-parsed."""
+        self.conn.executemany(
+            "DELETE FROM epds WHERE path = ?", [(path,) for path, _ in items]
+        )
+        paths = [path for path, exists in items if exists]
+        results = extract_records(
+            [Path(path) for path in paths], self._latest_flows(), self.workers
+        )
+        reparsed = set()
+        for path, result in zip(paths, results):
+            if isinstance(result, ET.ParseError):
+                print(f"{ICONS.ERROR} Error reading {Path(path).name}: {result}")
+                continue
+            self.conn.execute(
+                f"INSERT INTO epds VALUES ({', '.join('?' * len(_EPD_COLUMNS))})",
+                _record_row(result),
+            )
+            reparsed.add(path)
+        return reparsed
+
+    def _reindex_dependents(self, flow_uuids: set[str], reparsed: set[str]) -> int:
+        """Re-extract unchanged processes whose reference flow changed."""
+        if not flow_uuids:
+            return 0
+        placeholders = ", ".join("?" * len(flow_uuids))
+        paths = [
+            path
+            for (path,) in self.conn.execute(
+                f"SELECT path FROM epds WHERE ref_flow_uuid IN ({placeholders})",
+                list(flow_uuids),
+            )
+            if path not in reparsed
+        ]
+        self._index_processes([(path, True) for path in paths])
+        return len(paths)
+
+    def _latest_flows(self) -> dict[str, dict]:
+        if self._flows is None:
+            self._flows = latest_flows(
+                {
+                    "path": path,
+                    "uuid": uuid,
+                    "dec_unit": dec_unit,
+                    "units": json.loads(units),
+                    "props": json.loads(props),
+                }
+                for path, uuid, dec_unit, units, props in self.conn.execute(
+                    "SELECT path, uuid, dec_unit, units, props FROM flows"
+                )
+            )
+        return self._flows
+
+    def records(
+        self,
+        uuids: Iterable[str] | None = None,
+        locations: Iterable[str] | None = None,
+        rescalings: int | None = None,
+    ) -> list[EPDRecord]:
+        """Return the indexed EPDs, optionally restricted by UUID and location.
+
+        ``rescalings`` keeps the EPDs feasible for one of the rescalings of
+        a ``feasible_rescalings`` bitmask.
+        """
+        clauses, params = [], []
+        if rescalings is not None:
+            clauses.append("rescalings & ? != 0")
+            params.append(rescalings)
+        for column, values in (("uuid", uuids), ("loc", locations)):
+            if values is None:
+                continue
+            values = list(values)
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+
+        sql = f"SELECT {', '.join(_EPD_COLUMNS)} FROM epds"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY path"
+        return [_row_record(row) for row in self.conn.execute(sql, params)]
+
+    def candidates(self, filters: Iterable[EPDFilter]) -> list[EPDRecord]:
+        """Answer UUID and location filters in SQL; others are left to the caller.
+
+        Unit conformity is only pre-selected by the stored rescaling bitmask,
+        as the caller still has to rescale the materials. The EPDs left out
+        are counted in FILTER_STATS.
+        """
+        start = time.perf_counter()
+        uuids = locations = rescalings = None
+        for filt in filters:
+            if isinstance(filt, UUIDFilter):
+                wanted = set(filt.uuids)
+                uuids = wanted if uuids is None else uuids & wanted
+            elif isinstance(filt, LocationFilter):
+                wanted = set(filt.locations)
+                locations = wanted if locations is None else locations & wanted
+            elif isinstance(filt, UnitConformityFilter):
+                wanted = filt.rescaling
+                rescalings = wanted if rescalings is None else rescalings & wanted
+        epds = self.records(uuids, locations, rescalings)
+        record_preselection(len(self), len(epds), time.perf_counter() - start)
+        return epds
+
+    def uuids_using_flows(self, flow_uuids: Iterable[str]) -> set[str]:
+        """Return the UUIDs of the indexed EPDs referencing some flows."""
+        flow_uuids = list(set(flow_uuids))
+        rows = self.conn.execute(
+            "SELECT uuid FROM epds "
+            f"WHERE ref_flow_uuid IN ({', '.join('?' * len(flow_uuids))})",
+            flow_uuids,
+        )
+        return {uuid for (uuid,) in rows}
+
+    def file_digests(self, uuids: Iterable[str]) -> dict[str, str]:
+        """Map the indexed files of some EPD UUIDs, by folder_file_key, to SHA-256."""
+        uuids = list(set(uuids))
+        rows = self.conn.execute(
+            "SELECT files.path, files.sha256 FROM files JOIN epds USING (path) "
+            f"WHERE epds.uuid IN ({', '.join('?' * len(uuids))}) ORDER BY path",
+            uuids,
+        )
+        return {folder_file_key(path): digest for path, digest in rows}
+
+    def flow_digests(self, uuids: Iterable[str]) -> dict[str, str]:
+        """Map the latest reference-flow files of some EPD UUIDs, likewise."""
+        uuids = list(set(uuids))
+        flow_uuids = self.conn.execute(
+            "SELECT DISTINCT ref_flow_uuid FROM epds "
+            f"WHERE uuid IN ({', '.join('?' * len(uuids))})",
+            uuids,
+        )
+        flows = self._latest_flows()
+        paths = sorted(flows[uuid]["path"] for (uuid,) in flow_uuids if uuid in flows)
+        rows = self.conn.execute(
+            "SELECT path, sha256 FROM files "
+            f"WHERE path IN ({', '.join('?' * len(paths))}) ORDER BY path",
+            paths,
+        )
+        return {folder_file_key(path): digest for path, digest in rows}
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __iter__(self) -> Iterator[EPDRecord]:
+        return iter(self.records())
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM epds").fetchone()[0]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(path={self.db_path})"
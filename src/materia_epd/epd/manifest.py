@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Iterable
+
+from materia_epd.core.constants import (
+    INDEX_DIRNAME,
+    JOURNAL_FILENAME,
+    MANIFEST_FILENAME,
+    MANIFEST_VERSION,
+)
+from materia_epd.epd.filters import UUIDFilter
+from materia_epd.epd.models import IlcdProcess
+from materia_epd.io.files import file_digest, latest_flow_file, read_json_file
+from materia_epd.resources import market_shares_file
+
+
+def input_fingerprints(process: IlcdProcess, corpus) -> dict:
+    """Fingerprint the files the results of a loaded generic process derive from.
+
+    These are the process file, its reference flow, its matches file, the
+    market-share file, and the files of the matched EPDs and of their
+    reference flows.
+    """
+    folder = process.path.parent.parent
+    ref_flow_uuid, _ = process.get_ref_exchange()
+    try:
+        ref_flow = latest_flow_file(folder / "flows", ref_flow_uuid)
+    except FileNotFoundError:
+        ref_flow = None
+    uuids = UUIDFilter(process.matches).uuids if process.matches else []
+    return {
+        "process": file_digest(process.path),
+        "ref_flow": file_digest(ref_flow),
+        "matches": file_digest(folder / "matches" / f"{process.uuid}.json"),
+        "market_shares": file_digest(market_shares_file(process.loc, process.hs_class)),
+        "epds": corpus.file_digests(uuids),
+        "epd_flows": corpus.flow_digests(uuids),
+    }
+
+
+def output_files(process: IlcdProcess) -> list[str]:
+    """Return the files, relative to the output folder, written for a process."""
+    return [f"processes/{process.uuid}.xml", f"flows/{process.ref_flow.uuid}.xml"]
+
+
+class RunManifest:
+    """Input fingerprints and outputs of the generic processes of an output folder.
+
+    A process whose inputs have the same fingerprints as when it was last
+    computed, and whose outputs are still there, does not need recomputing.
+    """
+
+    def __init__(self, output_path: Path | str):
+        self.output_path = Path(output_path)
+        self.path = self.output_path / INDEX_DIRNAME / MANIFEST_FILENAME
+        data = read_json_file(self.path)
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            data = {}
+        self.entries: dict[str, dict] = data.get("processes", {})
+
+    def is_current(self, uuid: str, inputs: dict) -> bool:
+        entry = self.entries.get(uuid)
+        return (
+            entry is not None
+            and entry["inputs"] == inputs
+            and all((self.output_path / out).is_file() for out in entry["outputs"])
+        )
+
+    def record(self, uuid: str, inputs: dict, outputs: Iterable[str]) -> None:
+        self.entries[uuid] = {"inputs": inputs, "outputs": list(outputs)}
+
+    def save(self) -> None:
+        """Write the manifest, replacing the previous one atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        data = {"version": MANIFEST_VERSION, "processes": self.entries}
+        tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class RunJournal:
+    """Append-only JSONL log of the generic processes a run has finished.
+
+    Each line holds a process UUID and its outcome and is flushed as soon as
+    the process is written, so a crashed run leaves a journal that the next
+    run can ``resume`` from. Without ``resume`` the journal starts afresh,
+    unless ``append`` keeps the lines of earlier runs without skipping them.
+    """
+
+    def __init__(
+        self, output_path: Path | str, resume: bool = False, append: bool = False
+    ):
+        self.path = Path(output_path) / INDEX_DIRNAME / JOURNAL_FILENAME
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.done: dict[str, str] = self._read() if resume else {}
+        mode = "a" if resume or append else "w"
+        self._file = open(self.path, mode, encoding="utf-8")
+        if self._file.tell() and not self.path.read_bytes().endswith(b"\n"):
+            self._file.write("\n")  # end the line a crash cut short
+
+    def _read(self) -> dict[str, str]:
+        done = {}
+        try:
+            lines = self.path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            return done
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            done[entry["uuid"]] = entry["outcome"]
+        return done
+
+    def record(self, uuid: str, outcome: str) -> None:
+        self._file.write(json.dumps({"uuid": uuid, "outcome": outcome}) + "\n")
+        self._file.flush()
+        self.done[uuid] = outcome
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __contains__(self, uuid: str) -> bool:
+        return uuid in self.done
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable
+
+from materia_epd.epd.filters import UUIDFilter
+from materia_epd.io.files import gen_json_objects
+
+
+def read_matches(matches_folder: Path | str) -> dict[str, list[str]]:
+    """Map each generic process UUID to the EPD UUIDs of its matches file."""
+    return {
+        path.stem: list(UUIDFilter(data).uuids)
+        for path, data in gen_json_objects(matches_folder)
+    }
+
+
+def reverse_matches(matches_folder: Path | str) -> dict[str, set[str]]:
+    """Map each matched EPD UUID to the generic processes that use it."""
+    users: dict[str, set[str]] = {}
+    for generic_uuid, epd_uuids in read_matches(matches_folder).items():
+        for epd_uuid in epd_uuids:
+            users.setdefault(epd_uuid, set()).add(generic_uuid)
+    return users
+
+
+def dependent_processes(
+    matches_folder: Path | str, epd_uuids: Iterable[str]
+) -> set[str]:
+    """Return the UUIDs of the generic processes matched to any of some EPDs."""
+    users = reverse_matches(matches_folder)
+    return set().union(*(users.get(uuid, ()) for uuid in epd_uuids))
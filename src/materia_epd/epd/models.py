@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import os
 import xml.etree.ElementTree as ET
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 
 from materia_epd.core.constants import (
@@ -18,11 +18,81 @@ from materia_epd.core.constants import (
 from materia_epd.resources import get_market_shares, get_indicator_synonyms
 from materia_epd.core.utils import to_float, qn_uri
 from materia_epd.io.files import read_json_file, write_xml_root, latest_flow_file
+from materia_epd.io.xml_backend import find, findall, findtext
 from materia_epd.geo.locations import ilcd_to_iso_location
 from materia_epd.core.physics import Material, check_properties_ranges
 from materia_epd.metrics.normalize import normalize_module_values
 
 
+def flow_material_kwargs(
+    uuid: str | None, units: list[dict], props: list[dict], exchange_amount: float
+) -> dict[str, float | None]:
+    """Build Material kwargs from a flow's units and MatML properties."""
+    kwargs = {
+        v: None
+        for v in set(UNIT_QUANTITY_MAPPING.values())
+        | set(UNIT_PROPERTY_MAPPING.values())
+    }
+
+    for u in units:
+        name = UNIT_QUANTITY_MAPPING.get(u.get("Unit"))
+        if name and isinstance(u.get("Amount"), (int, float)):
+            kwargs[name] = u["Amount"] * exchange_amount
+
+    for p in props:
+        name = UNIT_PROPERTY_MAPPING.get(p.get("Unit"))
+        if name and isinstance(p.get("Amount"), (int, float)):
+            kwargs[name] = p["Amount"]
+
+    return check_properties_ranges(uuid, kwargs)
+
+
+def declared_unit(flow_root: ET.Element) -> str | None:
+    """Return the quantity (e.g. 'mass') of a flow's reference flow property."""
+    ref_id = findtext(flow_root, XP.REF_TO_REF_FLOW_PROP, namespaces=NS)
+    ref_fp = next(
+        (
+            fp
+            for fp in findall(flow_root, XP.FLOW_PROPERTY, NS)
+            if fp.get(ATTR.INTERNAL_ID) == ref_id
+        ),
+        None,
+    )
+    ref = find(ref_fp, XP.REF_TO_FLOW_PROP, NS) if ref_fp is not None else None
+    if ref is None:
+        return None
+
+    uuid = ref.get(ATTR.REF_OBJECT_ID)
+
+    uuid_to_unit = {v: k for k, v in FLOW_PROPERTY_MAPPING.items()}
+    unit_symbol = uuid_to_unit.get(uuid)
+
+    return UNIT_QUANTITY_MAPPING.get(unit_symbol)
+
+
+def read_lcia_result(
+    lcia_result: ET.Element, scaling_factor: float = 1.0
+) -> dict | None:
+    """Return the canonical name and module values of one LCIAResult element."""
+    ref_method = find(lcia_result, XP.REF_TO_LCIA_METHOD, NS)
+    name = "Unknown"
+
+    if ref_method is not None:
+        for sd in findall(ref_method, XP.SHORT_DESC, NS):
+            if sd.attrib.get(ATTR.LANG) == "en":
+                name = sd.text.strip() if sd.text else "Unknown"
+                break
+
+    amount_elems = findall(lcia_result, XP.AMOUNT, NS)
+    values = normalize_module_values(amount_elems, scaling_factor=scaling_factor)
+
+    canon = next(
+        (c for c, aliases in get_indicator_synonyms().items() if name in aliases),
+        None,
+    )
+    return {"name": canon, "values": values} if canon else None
+
+
 @dataclass
 class IlcdFlow:
     root: ET.Element
@@ -33,14 +103,14 @@ class IlcdFlow:
         self._get_props()
 
     def _get_uuid(self) -> str | None:
-        node = self.root.find(XP.UUID, NS)
+        node = find(self.root, XP.UUID, NS)
         self.uuid = node.text.strip() if (node is not None and node.text) else None
 
     def _get_units(self):
         self.units = []
-        for prop in self.root.findall(XP.FLOW_PROPERTY, NS):
-            mean_value = prop.findtext(XP.MEAN_VALUE, namespaces=NS)
-            ref = prop.find(XP.REF_TO_FLOW_PROP, NS)
+        for prop in findall(self.root, XP.FLOW_PROPERTY, NS):
+            mean_value = findtext(prop, XP.MEAN_VALUE, namespaces=NS)
+            ref = find(prop, XP.REF_TO_FLOW_PROP, NS)
 
             if mean_value and ref is not None:
                 amount = mean_value
@@ -48,7 +118,7 @@ class IlcdFlow:
                 name = next(
                     (
                         desc.text
-                        for desc in ref.findall(XP.SHORT_DESC, NS)
+                        for desc in findall(ref, XP.SHORT_DESC, NS)
                         if desc.attrib.get(ATTR.LANG) == "en"
                     ),
                     None,
@@ -72,21 +142,21 @@ class IlcdFlow:
 
     def _get_props(self):
         self.props = []
-        matml = self.root.find(XP.MATML_DOC, NS)
+        matml = find(self.root, XP.MATML_DOC, NS)
 
         if matml is None:
             return
 
         amounts = {
-            pd.attrib.get(ATTR.PROPERTY): pd.findtext(XP.PROP_DATA, namespaces=NS)
-            for pd in matml.findall(XP.PROPERTY_DATA, NS)
-            if pd.attrib.get(ATTR.PROPERTY) and pd.find(XP.PROP_DATA, NS) is not None
+            pd.attrib.get(ATTR.PROPERTY): findtext(pd, XP.PROP_DATA, namespaces=NS)
+            for pd in findall(matml, XP.PROPERTY_DATA, NS)
+            if pd.attrib.get(ATTR.PROPERTY) and find(pd, XP.PROP_DATA, NS) is not None
         }
 
-        for detail in matml.findall(XP.PROPERTY_DETAILS, NS):
+        for detail in findall(matml, XP.PROPERTY_DETAILS, NS):
             prop_id = detail.attrib.get(ATTR.ID)
-            name = detail.findtext(XP.PROP_NAME, namespaces=NS)
-            unit = detail.find(XP.PROP_UNITS, NS)
+            name = findtext(detail, XP.PROP_NAME, namespaces=NS)
+            unit = find(detail, XP.PROP_UNITS, NS)
             unit_name = unit.attrib.get(ATTR.NAME) if unit is not None else None
             amount = amounts.get(prop_id)
 
@@ -100,6 +170,46 @@ class IlcdFlow:
                 )
 
 
+@dataclass
+class EPDRecord:
+    """Compact, picklable view of an EPD holding only what the pipeline reads.
+
+    LCIA values are stored unscaled; ``get_lcia_results`` applies the scaling
+    factor of the rescaled material, like ``IlcdProcess.get_lcia_results``.
+    ``rescalings`` is the ``feasible_rescalings`` bitmask of the material,
+    None where it was not computed.
+    """
+
+    uuid: str | None
+    path: Path
+    loc: str | None = None
+    hs_class: str | None = None
+    dec_unit: str | None = None
+    ref_flow_uuid: str | None = None
+    material_kwargs: dict[str, float | None] | None = None
+    lcia: list[dict] = field(default_factory=list)
+    rescalings: int | None = None
+
+    def get_ref_flow(self) -> None:
+        if self.material_kwargs is None:
+            raise ValueError(f"No reference flow available for EPD {self.uuid}")
+        self.material = Material(**self.material_kwargs)
+
+    def get_lcia_results(self) -> list[dict]:
+        scaling_factor = self.material.scaling_factor
+        self.lcia_results = [
+            {
+                "name": result["name"],
+                "values": {
+                    mod: value * scaling_factor if value is not None else None
+                    for mod, value in result["values"].items()
+                },
+            }
+            for result in self.lcia
+        ]
+        return self.lcia_results
+
+
 @dataclass
 class IlcdProcess:
     root: ET.Element
@@ -118,87 +228,48 @@ class IlcdProcess:
         loc_code = loc_node.attrib.get(ATTR.LOCATION) if loc_node is not None else None
         self.loc = ilcd_to_iso_location(loc_code) if loc_code else None
 
-    def get_ref_flow(self) -> IlcdFlow:
+    def get_ref_exchange(self) -> tuple[str, float | None]:
+        """Return the flow UUID and mean amount of the reference exchange."""
         ref_flow_id = self.root.findtext(XP.QUANT_REF, namespaces=NS).strip()
         ref_flow_exchange = self.root.find(XP.exchange_by_id(ref_flow_id), NS)
         ref_flow_uuid = ref_flow_exchange.find(XP.REF_TO_FLOW, NS).attrib.get(
             ATTR.REF_OBJECT_ID
         )
-        flows_folder = self.path.parent.parent / "flows"
-        flow_file = latest_flow_file(flows_folder, ref_flow_uuid)
-
-        self.ref_flow = IlcdFlow(root=ET.parse(flow_file).getroot())
         exchange_amount = to_float(
             ref_flow_exchange.findtext(XP.MEAN_AMOUNT, namespaces=NS), positive=True
         )
-        kwargs = {
-            v: None
-            for v in set(UNIT_QUANTITY_MAPPING.values())
-            | set(UNIT_PROPERTY_MAPPING.values())
-        }
-
-        for u in self.ref_flow.units:
-            field = UNIT_QUANTITY_MAPPING.get(u.get("Unit"))
-            if field and isinstance(u.get("Amount"), (int, float)):
-                kwargs[field] = u["Amount"] * exchange_amount
-
-        for p in self.ref_flow.props:
-            field = UNIT_PROPERTY_MAPPING.get(p.get("Unit"))
-            if field and isinstance(p.get("Amount"), (int, float)):
-                kwargs[field] = p["Amount"]
-
-        kwargs = check_properties_ranges(self.uuid, kwargs)
+        return ref_flow_uuid, exchange_amount
+
+    def get_ref_flow(self, flow_root: ET.Element | None = None) -> IlcdFlow:
+        """Read the reference flow, from the flows folder unless ``flow_root``."""
+        ref_flow_uuid, exchange_amount = self.get_ref_exchange()
+        if flow_root is None:
+            flows_folder = self.path.parent.parent / "flows"
+            flow_file = latest_flow_file(flows_folder, ref_flow_uuid)
+            flow_root = ET.parse(flow_file).getroot()
+
+        self.ref_flow = IlcdFlow(root=flow_root)
+        kwargs = flow_material_kwargs(
+            self.uuid, self.ref_flow.units, self.ref_flow.props, exchange_amount
+        )
 
         self.material_kwargs = kwargs
         self.material = Material(**kwargs)
 
     def get_declared_unit(self) -> str | None:
-        ref_id = self.ref_flow.root.find(XP.REF_TO_REF_FLOW_PROP, NS).text
-
-        flow_props = self.ref_flow.root.find(XP.FLOW_PROPERTIES, NS)
-        for fp in flow_props.findall(XP.FLOW_PROPERTY, NS):
-            if fp.get(ATTR.INTERNAL_ID) == ref_id:
-                ref_fp = fp
-                break
-
-        ref = ref_fp.find(XP.REF_TO_FLOW_PROP, NS)
-        uuid = ref.get(ATTR.REF_OBJECT_ID)
+        self.dec_unit = declared_unit(self.ref_flow.root)
 
-        uuid_to_unit = {v: k for k, v in FLOW_PROPERTY_MAPPING.items()}
-        unit_symbol = uuid_to_unit.get(uuid)
-
-        self.dec_unit = UNIT_QUANTITY_MAPPING.get(unit_symbol)
-
-    def get_lcia_results(self) -> list[dict]:
+    def get_lcia_results(self, scaling_factor: float | None = None) -> list[dict]:
+        if scaling_factor is None:
+            scaling_factor = self.material.scaling_factor
         results = []
-
         for lcia_result in self.root.findall(XP.LCIA_RESULT, NS):
-            ref_method = lcia_result.find(XP.REF_TO_LCIA_METHOD, NS)
-            name = "Unknown"
-
-            if ref_method is not None:
-                for sd in ref_method.findall(XP.SHORT_DESC, NS):
-                    if sd.attrib.get(ATTR.LANG) == "en":
-                        name = sd.text.strip() if sd.text else "Unknown"
-                        break
-
-            amount_elems = lcia_result.findall(XP.AMOUNT, NS)
-            values = normalize_module_values(
-                amount_elems, scaling_factor=self.material.scaling_factor
-            )
-
-            canon = next(
-                (
-                    c
-                    for c, aliases in get_indicator_synonyms().items()
-                    if name in aliases
-                ),
-                None,
-            )
-            if canon:
-                results.append({"name": canon, "values": values})
+            result = read_lcia_result(lcia_result, scaling_factor)
+            if result is not None:
+                results.append(result)
 
         self.lcia_results = results
+        return results
 
     def get_hs_class(self) -> str:
         hs_node = self.root.find(XP.HS_CLASSIFICATION, NS)
@@ -1,20 +1,57 @@
 from __future__ import annotations
 
+import contextlib
+import io
+import shutil
+import sys
+import time
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
 from pathlib import Path
+from typing import Container, Iterable, Iterator
 
 from materia_epd.epd.models import IlcdProcess
-from materia_epd.epd.filters import UUIDFilter, UnitConformityFilter, LocationFilter
-from materia_epd.geo.locations import escalate_location_set
-from materia_epd.metrics.averaging import (
-    average_impacts,
-    weighted_averages,
-    average_material_properties,
+from materia_epd.epd.corpus import EPDCorpus, load_corpus
+from materia_epd.epd.extract import FLOW_CACHE
+from materia_epd.epd.index import EPDIndex
+from materia_epd.epd.manifest import (
+    RunJournal,
+    RunManifest,
+    input_fingerprints,
+    output_files,
 )
+from materia_epd.epd.matches import dependent_processes
+from materia_epd.epd.filters import (
+    FILTER_STATS,
+    EPDFilter,
+    LocationFilter,
+    UUIDFilter,
+    UnitConformityFilter,
+    by_cost,
+    merge_filter_stats,
+    record_stage,
+)
+from materia_epd.geo.locations import escalate_location_set, get_location_hierarchy
+from materia_epd.metrics.averaging import average_material_properties
 from materia_epd.core.physics import Material
 from materia_epd.core.errors import NoMatchingEPDError
-from materia_epd.core.constants import MASS_KWARGS, ICONS
+from materia_epd.core.constants import (
+    FLOW_CACHE_SIZE,
+    ICONS,
+    LOCATION_ESCALATIONS,
+    MARKET_CACHE_SIZE,
+    MASS_KWARGS,
+    NS,
+    XP,
+)
 from materia_epd.core.utils import print_progress, copy_except_folders
+from materia_epd.resources import MARKET_CACHE
+
+
+SKIPPED_UNCHANGED = "unchanged, skipped"
+SKIPPED_DONE = "done in the previous run, skipped"
 
 
 def gen_xml_objects(folder_path):
@@ -26,12 +63,17 @@ def gen_xml_objects(folder_path):
         raise ValueError("Not a file/folder path")
 
     for xml_file in folder.glob("*.xml"):
-        try:
-            tree = ET.parse(xml_file)
-            root = tree.getroot()
+        root = read_xml_object(xml_file)
+        if root is not None:
             yield xml_file, root
-        except Exception as e:
-            print(f"❌ Error reading {xml_file.name}: {e}")
+
+
+def read_xml_object(xml_file: Path) -> ET.Element | None:
+    try:
+        return ET.parse(xml_file).getroot()
+    except Exception as e:
+        print(f"❌ Error reading {xml_file.name}: {e}")
+        return None
 
 
 def gen_epds(folder_path):
@@ -40,12 +82,18 @@ def gen_epds(folder_path):
 
 
 def gen_filtered_epds(epds, filters):
+    filters = by_cost(filters)
     for epd in epds:
-        if all(filt.matches(epd) for filt in filters):
+        if all(filt.check(epd) for filt in filters):
             yield epd
 
 
-def gen_locfiltered_epds(epd_roots, filters, max_attempts=4):
+def unchecked_filters(filters: Iterable[EPDFilter]) -> list[EPDFilter]:
+    """Filters still to check on candidates, once corpora answered UUID filters."""
+    return [filt for filt in filters if not isinstance(filt, UUIDFilter)]
+
+
+def gen_locfiltered_epds(epd_roots, filters, max_attempts=LOCATION_ESCALATIONS):
     filters = [f for f in filters if isinstance(f, LocationFilter)]
     wanted_locations = set()
     for filt in filters:
@@ -60,8 +108,38 @@ def gen_locfiltered_epds(epd_roots, filters, max_attempts=4):
     raise NoMatchingEPDError(filters)
 
 
-def epd_pipeline(process: IlcdProcess, path_to_epd_folder: Path):
-    epds = gen_epds(path_to_epd_folder)
+def group_by_location(epds: Iterable) -> dict[str | None, list[int]]:
+    """Map each EPD location to the positions of its EPDs, in order."""
+    by_location: dict[str | None, list[int]] = {}
+    for i, epd in enumerate(epds):
+        by_location.setdefault(epd.loc, []).append(i)
+    return by_location
+
+
+def located_epds(
+    by_location: dict[str | None, list[int]],
+    locations: Iterable[str],
+    max_attempts: int = LOCATION_ESCALATIONS,
+) -> list[int]:
+    """Positions of the EPDs in some locations, escalating like gen_locfiltered_epds.
+
+    The buckets of ``group_by_location`` are merged instead of scanning the
+    EPDs again, and the escalated location sets come from the cached ladders
+    of the location hierarchy.
+    """
+    ladder = get_location_hierarchy().ladder(locations)
+    for wanted_locations in islice(ladder, max_attempts):
+        positions = sorted(
+            i for loc in wanted_locations for i in by_location.get(loc, ())
+        )
+        if positions:
+            return positions
+    raise NoMatchingEPDError([LocationFilter(set(next(ladder)))])
+
+
+def epd_pipeline(process: IlcdProcess, corpus: EPDCorpus | EPDIndex | Path):
+    if isinstance(corpus, Path):
+        corpus = EPDCorpus.from_folder(corpus)
 
     filters = []
     if process.matches:
@@ -69,7 +147,9 @@ def epd_pipeline(process: IlcdProcess, path_to_epd_folder: Path):
     if process.material_kwargs:
         filters.append(UnitConformityFilter(process.material_kwargs))
 
-    filtered_epds = list(gen_filtered_epds(epds, filters))
+    filtered_epds = list(
+        gen_filtered_epds(corpus.candidates(filters), unchecked_filters(filters))
+    )
 
     if len(filtered_epds) == 0:
         print_progress(
@@ -83,60 +163,318 @@ def epd_pipeline(process: IlcdProcess, path_to_epd_folder: Path):
         process.dec_unit = "mass"
         filters = [f for f in filters if not isinstance(f, UnitConformityFilter)]
         filters.append(UnitConformityFilter(process.material_kwargs))
-        epds = gen_epds(path_to_epd_folder)
-        filtered_epds = list(gen_filtered_epds(epds, filters))
+        filtered_epds = list(
+            gen_filtered_epds(corpus.candidates(filters), unchecked_filters(filters))
+        )
 
+    process.used_epd_uuids = list(dict.fromkeys(epd.uuid for epd in filtered_epds))
     if len(filtered_epds) == 0:
         return None, None
 
-    for epd in filtered_epds:
-        # print(epd.uuid)
-        # print(epd.material.to_dict())
-        epd.get_lcia_results()
+    impacts = corpus.lcia_tensor(filtered_epds)
 
     avg_properties = average_material_properties(filtered_epds)
     mat = Material(**avg_properties)
     mat.rescale(process.material_kwargs)
     avg_properties = mat.to_dict()
 
+    start = time.perf_counter()
+    by_location = group_by_location(filtered_epds)
     market_epds = {
-        country: list(gen_locfiltered_epds(filtered_epds, [LocationFilter({country})]))
-        for country in process.market
-    }
-
-    market_impacts = {
-        country: average_impacts([epd.lcia_results for epd in epds])
-        for country, epds in market_epds.items()
+        country: located_epds(by_location, {country}) for country in process.market
     }
+    record_stage(
+        "Location selection",
+        len(filtered_epds) * len(market_epds),
+        sum(len(positions) for positions in market_epds.values()),
+        time.perf_counter() - start,
+    )
 
-    avg_gwps = weighted_averages(process.market, market_impacts)
+    avg_gwps = impacts.weighted_average(process.market, market_epds)
     return avg_properties, avg_gwps
 
 
-def run_materia(path_to_gen_folder: Path, path_to_epd_folder: Path, output_path: Path):
-    exclude = ["processes", "processes_old", "flows"]
-    copy_except_folders(path_to_gen_folder, output_path, exclude)
+@dataclass
+class ProcessResult:
+    """Aggregated results of one generic process, as ``compute`` yields them."""
 
-    for path, root in gen_xml_objects(path_to_gen_folder / "processes"):
-        process = IlcdProcess(root=root, path=path)
-        process.get_ref_flow()
-        process.get_declared_unit()
-        process.get_hs_class()
-        process.get_market()
-        process.get_matches()
+    uuid: str | None
+    avg_properties: dict | None
+    avg_gwps: dict | None
+    used_epd_uuids: list[str] = field(default_factory=list)
+
+
+def compute(
+    path_to_gen_folder: Path | str,
+    path_to_epd_folder: Path | str,
+    workers: int = 1,
+    corpus: EPDCorpus | EPDIndex | None = None,
+    index_path: Path | str | None = None,
+) -> Iterator[ProcessResult]:
+    """Aggregate the matched generic processes of a folder without writing.
+
+    Results are yielded one process at a time, in folder order, and nothing
+    is copied or written to an output tree. Processes that cannot be
+    completed yield None properties and impacts.
+    """
+    if corpus is None:
+        corpus = load_corpus(path_to_epd_folder, workers=workers, index_path=index_path)
+    for path, root in gen_xml_objects(Path(path_to_gen_folder) / "processes"):
+        process = load_generic_process(path, root)
         if process.matches:
+            avg_properties, avg_gwps = epd_pipeline(process, corpus)
+            yield ProcessResult(
+                process.uuid, avg_properties, avg_gwps, process.used_epd_uuids
+            )
+
+
+def read_generic_process(path: Path, root: ET.Element) -> IlcdProcess:
+    """Read a generic process as far as its input fingerprints need.
+
+    Its reference flow is left for ``read_reference_flow``, so processes
+    whose outputs are up to date never parse theirs.
+    """
+    process = IlcdProcess(root=root, path=path)
+    process.get_hs_class()
+    process.get_market()
+    process.get_matches()
+    return process
+
+
+def read_reference_flow(process: IlcdProcess) -> IlcdProcess:
+    process.get_ref_flow()
+    process.get_declared_unit()
+    return process
+
+
+def load_generic_process(path: Path, root: ET.Element) -> IlcdProcess:
+    return read_reference_flow(read_generic_process(path, root))
+
+
+def write_results(
+    process: IlcdProcess,
+    avg_properties: dict | None,
+    avg_gwps: dict | None,
+    output_path: Path,
+) -> list[str]:
+    """Write the results of a generic process; return the files written."""
+    if avg_properties is None and avg_gwps is None:
+        print_progress(
+            process.uuid, "cannot be completed", ICONS.ERROR, overwrite=False
+        )
+        return []
+    process.material = Material(**avg_properties)
+    process.write_process(avg_gwps, output_path)
+    process.write_flow(avg_properties, output_path)
+    print_progress(process.uuid, "completed", ICONS.SUCCESS, overwrite=False)
+    return output_files(process)
+
+
+def gen_generic_processes(
+    folder: Path,
+    corpus: EPDCorpus | EPDIndex,
+    manifest: RunManifest,
+    force: bool = False,
+    done: Container[str] = (),
+    uuids: Container[str] | None = None,
+):
+    """Yield (uuid, process, inputs, skipped) for each matched generic process.
+
+    Processes are read by ``read_generic_process``, without their reference
+    flow.
+    ``skipped`` tells why a process needs no computing, None if it does: its
+    UUID is in ``done``, in which case it is not even loaded, or its outputs
+    are up to date with its input fingerprints. Given ``uuids``, other
+    processes are left out.
+    """
+    for path, root in gen_xml_objects(folder):
+        uuid = (root.findtext(XP.UUID, namespaces=NS) or "").strip() or None
+        if uuids is not None and uuid not in uuids:
+            continue
+        if uuid in done:
+            yield uuid, None, None, SKIPPED_DONE
+            continue
+        process = read_generic_process(path, root)
+        if process.matches:
+            inputs = input_fingerprints(process, corpus)
+            current = not force and manifest.is_current(process.uuid, inputs)
+            yield process.uuid, process, inputs, SKIPPED_UNCHANGED if current else None
+
+
+_job_corpus: EPDCorpus | EPDIndex | None = None
+
+
+def _init_job(
+    corpus: EPDCorpus | Path,
+    workers: int = 1,
+    flow_cache_size: int = FLOW_CACHE_SIZE,
+    market_cache_size: int = MARKET_CACHE_SIZE,
+) -> None:
+    """Take over the corpus of the parent: an EPDCorpus, or the path of its index.
+
+    The cache sizes of the parent are applied too, as workers started by
+    spawn re-import the modules and would use the defaults.
+    """
+    global _job_corpus
+    FLOW_CACHE.maxsize = flow_cache_size
+    MARKET_CACHE.maxsize = market_cache_size
+    _job_corpus = (
+        EPDIndex(corpus, workers=workers) if isinstance(corpus, Path) else corpus
+    )
+
+
+def _run_job(path: Path):
+    """Run the pipeline of one generic process in a worker.
+
+    Whatever it prints is captured and handed back with the process and its
+    results, or the error it raised, its filter statistics and the hits and
+    misses of its flow cache, for the parent to replay, write and sum up.
+    """
+    FILTER_STATS.clear()
+    flows = FLOW_CACHE.cache_info()
+    process = results = error = None
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        try:
+            process = load_generic_process(path, read_xml_object(path))
             print_progress(process.uuid, "processing", ICONS.HOURGLASS, overwrite=True)
-            avg_properties, avg_gwps = epd_pipeline(
-                process, path_to_epd_folder / "processes"
+            results = epd_pipeline(process, _job_corpus)
+        except Exception as e:
+            error = e
+    flow_counts = (FLOW_CACHE.hits - flows.hits, FLOW_CACHE.misses - flows.misses)
+    return process, results, log.getvalue(), error, dict(FILTER_STATS), flow_counts
+
+
+def _copy_matches(
+    path_to_gen_folder: Path, output_path: Path, uuids: Iterable[str]
+) -> None:
+    """Copy the matches files of some generic processes to the output."""
+    target = Path(output_path) / "matches"
+    for uuid in uuids:
+        source = Path(path_to_gen_folder) / "matches" / f"{uuid}.json"
+        if source.is_file():
+            target.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(source, target / source.name)
+
+
+def run_materia(
+    path_to_gen_folder: Path,
+    path_to_epd_folder: Path,
+    output_path: Path,
+    workers: int = 1,
+    jobs: int = 1,
+    force: bool = False,
+    resume: bool = False,
+    uuids: Container[str] | None = None,
+    corpus: EPDCorpus | EPDIndex | None = None,
+    index_path: Path | None = None,
+):
+    """Aggregate every generic process of a folder and write the results.
+
+    Processes whose input fingerprints match the manifest of ``output_path``
+    keep their previous outputs unless ``force`` is set. Each finished
+    process is appended to the run journal; with ``resume`` the processes
+    journaled by the previous run are skipped. With ``jobs`` > 1 generic
+    processes run in that many worker processes. Results are written and
+    console output is printed by this process in folder order, so both are
+    the same as with a single job. Given ``uuids``, only those generic
+    processes are computed and written, along with their matches files; the
+    other outputs are left as they are and the journal is appended to, so
+    that an interrupted full run can still be resumed. An already loaded
+    ``corpus`` of ``path_to_epd_folder`` may be passed in to be reused;
+    otherwise it is loaded from ``index_path``, if given.
+    FILTER_STATS is reset first, so it holds the statistics of this run only.
+    The flow cache hits and misses of job workers are added to FLOW_CACHE.
+    """
+    FILTER_STATS.clear()
+    if uuids is None:
+        exclude = ["processes", "processes_old", "flows"]
+        copy_except_folders(path_to_gen_folder, output_path, exclude)
+    else:
+        _copy_matches(path_to_gen_folder, output_path, uuids)
+    if corpus is None:
+        corpus = load_corpus(path_to_epd_folder, workers=workers, index_path=index_path)
+    manifest = RunManifest(output_path)
+    journal = RunJournal(output_path, resume=resume, append=uuids is not None)
+    tasks = gen_generic_processes(
+        path_to_gen_folder / "processes",
+        corpus,
+        manifest,
+        force,
+        journal.done,
+        uuids,
+    )
+
+    pool = None
+    try:
+        if jobs > 1:
+            # Workers read the processes themselves; only their paths are kept.
+            tasks = [
+                (uuid, process and process.path, inputs, skipped)
+                for uuid, process, inputs, skipped in tasks
+            ]
+            shared = corpus.db_path if isinstance(corpus, EPDIndex) else corpus
+            pool = ProcessPoolExecutor(
+                jobs,
+                initializer=_init_job,
+                initargs=(shared, workers, FLOW_CACHE.maxsize, MARKET_CACHE.maxsize),
             )
-            if avg_properties is None and avg_gwps is None:
-                print_progress(
-                    process.uuid, "cannot be completed", ICONS.ERROR, overwrite=False
-                )
+            done = pool.map(_run_job, [t[1] for t in tasks if t[3] is None])
+
+        for uuid, process, inputs, skipped in tasks:
+            if skipped is not None:
+                print_progress(uuid, skipped, ICONS.SKIP, overwrite=False)
+                if skipped == SKIPPED_UNCHANGED:
+                    journal.record(uuid, "unchanged")
+                continue
+            if pool is None:
+                print_progress(uuid, "processing", ICONS.HOURGLASS, overwrite=True)
+                results = epd_pipeline(read_reference_flow(process), corpus)
             else:
-                process.material = Material(**avg_properties)
-                process.write_process(avg_gwps, output_path)
-                process.write_flow(avg_properties, output_path)
-                print_progress(
-                    process.uuid, "completed", ICONS.SUCCESS, overwrite=False
-                )
+                process, results, log, error, stats, flow_counts = next(done)
+                sys.stdout.write(log)
+                merge_filter_stats(stats)
+                FLOW_CACHE.add_counts(*flow_counts)
+                if error is not None:
+                    raise error
+            outputs = write_results(process, *results, output_path)
+            manifest.record(uuid, inputs, outputs)
+            journal.record(uuid, "completed" if outputs else "incomplete")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        journal.close()
+        manifest.save()
+
+
+def recompute_materia(
+    path_to_gen_folder: Path,
+    path_to_epd_folder: Path,
+    output_path: Path,
+    changed_epds: Iterable[str],
+    workers: int = 1,
+    jobs: int = 1,
+    index_path: Path | None = None,
+) -> set[str]:
+    """Recompute only the generic processes matched to some changed EPDs.
+
+    The affected processes are found by reversing the matches files; their
+    outputs are rewritten and every other output is left as it is. Returns
+    the UUIDs of the affected processes.
+    """
+    affected = dependent_processes(path_to_gen_folder / "matches", changed_epds)
+    if not affected:
+        print(f"{ICONS.WARNING} No generic process is matched to the changed EPDs.")
+        return affected
+    print(f"{ICONS.HOURGLASS} Recomputing {len(affected)} generic processes.")
+    run_materia(
+        path_to_gen_folder,
+        path_to_epd_folder,
+        output_path,
+        workers=workers,
+        jobs=jobs,
+        force=True,
+        uuids=affected,
+        index_path=index_path,
+    )
+    return affected
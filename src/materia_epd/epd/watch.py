@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+
+from materia_epd.core.constants import ICONS, WATCH_INTERVAL
+from materia_epd.epd.corpus import load_corpus
+from materia_epd.epd.extract import file_uuid
+from materia_epd.epd.index import EPDIndex
+from materia_epd.epd.matches import dependent_processes
+from materia_epd.epd.models import IlcdProcess
+from materia_epd.epd.pipeline import gen_xml_objects, run_materia
+from materia_epd.io.xml_backend import PARSE_ERRORS
+
+Snapshot = dict[str, dict[Path, tuple[int, int]]]
+
+
+def scan_folder(folder: Path, suffix: str) -> dict[Path, tuple[int, int]]:
+    """Map each file of a folder with the given suffix to its (mtime_ns, size)."""
+    if not folder.is_dir():
+        return {}
+    with os.scandir(folder) as entries:
+        return {
+            Path(entry.path): (stat.st_mtime_ns, stat.st_size)
+            for entry in entries
+            if entry.name.endswith(suffix) and entry.is_file()
+            for stat in (entry.stat(),)
+        }
+
+
+def _flow_uuid(path: Path) -> str:
+    return path.name[:-4].split("_", 1)[0]
+
+
+def _uuids(paths) -> set[str]:
+    uuids = set()
+    for path in paths:
+        try:
+            uuids.add(file_uuid(path))
+        except (OSError, *PARSE_ERRORS):
+            continue
+    return uuids - {None}
+
+
+class Watcher:
+    """Recompute the generic processes affected by edits to their input folders.
+
+    The EPD corpus is loaded once and kept in memory. Each ``poll`` compares
+    the files of the generic processes/, flows/ and matches/ folders and of
+    the EPD processes/ and flows/ folders with the previous poll, refreshes
+    the corpus and rewrites the outputs of the generic processes that use a
+    changed file. A poll that fails is reported and its processes are tried
+    again on the next one.
+    """
+
+    def __init__(
+        self,
+        gen_folder: Path | str,
+        epd_folder: Path | str,
+        output_path: Path | str,
+        workers: int = 1,
+        index_path: Path | str | None = None,
+    ):
+        self.gen_folder = Path(gen_folder)
+        self.epd_folder = Path(epd_folder)
+        self.output_path = Path(output_path)
+        self.folders = {
+            "processes": (self.gen_folder / "processes", ".xml"),
+            "flows": (self.gen_folder / "flows", ".xml"),
+            "matches": (self.gen_folder / "matches", ".json"),
+            "epd_processes": (self.epd_folder / "processes", ".xml"),
+            "epd_flows": (self.epd_folder / "flows", ".xml"),
+        }
+        self.corpus = load_corpus(
+            self.epd_folder, workers=workers, index_path=index_path
+        )
+        self.snapshot = self._scan()
+        self.pending: set[str] = set()
+
+    def _scan(self) -> Snapshot:
+        return {
+            name: scan_folder(folder, suffix)
+            for name, (folder, suffix) in self.folders.items()
+        }
+
+    def run(self) -> None:
+        """Bring every output up to date, skipping unchanged processes."""
+        run_materia(
+            self.gen_folder, self.epd_folder, self.output_path, corpus=self.corpus
+        )
+
+    def changes(self) -> dict[str, set[Path]]:
+        """Return the files added, changed or removed since the previous call."""
+        snapshot, previous = self._scan(), self.snapshot
+        self.snapshot = snapshot
+        return {
+            name: {
+                path
+                for path in files.keys() | previous[name].keys()
+                if files.get(path) != previous[name].get(path)
+            }
+            for name, files in snapshot.items()
+        }
+
+    def affected(self, changes: dict[str, set[Path]]) -> set[str]:
+        """Refresh the corpus and return the generic processes to recompute."""
+        flow_uuids = {_flow_uuid(path) for path in changes["epd_flows"]}
+        if isinstance(self.corpus, EPDIndex):
+            self.corpus.refresh(self.epd_folder)
+            epd_uuids = self.corpus.uuids_using_flows(flow_uuids)
+        else:
+            epd_uuids = self.corpus.uuids_using_flows(flow_uuids)
+            self.corpus.refresh(changes["epd_processes"], flow_uuids)
+        epd_uuids |= _uuids(changes["epd_processes"])
+
+        affected = _uuids(changes["processes"])
+        affected |= {path.stem for path in changes["matches"]}
+        affected |= dependent_processes(self.gen_folder / "matches", epd_uuids)
+        gen_flows = {_flow_uuid(path) for path in changes["flows"]}
+        if gen_flows:
+            for path, root in gen_xml_objects(self.folders["processes"][0]):
+                process = IlcdProcess(root=root, path=path)
+                try:
+                    if process.get_ref_exchange()[0] in gen_flows:
+                        affected.add(process.uuid)
+                except AttributeError:
+                    continue
+        return affected
+
+    def poll(self) -> set[str]:
+        """Recompute what changed since the previous poll; return the UUIDs.
+
+        Errors are printed rather than raised. The changes a failed poll
+        could not read are looked at again on the next poll, and processes
+        that failed to recompute stay pending until the next change, e.g.
+        until a half-saved file is saved in full.
+        """
+        previous = self.snapshot
+        try:
+            changes = self.changes()
+            if not any(changes.values()):
+                return set()
+            self.pending |= self.affected(changes)
+        except Exception as e:
+            self.snapshot = previous
+            print(f"{ICONS.ERROR} Error reading changes: {e}")
+            return set()
+        affected = set(self.pending)
+        if not affected:
+            return affected
+        print(f"{ICONS.HOURGLASS} Recomputing {len(affected)} generic processes.")
+        try:
+            run_materia(
+                self.gen_folder,
+                self.epd_folder,
+                self.output_path,
+                force=True,
+                uuids=affected,
+                corpus=self.corpus,
+            )
+        except Exception as e:
+            print(f"{ICONS.ERROR} {type(e).__name__}: {e}")
+            print(f"{ICONS.WARNING} Retrying after the next change.")
+            return set()
+        self.pending -= affected
+        return affected
+
+    def watch(self, interval: float = WATCH_INTERVAL, polls: int | None = None):
+        """Run once, then poll every ``interval`` seconds until interrupted."""
+        try:
+            self.run()
+        except Exception as e:
+            print(f"{ICONS.ERROR} {type(e).__name__}: {e}")
+        print(f"{ICONS.SUCCESS} Watching for changes every {interval:g}s.")
+        count = 0
+        try:
+            while polls is None or count < polls:
+                time.sleep(interval)
+                self.poll()
+                count += 1
+        except KeyboardInterrupt:
+            print(f"{ICONS.SUCCESS} Stopped watching.")
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+from materia_epd.core.constants import (
+    GEO_BUNDLE_FILENAME,
+    GEO_BUNDLE_VERSION,
+    ILCD_LOCATION_ALIASES,
+)
+from materia_epd.io import files as io_files
+
+
+def package_data_folder() -> Path:
+    return Path(__file__).resolve().parent.parent / "data"
+
+
+def iso_alpha3_table() -> dict[str, str]:
+    """Map every alpha-2 code pycountry knows to the alpha-3 code it resolves to.
+
+    Current countries take precedence over historic ones, as in
+    ``ilcd_to_iso_location``.
+    """
+    import pycountry
+
+    codes = {c.alpha_2 for c in pycountry.countries} | {
+        c.alpha_2 for c in pycountry.historic_countries if hasattr(c, "alpha_2")
+    }
+    table = {}
+    for code in sorted(codes):
+        alpha_3 = getattr(
+            pycountry.countries.get(alpha_2=code), "alpha_3", None
+        ) or getattr(pycountry.historic_countries.get(alpha_2=code), "alpha_3", None)
+        if alpha_3:
+            table[code] = alpha_3
+    return table
+
+
+def build_geo_bundle(data_folder: Path | str | None = None) -> dict:
+    """Gather the location files, regions mapping, ILCD aliases and the
+    alpha-2 to alpha-3 table in one dict."""
+    data_folder = Path(data_folder) if data_folder else package_data_folder()
+    locations = {
+        Path(path).stem: data
+        for path, data in io_files.gen_json_objects(data_folder / "locations")
+    }
+    regions = io_files.read_json_file(data_folder / "regions_mapping.json")
+    if not locations or regions is None:
+        raise ValueError(f"No location data found in {data_folder}")
+    return {
+        "version": GEO_BUNDLE_VERSION,
+        "aliases": dict(sorted(ILCD_LOCATION_ALIASES.items())),
+        "regions": regions,
+        "countries": iso_alpha3_table(),
+        "locations": dict(sorted(locations.items())),
+    }
+
+
+def write_geo_bundle(
+    data_folder: Path | str | None = None, path: Path | str | None = None
+) -> Path:
+    """Write the bundle of ``data_folder`` as compact JSON; return its path.
+
+    It goes to ``GEO_BUNDLE_FILENAME`` in the data folder unless ``path`` is
+    given, and replaces the previous bundle atomically.
+    """
+    data_folder = Path(data_folder) if data_folder else package_data_folder()
+    path = Path(path) if path else data_folder / GEO_BUNDLE_FILENAME
+    bundle = build_geo_bundle(data_folder)
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_text(
+        json.dumps(bundle, ensure_ascii=False, separators=(",", ":")) + "\n",
+        encoding="utf-8",
+    )
+    os.replace(tmp, path)
+    return path
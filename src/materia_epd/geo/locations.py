@@ -1,16 +1,42 @@
-import pycountry
+from __future__ import annotations
 
-from materia_epd.resources import get_location_data
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator
+
+from materia_epd.core.constants import LOCATION_ESCALATIONS
+from materia_epd.resources import get_geo_bundle, get_location_data
 from materia_epd.resources import get_regions_mapping
 
 
+# Imported on the first code missing from the bundled alpha-2 table.
+pycountry = None
+
+
+def _pycountry():
+    global pycountry
+    if pycountry is None:
+        import pycountry as module
+
+        pycountry = module
+    return pycountry
+
+
 def ilcd_to_iso_location(ilcd_code):
-    """Convert an ILCD location code to an ISO-compliant location code."""
+    """Convert an ILCD location code to an ISO-compliant location code.
+
+    Country codes are looked up in the table bundled with the package;
+    pycountry is only consulted for codes that table does not know.
+    """
+    bundle = get_geo_bundle()
     return (
-        {"GLO": "GLO", "UK": "GBR"}.get(ilcd_code)
+        bundle["aliases"].get(ilcd_code)
         or (get_regions_mapping().get(ilcd_code) or {}).get("Regions")
-        or getattr(pycountry.countries.get(alpha_2=ilcd_code), "alpha_3", None)
-        or getattr(pycountry.historic_countries.get(alpha_2=ilcd_code), "alpha_3", None)
+        or bundle["countries"].get(ilcd_code)
+        or getattr(_pycountry().countries.get(alpha_2=ilcd_code), "alpha_3", None)
+        or getattr(
+            _pycountry().historic_countries.get(alpha_2=ilcd_code), "alpha_3", None
+        )
     )
 
 
@@ -27,3 +53,60 @@ def escalate_location_set(location_set):
         for parent in {get_location_attribute(loc, "Parent") for loc in location_set}
         for child in (get_location_attribute(parent, "Children") or [])
     }
+
+
+class LocationHierarchy:
+    """Parents, children and classes of all bundled locations, held in memory.
+
+    ``escalate`` gives the same sets as ``escalate_location_set`` with
+    dictionary lookups, and remembers them: the escalation ladder of every
+    location is climbed ``LOCATION_ESCALATIONS`` steps when the hierarchy is built,
+    other location sets as they are first escalated. Unknown codes raise
+    ValueError, as ``get_location_data`` does.
+    """
+
+    def __init__(self, locations: dict[str, dict]):
+        self.parents = {code: data.get("Parent") for code, data in locations.items()}
+        self.children = {
+            code: tuple(data.get("Children") or ()) for code, data in locations.items()
+        }
+        self.classes = {code: data.get("Class") for code, data in locations.items()}
+        self._escalated: dict[frozenset[str], frozenset[str]] = {}
+        for code in self.parents:
+            for _ in islice(self.ladder({code}), LOCATION_ESCALATIONS + 1):
+                pass
+
+    @classmethod
+    def from_package(cls) -> "LocationHierarchy":
+        return cls(get_geo_bundle()["locations"])
+
+    def _check(self, code: str) -> str:
+        if code not in self.parents:
+            raise ValueError(f"Invalid or missing JSON file: locations/{code}.json")
+        return code
+
+    def escalate(self, locations: Iterable[str]) -> frozenset[str]:
+        """Return all children of the parents of some locations."""
+        locations = frozenset(locations)
+        escalated = self._escalated.get(locations)
+        if escalated is None:
+            parents = {self.parents[self._check(loc)] for loc in locations}
+            escalated = frozenset(
+                child
+                for parent in parents
+                for child in self.children[self._check(parent)]
+            )
+            self._escalated[locations] = escalated
+        return escalated
+
+    def ladder(self, locations: Iterable[str]) -> Iterator[frozenset[str]]:
+        """Yield ``locations``, then each of their successive escalations."""
+        rung = frozenset(locations)
+        while True:
+            yield rung
+            rung = self.escalate(rung)
+
+
+@lru_cache(maxsize=1)
+def get_location_hierarchy() -> LocationHierarchy:
+    return LocationHierarchy.from_package()
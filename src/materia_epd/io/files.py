@@ -1,7 +1,9 @@
+import hashlib
 import json
+import os
 from pathlib import Path
 import xml.etree.ElementTree as ET
-from materia_epd.core.utils import sort_key
+from materia_epd.core.utils import _extract_version
 
 
 def read_json_file(path):
@@ -23,6 +25,34 @@ def write_json_file(path, data) -> bool:
         return False
 
 
+def file_digest(path: Path | str | None) -> str | None:
+    """Return the SHA-256 of a file's content, None if there is no such file.
+
+    The file is hashed in chunks, so its content is never held in memory whole.
+    """
+    if path is None:
+        return None
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+    except (FileNotFoundError, IsADirectoryError):
+        return None
+    return digest.hexdigest()
+
+
+def folder_file_key(path: Path | str) -> str:
+    """Name a file by its folder and file name, e.g. "processes/{uuid}.xml".
+
+    Unlike the full path, the key is the same however the EPD folder was
+    spelled, relative or absolute, so fingerprints built from it compare
+    equal across runs.
+    """
+    path = Path(path)
+    return f"{path.parent.name}/{path.name}"
+
+
 def read_xml_root(path: Path | str):
     try:
         return ET.parse(path).getroot()
@@ -59,13 +89,70 @@ def gen_xml_objects(folder_path):
             yield file, root
 
 
+class FlowResolver:
+    """Resolve flow UUIDs to their latest file from one listing of a flows folder.
+
+    Files are grouped by the UUID their name starts with ({uuid}.xml,
+    {uuid}_version1.0.2.xml, ...) and the latest one of each is picked while
+    listing. The folder is listed again whenever its mtime changes, and once
+    more before a UUID is reported missing, since coarse directory timestamps
+    may not change when a flow is added during a run.
+    """
+
+    def __init__(self, folder: Path | str):
+        self.folder = Path(folder)
+        self._latest: dict[str, tuple[tuple, Path]] = {}
+        self._mtime_ns: int | None = None
+
+    def _scan(self) -> None:
+        try:
+            self._mtime_ns = os.stat(self.folder).st_mtime_ns
+        except FileNotFoundError:
+            self._mtime_ns, self._latest = None, {}
+            return
+        latest: dict[str, tuple[tuple, Path]] = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".xml"):
+                    continue
+                uuid = entry.name[:-4].split("_", 1)[0]
+                version = _extract_version(entry.name)
+                key = (version is not None, version or (), entry.stat().st_mtime)
+                if uuid not in latest or key > latest[uuid][0]:
+                    latest[uuid] = (key, Path(entry.path))
+        self._latest = latest
+
+    def resolve(self, uuid: str) -> Path:
+        try:
+            mtime_ns = os.stat(self.folder).st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        scanned = mtime_ns != self._mtime_ns
+        if scanned:
+            self._scan()
+        if uuid not in self._latest and not scanned:
+            self._scan()
+        if uuid not in self._latest:
+            raise FileNotFoundError(
+                f"No flow file found for uuid={uuid} in {self.folder}"
+            )
+        return self._latest[uuid][1]
+
+
+_FLOW_RESOLVERS: dict[Path, FlowResolver] = {}
+
+
+def flow_resolver(flows_folder: Path | str) -> FlowResolver:
+    """Return the shared resolver of a flows folder."""
+    folder = Path(flows_folder)
+    if folder not in _FLOW_RESOLVERS:
+        _FLOW_RESOLVERS[folder] = FlowResolver(folder)
+    return _FLOW_RESOLVERS[folder]
+
+
 def latest_flow_file(flows_folder: Path, uuid: str) -> Path:
     """
     Return the flow XML file with the most recent version.
     Handles names like {uuid}.xml or {uuid}_version1.0.2.xml.
     """
-    candidates = list(flows_folder.glob(f"{uuid}*.xml"))
-    if not candidates:
-        raise FileNotFoundError(f"No flow file found for uuid={uuid} in {flows_folder}")
-
-    return max(candidates, key=sort_key)
+    return flow_resolver(flows_folder).resolve(uuid)
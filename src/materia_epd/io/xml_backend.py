@@ -0,0 +1,101 @@
+"""XML parsing and path lookups, backed by lxml when it is installed.
+
+With lxml, the ElementTree-style paths of ``XP`` are compiled once into
+``etree.XPath`` objects and evaluated in C. Elements parsed by the standard
+library keep going through ``xml.etree.ElementTree``, so both kinds of
+trees can be queried with the same functions.
+"""
+
+from __future__ import annotations
+
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from typing import IO, Collection, Iterator
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # pragma: no cover - optional dependency
+    lxml_etree = None
+
+BACKENDS = ("stdlib", "lxml")
+
+PARSE_ERRORS: tuple[type[Exception], ...] = (ET.ParseError,)
+if lxml_etree is not None:
+    PARSE_ERRORS += (lxml_etree.XMLSyntaxError,)
+
+_backend = "lxml" if lxml_etree is not None else "stdlib"
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def set_backend(name: str) -> None:
+    """Select the parser used by parse, fromstring and iterparse."""
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown XML backend {name!r}, expected one of {BACKENDS}")
+    if name == "lxml" and lxml_etree is None:
+        raise ImportError("The lxml backend requires the 'lxml' package")
+    _backend = name
+
+
+def parse(source: str | IO[bytes]):
+    """Parse a file and return its root element."""
+    if _backend == "lxml":
+        return lxml_etree.parse(source).getroot()
+    return ET.parse(source).getroot()
+
+
+def fromstring(data: bytes):
+    if _backend == "lxml":
+        return lxml_etree.fromstring(data)
+    return ET.fromstring(data)
+
+
+def iterparse(
+    source: str | IO[bytes], tags: Collection[str] | None = None
+) -> Iterator[tuple[str, object]]:
+    """Yield ("end", element) pairs as elements are completed.
+
+    lxml only reports the elements in ``tags``; the standard library reports
+    all of them, so callers still have to check the tag.
+    """
+    if _backend == "lxml":
+        return lxml_etree.iterparse(source, tag=tags)
+    return ET.iterparse(source)
+
+
+@lru_cache(maxsize=None)
+def _xpath(path: str, namespaces: tuple[tuple[str, str], ...]):
+    return lxml_etree.XPath(path, namespaces=dict(namespaces))
+
+
+def _compiled(path: str, namespaces: dict | None):
+    return _xpath(path, tuple(namespaces.items()) if namespaces else ())
+
+
+def _is_lxml(elem) -> bool:
+    return lxml_etree is not None and isinstance(elem, lxml_etree._Element)
+
+
+def find(elem, path: str, namespaces: dict | None = None):
+    """Return the first element matching ``path``, or None."""
+    if _is_lxml(elem):
+        found = _compiled(path, namespaces)(elem)
+        return found[0] if found else None
+    return elem.find(path, namespaces)
+
+
+def findall(elem, path: str, namespaces: dict | None = None) -> list:
+    if _is_lxml(elem):
+        return _compiled(path, namespaces)(elem)
+    return elem.findall(path, namespaces)
+
+
+def findtext(elem, path: str, default=None, namespaces: dict | None = None):
+    """Return the text of the first match ("" if empty), or ``default``."""
+    if _is_lxml(elem):
+        node = find(elem, path, namespaces)
+        return default if node is None else (node.text or "")
+    return elem.findtext(path, default, namespaces)
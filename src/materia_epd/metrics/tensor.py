@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import json
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from materia_epd.core.constants import LCIA_OUTPUT_MODULES
+from materia_epd.resources import get_indicator_synonyms
+
+# Python's round on plain floats, as the dict-based averages use.
+_round = np.frompyfunc(lambda value, decimals: round(float(value), decimals), 2, 1)
+
+
+def _sequential_sum(values: np.ndarray) -> np.ndarray:
+    """Sum along the first axis left to right, as Python's ``sum`` does.
+
+    ``np.sum`` uses pairwise summation, which can differ in the last bit;
+    the last row of a cumulative sum keeps results identical to the
+    dict-based averages.
+    """
+    if len(values) == 0:
+        return np.zeros(values.shape[1:])
+    return np.cumsum(values, axis=0)[-1]
+
+
+def read_tensor_meta(folder: Path | str) -> dict | None:
+    """Return the metadata of a tensor saved in ``folder``, None if there is none."""
+    try:
+        return json.loads((Path(folder) / "meta.json").read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+@dataclass
+class LCIATensor:
+    """LCIA results of a set of EPDs as one (rows, indicators, modules) array.
+
+    Missing values are NaN. ``present`` flags which indicators a row reports
+    at all, even without any numeric value, and ``owner`` maps each row to
+    the position of its EPD. An EPD normally owns one row; it owns more when
+    it reports the same indicator several times, as each report counts as
+    one sample in the averages.
+    """
+
+    values: np.ndarray
+    present: np.ndarray
+    owner: np.ndarray
+    indicators: dict[str, int]
+    modules: dict[str, int]
+
+    @classmethod
+    def from_results(
+        cls,
+        results: Sequence[Iterable[dict]],
+        modules: Sequence[str] = LCIA_OUTPUT_MODULES,
+    ) -> "LCIATensor":
+        """Build the tensor from per-EPD ``[{"name", "values"}]`` LCIA results."""
+        indicators = {name: i for i, name in enumerate(get_indicator_synonyms())}
+        module_index = {mod: m for m, mod in enumerate(modules)}
+        entries: list[tuple[int, int, dict]] = []
+        owner: list[int] = []
+        for epd, items in enumerate(results):
+            rows_used: dict[int, int] = {}
+            first_row = len(owner)
+            for item in items:
+                ind = indicators.setdefault(item.get("name"), len(indicators))
+                extra = rows_used.get(ind, 0)
+                rows_used[ind] = extra + 1
+                while len(owner) <= first_row + extra:
+                    owner.append(epd)
+                entries.append((first_row + extra, ind, item.get("values", {})))
+            if not rows_used:
+                owner.append(epd)
+
+        values = np.full((len(owner), len(indicators), len(modules)), np.nan)
+        present = np.zeros((len(owner), len(indicators)), dtype=bool)
+        for row, ind, item_values in entries:
+            present[row, ind] = True
+            for mod, value in item_values.items():
+                if (
+                    mod in module_index
+                    and isinstance(value, (int, float))
+                    and not isinstance(value, bool)
+                ):
+                    values[row, ind, module_index[mod]] = value
+        return cls(
+            values, present, np.array(owner, dtype=int), indicators, module_index
+        )
+
+    def take(
+        self, epds: Sequence[int], scaling: Sequence[float] | None = None
+    ) -> "LCIATensor":
+        """Return the rows of some EPDs, renumbered in the given order.
+
+        ``scaling`` multiplies the values of each selected EPD, as
+        ``get_lcia_results`` does with the material scaling factor.
+        """
+        epds = np.asarray(epds, dtype=int)
+        order = np.full(len(self), -1)
+        order[epds] = np.arange(len(epds))
+        rows = np.flatnonzero(order[self.owner] >= 0)
+        rows = rows[np.argsort(order[self.owner[rows]], kind="stable")]
+        owner = order[self.owner[rows]]
+        values = np.array(self.values[rows])
+        if scaling is not None:
+            values *= np.asarray(scaling, dtype=float)[owner, None, None]
+        return LCIATensor(
+            values,
+            np.array(self.present[rows]),
+            owner,
+            dict(self.indicators),
+            dict(self.modules),
+        )
+
+    def save(self, folder: Path | str, keys: Sequence[str] = ()) -> str:
+        """Write the arrays as .npy files that ``load`` can memory-map.
+
+        Arrays get a fresh name on every save and ``meta.json`` is replaced
+        atomically last, so readers never mix two versions. The version
+        ``meta.json`` pointed at until now is kept for readers that already
+        opened or are about to open it; older ones are deleted where the
+        platform allows it, e.g. not on Windows while still mapped, and are
+        retried on the next save. ``keys`` names the EPD of each position,
+        e.g. its file path. Returns the token identifying this version.
+        """
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        previous = read_tensor_meta(folder)
+        token = uuid.uuid4().hex
+        for name in ("values", "present", "owner"):
+            np.save(folder / f"{name}-{token}.npy", getattr(self, name))
+        meta = {
+            "token": token,
+            "indicators": list(self.indicators),
+            "modules": list(self.modules),
+            "keys": list(keys),
+        }
+        tmp = folder / f"meta-{token}.json"
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, folder / "meta.json")
+        keep = {token} | ({previous["token"]} if previous else set())
+        for stale in folder.glob("*.npy"):
+            if stale.stem.rpartition("-")[2] not in keep:
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass
+        return token
+
+    @classmethod
+    def load(
+        cls, folder: Path | str, mmap_mode: str | None = "r"
+    ) -> tuple["LCIATensor", list[str]]:
+        """Map a saved tensor read-only into memory; return it with its keys.
+
+        Should a concurrent ``save`` remove the arrays between reading
+        ``meta.json`` and opening them, the new ``meta.json`` is read once more.
+        """
+        try:
+            return cls._load(folder, mmap_mode)
+        except FileNotFoundError:
+            return cls._load(folder, mmap_mode)
+
+    @classmethod
+    def _load(
+        cls, folder: Path | str, mmap_mode: str | None
+    ) -> tuple["LCIATensor", list[str]]:
+        meta = read_tensor_meta(folder)
+        if meta is None:
+            raise FileNotFoundError(f"No LCIA tensor saved in {folder}")
+        arrays = {
+            name: np.load(
+                Path(folder) / f"{name}-{meta['token']}.npy", mmap_mode=mmap_mode
+            )
+            for name in ("values", "present", "owner")
+        }
+        tensor = cls(
+            indicators={name: i for i, name in enumerate(meta["indicators"])},
+            modules={mod: m for m, mod in enumerate(meta["modules"])},
+            **arrays,
+        )
+        return tensor, meta["keys"]
+
+    def average(
+        self, epds: Sequence[int] | None = None, decimals: int = 6
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Mean of each indicator and module over some EPDs, like average_impacts.
+
+        Returns the (indicators, modules) means, NaN where no EPD has a
+        value, and the indicators reported by at least one of the EPDs.
+        """
+        rows = (
+            np.isin(self.owner, np.asarray(epds, dtype=int))
+            if epds is not None
+            else slice(None)
+        )
+        values = self.values[rows]
+        has_value = ~np.isnan(values)
+        counts = has_value.sum(axis=0)
+        sums = _sequential_sum(np.where(has_value, values, 0.0))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(counts > 0, sums / counts, np.nan)
+        means = _round(means, decimals).astype(float)
+        return means, self.present[rows].any(axis=0)
+
+    def weighted_average(
+        self,
+        market_shares: dict[str, float],
+        epds_by_country: dict[str, Sequence[int]],
+        decimals: int = 6,
+    ) -> dict[str, dict[str, float]]:
+        """Market-share weighted average of the per-country means.
+
+        Matches ``weighted_averages(market, {c: average_impacts(...)})``: a
+        country counts towards an indicator when one of its EPDs reports it,
+        and a module it has no value for contributes zero.
+        """
+        countries = [c for c in market_shares if c in epds_by_country]
+        if not countries:
+            return {}
+        means, present = zip(
+            *(self.average(epds_by_country[c], decimals) for c in countries)
+        )
+        means, present = np.stack(means), np.stack(present)
+        weights = np.array([market_shares[c] for c in countries])[:, None] * present
+        total = _sequential_sum(weights[:, :, None] * np.nan_to_num(means, nan=0.0))
+        share = _sequential_sum(weights)
+        has_value = (present[:, :, None] & ~np.isnan(means)).any(axis=0)
+        reported = present.any(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = total / share[:, None]
+        return {
+            ind: {
+                mod: float(result[i, m])
+                for mod, m in self.modules.items()
+                if has_value[i, m]
+            }
+            for ind, i in self.indicators.items()
+            if reported[i]
+        }
+
+    def __len__(self) -> int:
+        return int(self.owner.max()) + 1 if len(self.owner) else 0
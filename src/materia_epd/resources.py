@@ -1,9 +1,17 @@
 # src/materia/resources.py
 from __future__ import annotations
 
+import json
 from functools import lru_cache
 from importlib.resources import as_file, files
-
+from pathlib import Path
+
+from materia_epd.core.cache import LRUCache
+from materia_epd.core.constants import (
+    GEO_BUNDLE_FILENAME,
+    GEO_BUNDLE_VERSION,
+    MARKET_CACHE_SIZE,
+)
 from materia_epd.io import files as io_files
 from materia_epd.io.paths import USER_DATA_DIR
 
@@ -27,8 +35,25 @@ def iter_json_from_package_folder(*folder_parts: str):
 
 
 @lru_cache(maxsize=1)
+def get_geo_bundle() -> dict:
+    """Load the prebuilt bundle of location data, regions and ILCD aliases.
+
+    The bundle is read in one go, which also works from zipped installs. A
+    tree without an up-to-date bundle builds it from the source files.
+    """
+    resource = files(__package__).joinpath("data", GEO_BUNDLE_FILENAME)
+    if resource.is_file():
+        data = json.loads(resource.read_text(encoding="utf-8"))
+        if data.get("version") == GEO_BUNDLE_VERSION:
+            return data
+
+    from materia_epd.geo.bundle import build_geo_bundle
+
+    return build_geo_bundle()
+
+
 def get_regions_mapping():
-    return load_json_from_package("regions_mapping.json")
+    return get_geo_bundle()["regions"]
 
 
 @lru_cache(maxsize=1)
@@ -36,8 +61,49 @@ def get_indicator_synonyms():
     return load_json_from_package("indicator_synonyms.json")
 
 
-@lru_cache(maxsize=1)
+def market_shares_file(loc_code: str, hs_code: str) -> Path | None:
+    """Return the file get_market_shares reads for a market, if it exists yet."""
+    subfolder = f"market_shares/{loc_code}"
+    resource = files(__package__).joinpath("data", subfolder, f"{hs_code}.json")
+    if resource.is_file():
+        return Path(str(resource))
+    user_file = USER_DATA_DIR / subfolder / f"{hs_code}.json"
+    return user_file if user_file.exists() else None
+
+
+# Market shares already read or generated, by (location, HS code).
+MARKET_CACHE = LRUCache(MARKET_CACHE_SIZE)
+
+
+def has_market_shares(loc_code: str, hs_code: str) -> bool:
+    """Whether get_market_shares can answer without generating the market."""
+    return (loc_code, hs_code) in MARKET_CACHE or market_shares_file(
+        loc_code, hs_code
+    ) is not None
+
+
 def get_market_shares(loc_code: str, hs_code: str):
+    """Return the market shares of imports of ``hs_code`` to ``loc_code``.
+
+    They are served from MARKET_CACHE, then read from the package data or
+    USER_DATA_DIR, and generated and stored there as a last resort.
+    """
+    return MARKET_CACHE.get_or_set(
+        (loc_code, hs_code), lambda: _load_market_shares(loc_code, hs_code)
+    )
+
+
+# Same interface as an lru_cache-decorated function.
+get_market_shares.cache_clear = MARKET_CACHE.clear
+get_market_shares.cache_info = MARKET_CACHE.cache_info
+
+
+def invalidate_market_shares(loc_code: str, hs_code: str) -> bool:
+    """Forget the cached shares of one market; return whether they were cached."""
+    return MARKET_CACHE.invalidate((loc_code, hs_code))
+
+
+def _load_market_shares(loc_code: str, hs_code: str):
     filename = f"{hs_code}.json"
     subfolder = f"market_shares/{loc_code}"
 
@@ -81,6 +147,8 @@ def get_comtrade_api_key():
     return api_key
 
 
-@lru_cache(maxsize=1)
 def get_location_data(loc_code: str):
-    return load_json_from_package("locations", f"{loc_code}.json")
+    data = get_geo_bundle()["locations"].get(loc_code)
+    if data is None:
+        raise ValueError(f"Invalid or missing JSON file: locations/{loc_code}.json")
+    return data
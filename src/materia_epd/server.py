@@ -0,0 +1,186 @@
+# materia/server.py
+from __future__ import annotations
+
+import json
+import xml.etree.ElementTree as ET
+from dataclasses import asdict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+from materia_epd.core.constants import ATTR, ICONS, NS, XP
+from materia_epd.core.errors import NoMatchingEPDError
+from materia_epd.epd.corpus import load_corpus
+from materia_epd.epd.models import IlcdProcess
+from materia_epd.epd.pipeline import ProcessResult, epd_pipeline
+from materia_epd.io.files import latest_flow_file
+from materia_epd.resources import (
+    get_indicator_synonyms,
+    get_regions_mapping,
+    has_market_shares,
+)
+
+
+class RequestError(ValueError):
+    """Raised for requests the service cannot make sense of."""
+
+
+def _check_process(root: ET.Element) -> None:
+    """Raise a RequestError unless a process has what ``aggregate`` reads."""
+    missing = []
+    if not (root.findtext(XP.UUID, namespaces=NS) or "").strip():
+        missing.append("UUID")
+    if root.find(XP.LOCATION, NS) is None:
+        missing.append("location")
+    ref_id = (root.findtext(XP.QUANT_REF, namespaces=NS) or "").strip()
+    exchange = next(
+        (
+            elem
+            for elem in root.iterfind(".//proc:exchange", NS)
+            if elem.attrib.get(ATTR.INTERNAL_ID) == ref_id
+        ),
+        None,
+    )
+    ref = exchange.find(XP.REF_TO_FLOW, NS) if exchange is not None else None
+    if ref is None or not ref.attrib.get(ATTR.REF_OBJECT_ID):
+        missing.append("reference exchange")
+    hs_node = root.find(XP.HS_CLASSIFICATION, NS)
+    if hs_node is None or hs_node.find(XP.CLASS_LEVEL_2, NS) is None:
+        missing.append("HS classification")
+    if missing:
+        raise RequestError(f"The process XML lacks its {', '.join(missing)}.")
+
+
+def _check_flow(root: ET.Element) -> None:
+    """Raise a RequestError unless a flow declares some flow property."""
+    if root.find(XP.FLOW_PROPERTY, NS) is None:
+        raise RequestError("The flow XML lacks flow properties.")
+
+
+class MateriaService:
+    """EPD corpus and resources kept in memory to aggregate posted processes.
+
+    ``gen_folder`` is an optional generic data folder whose flows/ resolve
+    the reference flows of requests that do not include theirs.
+    """
+
+    def __init__(
+        self,
+        epd_folder: Path | str,
+        gen_folder: Path | str | None = None,
+        workers: int = 1,
+        index_path: Path | str | None = None,
+    ):
+        self.corpus = load_corpus(epd_folder, workers=workers, index_path=index_path)
+        self.gen_folder = Path(gen_folder) if gen_folder else None
+        get_regions_mapping()
+        get_indicator_synonyms()
+
+    def _parse(self, payload: dict, key: str) -> ET.Element | None:
+        if not payload.get(key):
+            return None
+        if not isinstance(payload[key], str):
+            raise RequestError(f"The {key} XML must be a string.")
+        try:
+            return ET.fromstring(payload[key])
+        except ET.ParseError as e:
+            raise RequestError(f"Invalid {key} XML: {e}") from e
+
+    def aggregate(self, payload: dict) -> ProcessResult:
+        """Run ``epd_pipeline`` on a posted generic process.
+
+        ``payload`` holds the process XML under "process", its matches under
+        "matches" and, optionally, the XML of its reference flow under "flow".
+        Markets whose shares are not stored yet are refused rather than
+        generated, which may prompt for a Comtrade API key.
+        """
+        root = self._parse(payload, "process")
+        matches = payload.get("matches")
+        if root is None or not matches:
+            raise RequestError("A process XML and its matches are required.")
+        if not isinstance(matches, (dict, list)):
+            raise RequestError("The matches must be a JSON object or list.")
+        _check_process(root)
+        process = IlcdProcess(root=root, path=Path("request.xml"))
+        flow_root = self._parse(payload, "flow")
+        if flow_root is None:
+            ref_flow_uuid, _ = process.get_ref_exchange()
+            if self.gen_folder is None:
+                raise RequestError("The reference flow XML is required.")
+            flow_file = latest_flow_file(self.gen_folder / "flows", ref_flow_uuid)
+            flow_root = ET.parse(flow_file).getroot()
+        _check_flow(flow_root)
+        process.get_ref_flow(flow_root)
+        process.get_declared_unit()
+        process.get_hs_class()
+        if not has_market_shares(process.loc, process.hs_class):
+            raise ValueError(
+                f"No market shares stored for HS code {process.hs_class} "
+                f"in {process.loc}; generate them with a batch run first."
+            )
+        process.get_market()
+        process.matches = matches
+
+        avg_properties, avg_gwps = epd_pipeline(process, self.corpus)
+        return ProcessResult(
+            process.uuid, avg_properties, avg_gwps, process.used_epd_uuids
+        )
+
+
+class MateriaRequestHandler(BaseHTTPRequestHandler):
+    """JSON endpoints: GET / reports readiness, POST / aggregates a process."""
+
+    server: "MateriaHTTPServer"
+
+    def _reply(self, status: HTTPStatus, body: dict) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._reply(HTTPStatus.OK, {"status": "ok"})
+
+    def do_POST(self):
+        try:
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                raise RequestError("Invalid Content-Length header.")
+            payload = json.loads(self.rfile.read(length) or b"null")
+            if not isinstance(payload, dict):
+                raise RequestError("The request body must be a JSON object.")
+            result = self.server.service.aggregate(payload)
+        except (RequestError, json.JSONDecodeError, UnicodeDecodeError) as e:
+            self._reply(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+        except (NoMatchingEPDError, ValueError, OSError) as e:
+            self._reply(HTTPStatus.UNPROCESSABLE_ENTITY, {"error": str(e)})
+        except Exception as e:
+            self._reply(
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                {"error": f"{type(e).__name__}: {e}"},
+            )
+        else:
+            self._reply(HTTPStatus.OK, asdict(result))
+
+
+class MateriaHTTPServer(HTTPServer):
+    """Single-threaded HTTP server sharing one MateriaService across requests."""
+
+    def __init__(self, address: tuple[str, int], service: MateriaService):
+        super().__init__(address, MateriaRequestHandler)
+        self.service = service
+
+
+def serve(service: MateriaService, host: str, port: int) -> None:
+    """Answer requests on ``host:port`` until interrupted."""
+    with MateriaHTTPServer((host, port), service) as server:
+        print(f"{ICONS.SUCCESS} Serving on http://{host}:{server.server_port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print(f"{ICONS.SUCCESS} Stopped serving.")
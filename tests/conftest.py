@@ -1,10 +1,145 @@
 """
-    Dummy conftest.py for materia.
+    Shared fixtures for materia.
 
-    If you don't know what this is for, just leave it empty.
     Read more about conftest.py under:
     - https://docs.pytest.org/en/stable/fixture.html
     - https://docs.pytest.org/en/stable/writing_plugins.html
 """
 
-# import pytest
+import pytest
+
+MASS_UUID = "93a60a56-a3c8-11da-a746-0800200b9a66"
+VOLUME_UUID = "93a60a56-a3c8-22da-a746-0800200c9a66"
+GWP_NAME = "Global Warming Potential total (GWP-total)"
+
+
+def ilcd_flow_xml(uuid, density=2.0, volume=0.5):
+    """Minimal ILCD flow with a volume reference and a MatML density."""
+    return f"""<?xml version='1.0' encoding='utf-8'?>
+<flowDataSet xmlns="http://lca.jrc.it/ILCD/Flow"
+    xmlns:common="http://lca.jrc.it/ILCD/Common" xmlns:mat="http://www.matml.org/">
+  <flowInformation>
+    <dataSetInformation>
+      <common:UUID>{uuid}</common:UUID>
+      <common:other>
+        <mat:MatML_Doc>
+          <mat:Material><mat:BulkDetails>
+            <mat:PropertyData property="pr1">
+              <mat:Data format="float">{density}</mat:Data>
+            </mat:PropertyData>
+          </mat:BulkDetails></mat:Material>
+          <mat:Metadata>
+            <mat:PropertyDetails id="pr1">
+              <mat:Name>gross density</mat:Name>
+              <mat:Units name="kg/m^3"/>
+            </mat:PropertyDetails>
+          </mat:Metadata>
+        </mat:MatML_Doc>
+      </common:other>
+    </dataSetInformation>
+    <quantitativeReference>
+      <referenceToReferenceFlowProperty>0</referenceToReferenceFlowProperty>
+    </quantitativeReference>
+  </flowInformation>
+  <flowProperties>
+    <flowProperty dataSetInternalID="0">
+      <referenceToFlowPropertyDataSet refObjectId="{VOLUME_UUID}">
+        <common:shortDescription xml:lang="en">Volume</common:shortDescription>
+      </referenceToFlowPropertyDataSet>
+      <meanValue>{volume}</meanValue>
+    </flowProperty>
+    <flowProperty dataSetInternalID="1">
+      <referenceToFlowPropertyDataSet refObjectId="{MASS_UUID}">
+        <common:shortDescription xml:lang="en">Mass</common:shortDescription>
+      </referenceToFlowPropertyDataSet>
+      <meanValue>{density * volume}</meanValue>
+    </flowProperty>
+  </flowProperties>
+</flowDataSet>"""
+
+
+def ilcd_process_xml(uuid, flow_uuid, loc="DE", hs="6810", amount=1.0, gwp=None):
+    """Minimal ILCD EPD process with one reference exchange and GWP results."""
+    gwp = gwp if gwp is not None else {"A1": 1.0, "A2": 2.0, "A3": 3.0, "C2": 0.5}
+    amounts = "".join(
+        f'<epd:amount epd:module="{mod}">{val}</epd:amount>' for mod, val in gwp.items()
+    )
+    return f"""<?xml version='1.0' encoding='utf-8'?>
+<processDataSet xmlns="http://lca.jrc.it/ILCD/Process"
+    xmlns:common="http://lca.jrc.it/ILCD/Common"
+    xmlns:epd="http://www.iai.kit.edu/EPD/2013">
+  <processInformation>
+    <dataSetInformation>
+      <common:UUID>{uuid}</common:UUID>
+      <classificationInformation>
+        <common:classification name="HS Classification">
+          <common:class level="0" classId="68">Stone</common:class>
+          <common:class level="2" classId="{hs}">Articles</common:class>
+        </common:classification>
+      </classificationInformation>
+    </dataSetInformation>
+    <quantitativeReference>
+      <referenceToReferenceFlow>1</referenceToReferenceFlow>
+    </quantitativeReference>
+    <geography>
+      <locationOfOperationSupplyOrProduction location="{loc}"/>
+    </geography>
+    <technology>
+      <technologyDescriptionAndIncludedProcesses xml:lang="en">
+        Documentation that the pipeline never reads.
+      </technologyDescriptionAndIncludedProcesses>
+    </technology>
+  </processInformation>
+  <exchanges>
+    <exchange dataSetInternalID="0">
+      <referenceToFlowDataSet refObjectId="00000000-0000-0000-0000-000000000000"/>
+      <meanAmount>7</meanAmount>
+    </exchange>
+    <exchange dataSetInternalID="1">
+      <referenceToFlowDataSet refObjectId="{flow_uuid}"/>
+      <meanAmount>{amount}</meanAmount>
+    </exchange>
+  </exchanges>
+  <LCIAResults>
+    <LCIAResult>
+      <referenceToLCIAMethodDataSet refObjectId="gwp">
+        <common:shortDescription xml:lang="en">{GWP_NAME}</common:shortDescription>
+      </referenceToLCIAMethodDataSet>
+      <common:other>{amounts}</common:other>
+    </LCIAResult>
+    <LCIAResult>
+      <referenceToLCIAMethodDataSet refObjectId="other">
+        <common:shortDescription xml:lang="en">Unmapped</common:shortDescription>
+      </referenceToLCIAMethodDataSet>
+      <common:other><epd:amount epd:module="A1">9</epd:amount></common:other>
+    </LCIAResult>
+  </LCIAResults>
+</processDataSet>"""
+
+
+def _uuid(c):
+    return f"{c * 8}-{c * 4}-{c * 4}-{c * 4}-{c * 12}"
+
+
+EPD_SPECS = [
+    # process uuid, flow uuid, ILCD location, density
+    (_uuid("1"), _uuid("a"), "DE", 2.0),
+    (_uuid("2"), _uuid("b"), "FR", 4.0),
+    (_uuid("3"), _uuid("c"), "DE", 8.0),
+]
+
+
+@pytest.fixture
+def ilcd_folder(tmp_path):
+    """An ILCD folder with processes/ and flows/ holding three small EPDs."""
+    root = tmp_path / "epds"
+    (root / "processes").mkdir(parents=True)
+    (root / "flows").mkdir()
+    for uuid, flow_uuid, loc, density in EPD_SPECS:
+        (root / "processes" / f"{uuid}.xml").write_text(
+            ilcd_process_xml(uuid, flow_uuid, loc=loc), encoding="utf-8"
+        )
+        (root / "flows" / f"{flow_uuid}.xml").write_text(
+            ilcd_flow_xml(flow_uuid, density=density), encoding="utf-8"
+        )
+    return root
@@ -0,0 +1,50 @@
+# tests/unit/test_bundle.py
+import json
+
+import pytest
+
+from materia_epd.geo import bundle as mod
+
+
+def test_shipped_bundle_is_up_to_date(monkeypatch):
+    """Run ``materia data build`` after editing the location data."""
+    shipped = mod.package_data_folder() / mod.GEO_BUNDLE_FILENAME
+    shipped = json.loads(shipped.read_text(encoding="utf-8"))
+    # The country table follows the pycountry release it was built with.
+    monkeypatch.setattr(mod, "iso_alpha3_table", lambda: shipped["countries"])
+    assert shipped == mod.build_geo_bundle()
+
+
+def test_iso_alpha3_table_prefers_current_countries():
+    table = mod.iso_alpha3_table()
+    assert table["FR"] == "FRA" and table["LU"] == "LUX"
+    assert table["CS"] == "SCG"  # historic only
+    assert "ZZ" not in table
+
+
+def test_write_geo_bundle_packs_a_data_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(mod, "iso_alpha3_table", lambda: {"LU": "LUX"})
+    (tmp_path / "locations").mkdir()
+    (tmp_path / "locations" / "LUX.json").write_text('{"Parent": "WE"}')
+    (tmp_path / "locations" / "broken.json").write_text("{")
+    (tmp_path / "regions_mapping.json").write_text('{"RER": {"Regions": "Europe"}}')
+
+    path = mod.write_geo_bundle(tmp_path)
+    assert path == tmp_path / mod.GEO_BUNDLE_FILENAME
+    assert not path.with_name(f"{path.name}.tmp").exists()
+    assert json.loads(path.read_text(encoding="utf-8")) == {
+        "version": mod.GEO_BUNDLE_VERSION,
+        "aliases": mod.ILCD_LOCATION_ALIASES,
+        "regions": {"RER": {"Regions": "Europe"}},
+        "countries": {"LU": "LUX"},
+        "locations": {"LUX": {"Parent": "WE"}},
+    }
+    assert "\n" not in path.read_text(encoding="utf-8").rstrip("\n")
+
+    other = mod.write_geo_bundle(tmp_path, tmp_path / "elsewhere.json")
+    assert other.read_text() == path.read_text()
+
+
+def test_build_geo_bundle_requires_location_data(tmp_path):
+    with pytest.raises(ValueError, match="No location data"):
+        mod.build_geo_bundle(tmp_path)
@@ -0,0 +1,51 @@
+# tests/unit/test_cache.py
+import pytest
+
+from materia_epd.core.cache import CacheInfo, LRUCache
+
+
+def test_lru_cache_counts_hits_and_misses_and_evicts_oldest():
+    cache = LRUCache(maxsize=2)
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "a" is now the most recent entry
+    cache.put("c", 3)
+
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.cache_info() == CacheInfo(hits=1, misses=1, maxsize=2, currsize=2)
+    assert repr(cache) == "LRUCache(hits=1, misses=1, maxsize=2, currsize=2)"
+
+
+def test_lru_cache_get_or_set_caches_none_and_invalidates():
+    cache = LRUCache()
+    calls = []
+    factory = lambda: calls.append(1)  # noqa: E731  returns None
+    assert cache.get_or_set("k", factory) is None
+    assert cache.get_or_set("k", factory) is None
+    assert len(calls) == 1 and (cache.hits, cache.misses) == (1, 1)
+
+    assert cache.invalidate("k") is True
+    assert cache.invalidate("k") is False
+    cache.get_or_set("k", factory)
+    assert len(calls) == 2
+
+    cache.add_counts(3, 2)
+    assert (cache.hits, cache.misses) == (4, 4)
+
+    cache.clear()
+    assert len(cache) == 0 and cache.cache_info().hits == 0
+
+
+def test_lru_cache_resizing_evicts_and_zero_disables():
+    cache = LRUCache(maxsize=3)
+    for key in "abc":
+        cache.put(key, key)
+    cache.maxsize = 1
+    assert len(cache) == 1 and "c" in cache
+
+    cache.maxsize = 0
+    cache.put("d", "d")
+    assert len(cache) == 0
+    with pytest.raises(ValueError):
+        cache.maxsize = -1
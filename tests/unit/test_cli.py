@@ -2,6 +2,8 @@
 from pathlib import Path
 from click.testing import CliRunner
 from materia_epd import cli
+from materia_epd.core.cache import LRUCache
+from materia_epd.epd.filters import FilterStats
 
 
 def _setup_dirs(tmp_path: Path):
@@ -18,10 +20,15 @@ def test_no_output_path_calls_pipeline_with_none(monkeypatch, tmp_path):
 
     called = {}
 
-    def fake_run_materia(a, b, c):
+    def fake_run_materia(a, b, c, workers, jobs, force, resume, index_path):
         called["a"] = a
         called["b"] = b
         called["c"] = c  # should be None
+        called["workers"] = workers
+        called["jobs"] = jobs
+        called["force"] = force
+        called["resume"] = resume
+        called["index_path"] = index_path
 
     # monkeypatch the function imported into cli.py
     monkeypatch.setattr(cli, "run_materia", fake_run_materia, raising=True)
@@ -31,24 +38,217 @@ def test_no_output_path_calls_pipeline_with_none(monkeypatch, tmp_path):
     assert called["a"] == gen
     assert called["b"] == epd
     assert called["c"] is None
+    assert called["workers"] == 1
+    assert called["jobs"] == 1
+    assert called["force"] is False
+    assert called["resume"] is False
+    assert called["index_path"] is None
 
 
 def test_with_output_path_calls_pipeline_with_path(monkeypatch, tmp_path):
     runner = CliRunner()
     gen, epd = _setup_dirs(tmp_path)
     out = tmp_path / "out" / "file.xml"  # file or folder; pipeline decides
+    index_path = tmp_path / "index.sqlite"
+    index_path.touch()
 
     called = {}
 
-    def fake_run_materia(a, b, c):
+    def fake_run_materia(a, b, c, workers, jobs, force, resume, index_path):
         called["a"] = a
         called["b"] = b
         called["c"] = c  # should be Path
+        called["workers"] = workers
+        called["jobs"] = jobs
+        called["force"] = force
+        called["resume"] = resume
+        called["index_path"] = index_path
 
     monkeypatch.setattr(cli, "run_materia", fake_run_materia, raising=True)
 
-    result = runner.invoke(cli.main, [str(gen), str(epd), "-o", str(out)])
+    args = [str(gen), str(epd), "-o", str(out), "--workers", "4", "--jobs", "2"]
+    args += ["--force", "--resume", "--index-path", str(index_path)]
+    result = runner.invoke(cli.main, args)
     assert result.exit_code == 0
     assert called["a"] == gen
     assert called["b"] == epd
     assert called["c"] == out
+    assert called["workers"] == 4
+    assert called["jobs"] == 2
+    assert called["force"] is True
+    assert called["resume"] is True
+    assert called["index_path"] == index_path
+
+
+def test_run_subcommand_is_equivalent_to_default(monkeypatch, tmp_path):
+    runner = CliRunner()
+    gen, epd = _setup_dirs(tmp_path)
+
+    called = []
+    monkeypatch.setattr(cli, "run_materia", lambda *a, **kw: called.append(a))
+
+    result = runner.invoke(cli.main, ["run", str(gen), str(epd)])
+    assert result.exit_code == 0
+    assert called == [(gen, epd, None)]
+    assert cli.FLOW_CACHE.maxsize == cli.FLOW_CACHE_SIZE
+
+
+def test_run_and_serve_set_the_cache_sizes(monkeypatch, tmp_path):
+    runner = CliRunner()
+    gen, epd = _setup_dirs(tmp_path)
+    monkeypatch.setattr(cli, "run_materia", lambda *a, **kw: None)
+    monkeypatch.setattr(cli.FLOW_CACHE, "maxsize", cli.FLOW_CACHE_SIZE)
+
+    args = [str(gen), str(epd), "--flow-cache-size", "16"]
+    assert runner.invoke(cli.main, args).exit_code == 0
+    assert cli.FLOW_CACHE.maxsize == 16
+    monkeypatch.setattr(cli.MARKET_CACHE, "maxsize", cli.MARKET_CACHE_SIZE)
+    args = ["serve", str(epd), "--market-cache-size", "8"]
+    monkeypatch.setattr(cli, "MateriaService", lambda *a, **kw: None)
+    monkeypatch.setattr(cli, "serve", lambda *a: None)
+    assert runner.invoke(cli.main, args).exit_code == 0
+    assert cli.MARKET_CACHE.maxsize == 8
+    args = [str(gen), str(epd), "--market-cache-size", "0"]
+    assert runner.invoke(cli.main, args).exit_code == 0
+    assert cli.MARKET_CACHE.maxsize == 0
+    bad = runner.invoke(cli.main, [str(gen), str(epd), "--flow-cache-size", "-1"])
+    assert bad.exit_code != 0
+
+
+def test_run_prints_filter_stats(monkeypatch, tmp_path):
+    runner = CliRunner()
+    gen, epd = _setup_dirs(tmp_path)
+    stats = {
+        "Preselection": FilterStats(10, 4, 0.0123),
+        "UnitConformityFilter": FilterStats(6, 0, 0.0),
+        "Location selection": FilterStats(12, 8, 0.001),
+    }
+    monkeypatch.setattr(cli, "FILTER_STATS", stats)
+    flow_cache = LRUCache()
+    flow_cache.add_counts(7, 3)
+    monkeypatch.setattr(cli, "FLOW_CACHE", flow_cache)
+    monkeypatch.setattr(cli, "run_materia", lambda *a, **kw: None)
+
+    assert runner.invoke(cli.main, [str(gen), str(epd)]).output == ""
+    result = runner.invoke(cli.main, [str(gen), str(epd), "--filter-stats"])
+    assert result.output == (
+        "Preselection: 10 evaluated, 4 rejected, 0.012 s\n"
+        "UnitConformityFilter: 6 evaluated, 0 rejected, 0.000 s\n"
+        "Location selection: 12 evaluated, 8 rejected, 0.001 s\n"
+        "Flow cache: 7 hits, 3 misses\n"
+    )
+
+
+def test_index_build_reports_indexed_epds(monkeypatch, tmp_path):
+    runner = CliRunner()
+    _, epd = _setup_dirs(tmp_path)
+
+    class FakeIndex:
+        db_path = tmp_path / "idx.sqlite"
+        closed = False
+
+        @classmethod
+        def build(cls, folder, index_path, workers):
+            assert folder == epd and index_path is None and workers == 2
+            return cls()
+
+        def __len__(self):
+            return 7
+
+        def close(self):
+            FakeIndex.closed = True
+
+    monkeypatch.setattr(cli, "EPDIndex", FakeIndex, raising=True)
+
+    result = runner.invoke(cli.main, ["index", "build", str(epd), "--workers", "2"])
+    assert result.exit_code == 0
+    assert "Indexed 7 EPDs" in result.output
+    assert FakeIndex.closed
+
+
+def test_index_refresh_prints_counts_per_folder(monkeypatch, tmp_path):
+    runner = CliRunner()
+    _, epd = _setup_dirs(tmp_path)
+
+    class FakeIndex:
+        def __init__(self, path, workers):
+            assert path == epd / ".materia" / "index.sqlite" and workers == 1
+
+        def refresh(self, folder):
+            return {"flows": {"added": 1}, "processes": {"changed": 2}}
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(cli, "EPDIndex", FakeIndex, raising=True)
+
+    result = runner.invoke(cli.main, ["index", "refresh", str(epd)])
+    assert result.exit_code == 0
+    assert "flows: 1 added" in result.output
+    assert "processes: 2 changed" in result.output
+
+
+def test_recompute_passes_changed_epds(monkeypatch, tmp_path):
+    runner = CliRunner()
+    gen, epd = _setup_dirs(tmp_path)
+    called = []
+    monkeypatch.setattr(
+        cli, "recompute_materia", lambda *a, **kw: called.append((a, kw))
+    )
+
+    args = ["recompute", str(gen), str(epd), "-o", str(tmp_path / "out")]
+    assert runner.invoke(cli.main, args).exit_code != 0  # --changed-epd required
+    args += ["--changed-epd", "e1", "--changed-epd", "e2", "--jobs", "3"]
+    assert runner.invoke(cli.main, args).exit_code == 0
+    assert called == [
+        (
+            (gen, epd, tmp_path / "out", ("e1", "e2")),
+            {"workers": 1, "jobs": 3, "index_path": None},
+        )
+    ]
+
+
+def test_watch_starts_a_watcher(monkeypatch, tmp_path):
+    runner = CliRunner()
+    gen, epd = _setup_dirs(tmp_path)
+    started = []
+
+    class FakeWatcher:
+        def __init__(self, *args, workers, index_path):
+            started.append((args, workers, index_path))
+
+        def watch(self, interval):
+            started.append(interval)
+
+    monkeypatch.setattr(cli, "Watcher", FakeWatcher)
+    index_path = tmp_path / "index.sqlite"
+    index_path.touch()
+    args = ["watch", str(gen), str(epd), "-o", str(tmp_path / "out")]
+    args += ["--index-path", str(index_path)]
+    assert runner.invoke(cli.main, args + ["--interval", "0.5"]).exit_code == 0
+    assert started == [((gen, epd, tmp_path / "out"), 1, index_path), 0.5]
+    assert runner.invoke(cli.main, args + ["--interval", "0"]).exit_code != 0
+
+
+def test_serve_starts_a_service(monkeypatch, tmp_path):
+    runner = CliRunner()
+    gen, epd = _setup_dirs(tmp_path)
+    served = []
+    monkeypatch.setattr(
+        cli,
+        "MateriaService",
+        lambda *a, workers, index_path: ("service", a, workers, index_path),
+    )
+    monkeypatch.setattr(cli, "serve", lambda *a: served.append(a))
+
+    args = ["serve", str(epd), "--gen-folder", str(gen), "--port", "0"]
+    assert runner.invoke(cli.main, args + ["--workers", "2"]).exit_code == 0
+    assert served == [(("service", (epd, gen), 2, None), "127.0.0.1", 0)]
+    assert runner.invoke(cli.main, ["serve", str(epd), "--port", "-1"]).exit_code
+
+
+def test_data_build_writes_the_bundle(monkeypatch, tmp_path):
+    monkeypatch.setattr(cli, "write_geo_bundle", lambda folder: tmp_path / "geo.json")
+    result = CliRunner().invoke(cli.main, ["data", "build", "--data-folder", "."])
+    assert result.exit_code == 0
+    assert result.output == f"{cli.ICONS.SUCCESS} Wrote {tmp_path / 'geo.json'}\n"
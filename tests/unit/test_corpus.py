@@ -0,0 +1,103 @@
+# tests/unit/test_corpus.py
+from pathlib import Path
+
+from conftest import EPD_SPECS
+from materia_epd.epd import corpus as mod
+from materia_epd.epd import filters
+from materia_epd.epd.filters import UUIDFilter
+from materia_epd.epd.models import EPDRecord
+
+
+def test_corpus_from_folder_parses_each_file_once(tmp_path: Path, monkeypatch):
+    (tmp_path / "p1.xml").write_text("<root id='1'/>", encoding="utf-8")
+    (tmp_path / "p2.xml").write_text("<root id='2'/>", encoding="utf-8")
+    (tmp_path / "bad.xml").write_text("<root>", encoding="utf-8")
+
+    calls = []
+    real_extract = mod.extract_records
+
+    def fake_extract(paths, flows, workers):
+        calls.extend(path.name for path in paths)
+        return real_extract(paths, flows, workers)
+
+    monkeypatch.setattr(mod, "extract_records", fake_extract, raising=True)
+    corpus = mod.EPDCorpus.from_folder(tmp_path)
+    assert calls == []
+
+    assert len(corpus) == 2
+    assert [r.path.name for r in corpus] == ["p1.xml", "p2.xml"]
+    # iterating repeatedly does not parse again
+    assert len(list(corpus)) == len(list(corpus)) == 2
+    assert calls == ["p1.xml", "p2.xml"]
+    assert repr(corpus) == "EPDCorpus(n=2)"
+
+
+def test_uuid_filter_only_parses_matched_files(ilcd_folder, monkeypatch):
+    uuid_de, uuid_fr, uuid_de2 = (spec[0] for spec in EPD_SPECS)
+    processes = ilcd_folder / "processes"
+    (processes / f"{uuid_de2}.xml").rename(processes / f"{uuid_de2}_version01.xml")
+    (processes / f"{uuid_de}.xml").rename(processes / "renamed.xml")
+
+    calls = []
+    real_extract = mod.extract_records
+
+    def fake_extract(paths, flows, workers):
+        calls.extend(path.name for path in paths)
+        return real_extract(paths, flows, workers)
+
+    monkeypatch.setattr(mod, "extract_records", fake_extract, raising=True)
+    corpus = mod.EPDCorpus.from_folder(processes)
+    assert corpus.files == {
+        uuid_de: [processes / "renamed.xml"],
+        uuid_fr: [processes / f"{uuid_fr}.xml"],
+        uuid_de2: [processes / f"{uuid_de2}_version01.xml"],
+    }
+
+    filters = [UUIDFilter([uuid_fr, uuid_de2, "missing"]), UUIDFilter([uuid_fr])]
+    (record,) = corpus.candidates(filters)
+    assert record.uuid == uuid_fr and record.loc == "FRA"
+    assert record.material_kwargs is not None
+    assert calls == [f"{uuid_fr}.xml"]
+
+    assert [r.uuid for r in corpus.candidates([UUIDFilter([uuid_de])])] == [uuid_de]
+    assert len(calls) == 2
+
+
+def test_corpus_with_workers_returns_records_in_serial_order(ilcd_folder):
+    serial = mod.EPDCorpus.from_folder(ilcd_folder / "processes")
+    parallel = mod.EPDCorpus.from_folder(ilcd_folder / "processes", workers=2)
+    assert parallel.epds == serial.epds
+    assert mod.load_corpus(ilcd_folder, workers=2).workers == 2
+
+
+def test_in_memory_corpus_applies_uuid_filters(monkeypatch):
+    monkeypatch.setattr(filters, "FILTER_STATS", {})
+    records = [EPDRecord(uuid=u, path=Path(f"{u}.xml")) for u in ("a", "b")]
+    corpus = mod.EPDCorpus(records)
+    assert corpus.candidates([UUIDFilter(["b"])]) == records[1:]
+    assert corpus.candidates([]) == records
+    stats = filters.FILTER_STATS["Preselection"]
+    assert (stats.evaluated, stats.rejected) == (2, 1)
+
+
+def test_load_corpus_prefers_index_when_present(ilcd_folder):
+    corpus = mod.load_corpus(ilcd_folder)
+    assert isinstance(corpus, mod.EPDCorpus)
+    assert corpus.candidates([]) == corpus.epds
+
+    mod.EPDIndex.build(ilcd_folder).close()
+    indexed = mod.load_corpus(ilcd_folder)
+    assert isinstance(indexed, mod.EPDIndex)
+    assert len(indexed) == len(corpus) == 3
+    indexed.close()
+
+
+def test_load_corpus_opens_an_index_stored_elsewhere(ilcd_folder, tmp_path):
+    index_path = tmp_path / "elsewhere" / "index.sqlite"
+    mod.EPDIndex.build(ilcd_folder, index_path).close()
+    assert isinstance(mod.load_corpus(ilcd_folder), mod.EPDCorpus)
+
+    indexed = mod.load_corpus(ilcd_folder, index_path=index_path)
+    assert isinstance(indexed, mod.EPDIndex)
+    assert indexed.db_path == index_path and len(indexed) == 3
+    indexed.close()
@@ -0,0 +1,170 @@
+# tests/unit/test_extract.py
+import io
+import os
+import pickle
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from conftest import EPD_SPECS, ilcd_flow_xml, ilcd_process_xml
+from materia_epd.core.cache import LRUCache
+from materia_epd.core.physics import feasible_rescalings
+from materia_epd.epd import extract as mod
+from materia_epd.epd.models import IlcdProcess
+from materia_epd.io.xml_backend import PARSE_ERRORS
+
+UUID, FLOW_UUID = EPD_SPECS[1][:2]
+
+
+def test_extract_record_matches_ilcdprocess(ilcd_folder):
+    path = ilcd_folder / "processes" / f"{UUID}.xml"
+    process = IlcdProcess(root=ET.parse(path).getroot(), path=path)
+    process.get_ref_flow()
+    process.get_declared_unit()
+    process.get_hs_class()
+
+    record = mod.extract_record(path, mod.FolderFlows(ilcd_folder / "flows"))
+    assert record.uuid == process.uuid == UUID
+    assert record.loc == process.loc == "FRA"
+    assert record.hs_class == process.hs_class == "6810"
+    assert record.ref_flow_uuid == FLOW_UUID
+    assert record.dec_unit == process.dec_unit == "volume"
+    assert record.material_kwargs == process.material_kwargs
+    assert record.rescalings == feasible_rescalings(process.material_kwargs)
+    assert record.lcia == process.get_lcia_results(scaling_factor=1.0)
+
+
+def test_extract_record_reads_from_stream_and_clears_elements(monkeypatch):
+    seen = []
+    real_iterparse = mod.iterparse
+
+    def spy(source, tags):
+        for event, elem in real_iterparse(source, tags):
+            seen.append(elem)
+            yield event, elem
+
+    monkeypatch.setattr(mod, "iterparse", spy)
+    xml = ilcd_process_xml(UUID, FLOW_UUID, amount=2.0).encode()
+    flows = {FLOW_UUID: {"dec_unit": "mass", "units": [], "props": []}}
+    record = mod.extract_record("p.xml", flows, io.BytesIO(xml))
+
+    assert record.ref_flow_uuid == FLOW_UUID and record.dec_unit == "mass"
+    assert record.material_kwargs["mass"] is None
+    assert len(record.lcia) == 1
+    sections = [e for e in seen if e.tag in mod._SECTIONS]
+    assert len(sections) == 3
+    assert all(len(e) == 0 for e in sections)
+    assert all(len(e) == 0 for e in seen if e.tag == mod._EXCHANGE)
+
+
+def test_extract_record_handles_reference_after_exchanges():
+    xml = ilcd_process_xml(UUID, FLOW_UUID, amount=3.0)
+    start = xml.index("<quantitativeReference>")
+    end = xml.index("</quantitativeReference>") + len("</quantitativeReference>")
+    moved = xml[:start] + xml[end:]
+    moved = moved.replace(
+        "</processDataSet>",
+        f"<processInformation>{xml[start:end]}"
+        "</processInformation></processDataSet>",
+    )
+    flows = {FLOW_UUID: {"dec_unit": "mass", "units": [], "props": []}}
+    record = mod.extract_record("p.xml", flows, io.BytesIO(moved.encode()))
+    assert record.ref_flow_uuid == FLOW_UUID
+    assert record.material_kwargs is not None
+
+
+def test_extract_record_without_classification_or_reference():
+    record = mod.extract_record("p.xml", {}, io.BytesIO(b"<process/>"))
+    assert record.uuid is None and record.hs_class is None and record.loc is None
+    assert record.ref_flow_uuid is None and record.material_kwargs is None
+    assert record.rescalings == 0 and record.lcia == []
+
+
+def test_extract_record_raises_on_broken_xml():
+    with pytest.raises(PARSE_ERRORS):
+        mod.extract_record("p.xml", {}, io.BytesIO(b"<process>"))
+
+
+def test_folder_flows_returns_none_for_missing_or_broken_flows(tmp_path):
+    (tmp_path / "broken.xml").write_text("<flow>", encoding="utf-8")
+    flows = mod.FolderFlows(tmp_path)
+    assert flows.get("missing") is None
+    assert flows.get("broken") is None
+
+
+def test_latest_flows_prefers_highest_version(tmp_path):
+    names = ["u_version01.00.000.xml", "u_version02.00.000.xml", "u_version01.05.xml"]
+    for name in names:
+        (tmp_path / name).write_text("<flow/>", encoding="utf-8")
+    flows = [{"uuid": "u", "path": str(tmp_path / name)} for name in names]
+    assert mod.latest_flows(flows)["u"]["path"].endswith("u_version02.00.000.xml")
+
+
+def test_index_uuid_files_reads_uuid_only_when_name_is_not_one(tmp_path):
+    assert mod.index_uuid_files(tmp_path / "missing") == {}
+    (tmp_path / "doc.xml").write_text(
+        ilcd_process_xml(UUID, FLOW_UUID), encoding="utf-8"
+    )
+    (tmp_path / "empty.xml").write_text("<process/>", encoding="utf-8")
+    (tmp_path / f"{FLOW_UUID}.xml").write_text("<unread>", encoding="utf-8")
+    assert mod.index_uuid_files(tmp_path) == {
+        UUID: [tmp_path / "doc.xml"],
+        None: [tmp_path / "empty.xml"],
+        FLOW_UUID: [tmp_path / f"{FLOW_UUID}.xml"],
+    }
+
+
+def test_folder_flows_parse_each_flow_version_once(ilcd_folder, monkeypatch):
+    parsed = []
+    real_parse = mod.parse
+    monkeypatch.setattr(mod, "parse", lambda p: parsed.append(p) or real_parse(p))
+    cache = LRUCache(maxsize=8)
+    flows = mod.FolderFlows(ilcd_folder / "flows", cache=cache)
+
+    first = flows.get(FLOW_UUID)
+    assert flows.get(FLOW_UUID) == first and first["dec_unit"] == "volume"
+    assert mod.FolderFlows(ilcd_folder / "flows", cache=cache).get(FLOW_UUID) == first
+    assert len(parsed) == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    # a newer version of the flow is a different cache entry
+    newer = ilcd_folder / "flows" / f"{FLOW_UUID}_version02.00.000.xml"
+    newer.write_text(ilcd_flow_xml(FLOW_UUID, density=9.0), encoding="utf-8")
+    stat = newer.parent.stat()
+    os.utime(newer.parent, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert flows.get(FLOW_UUID)["props"] != first["props"]
+    assert len(parsed) == 2 and len(cache) == 2
+
+
+def test_extract_records_in_workers_matches_serial_order(ilcd_folder, monkeypatch):
+    monkeypatch.setattr(mod, "PARALLEL_MIN_FILES", 2)
+    processes = ilcd_folder / "processes"
+    (processes / "broken.xml").write_text("<process>", encoding="utf-8")
+    paths = sorted(processes.glob("*.xml"))
+    flows = mod.FolderFlows(ilcd_folder / "flows", cache=LRUCache())
+
+    serial = mod.extract_records(paths, flows)
+    parallel = mod.extract_records(paths, flows, workers=2)
+    assert [type(r) for r in parallel] == [type(r) for r in serial]
+    assert isinstance(parallel[-1], ET.ParseError)
+    assert parallel[:-1] == serial[:-1]
+    assert [r.uuid for r in parallel[:-1]] == [spec[0] for spec in EPD_SPECS]
+
+
+def test_extract_records_parses_small_batches_without_a_pool(ilcd_folder, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("no pool expected")
+
+    monkeypatch.setattr(mod, "ProcessPoolExecutor", no_pool)
+    paths = sorted((ilcd_folder / "processes").glob("*.xml"))
+    flows = mod.FolderFlows(ilcd_folder / "flows", cache=LRUCache())
+    records = mod.extract_records(paths, flows, workers=4)
+    assert [r.uuid for r in records] == [spec[0] for spec in EPD_SPECS]
+
+
+def test_folder_flows_pickle_without_their_cache(ilcd_folder):
+    cache = LRUCache()
+    flows = mod.FolderFlows(ilcd_folder / "flows", cache=cache)
+    flows.get(FLOW_UUID)
+    restored = pickle.loads(pickle.dumps(flows))
+    assert restored.folder == flows.folder and restored.cache is mod.FLOW_CACHE
@@ -127,9 +127,49 @@ def test_latest_flow_file_uses_mtime_when_no_versions(tmp_path):
     uuid = "zzz-uuid"
 
     older = flows / f"{uuid}.xml"
-    newer = flows / f"{uuid}-copy.xml"  # still matches f"{uuid}*.xml"
+    newer = flows / f"{uuid}_copy.xml"  # same uuid, no version
     _touch_with_time(older, time.time() - 10)
     _touch_with_time(newer, time.time() + 10)
 
     chosen = mod.latest_flow_file(flows, uuid)
     assert chosen == newer  # exercises the same return line via mtime fallback
+
+
+def test_latest_flow_file_lists_folder_once_and_sees_new_flows(tmp_path, monkeypatch):
+    flows = tmp_path / "flows_scan"
+    flows.mkdir()
+    _touch_with_time(flows / "a-uuid.xml", time.time())
+    _touch_with_time(flows / "b-uuid_version1.0.xml", time.time())
+    (flows / "notes.txt").write_text("", encoding="utf-8")
+
+    scans = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(mod.os, "scandir", lambda p: scans.append(p) or real_scandir(p))
+    assert mod.latest_flow_file(flows, "a-uuid") == flows / "a-uuid.xml"
+    assert mod.latest_flow_file(flows, "b-uuid").name == "b-uuid_version1.0.xml"
+    assert len(scans) == 1
+    with pytest.raises(FileNotFoundError):
+        mod.latest_flow_file(flows, "c-uuid")
+    assert len(scans) == 2  # listed once more before reporting a miss
+
+    # a flow added without changing the folder mtime is found on the miss
+    _touch_with_time(flows / "c-uuid.xml", time.time())
+    stat = flows.stat()
+    os.utime(flows, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    resolver = mod.flow_resolver(flows)
+    resolver._mtime_ns = stat.st_mtime_ns
+    assert mod.latest_flow_file(flows, "c-uuid") == flows / "c-uuid.xml"
+    assert len(scans) == 3
+
+    # a flow added during the run changes the folder mtime and is picked up
+    _touch_with_time(flows / "b-uuid_version2.0.xml", time.time())
+    stat = flows.stat()
+    os.utime(flows, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert mod.latest_flow_file(flows, "b-uuid").name == "b-uuid_version2.0.xml"
+    assert len(scans) == 4
+    assert mod.flow_resolver(flows) is mod.flow_resolver(flows)
+
+
+def test_flow_resolver_on_missing_folder(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        mod.FlowResolver(tmp_path / "missing").resolve("a-uuid")
@@ -22,8 +22,9 @@ class FakeMaterial:
 
 
 class FakeProcess:
-    def __init__(self, uuid="u-1", loc="FR", material=None):
+    def __init__(self, uuid="u-1", loc="FR", material=None, rescalings=None):
         self.uuid = uuid
+        self.rescalings = rescalings
         self.loc = loc
         self.material = material or FakeMaterial()
         self.ref_flow_called = 0
@@ -75,3 +76,16 @@ def test_unitconformityfilter_returns_false_on_valueerror():
     assert filt.matches(epd) is False
     # Still calls get_ref_flow even if rescale fails
     assert epd.ref_flow_called == 1
+
+
+def test_unitconformityfilter_looks_up_infeasible_rescalings():
+    filt = UnitConformityFilter({"volume": 3.0, "mass": None})
+    assert filt.rescaling == 0b010
+
+    epd = FakeProcess(rescalings=0b101)
+    assert filt.matches(epd) is False
+    assert epd.ref_flow_called == 0 and epd.material.calls == []
+
+    epd = FakeProcess(rescalings=0b010, material=FakeMaterial(raise_error=True))
+    assert filt.matches(epd) is False  # feasible, but the projection failed
+    assert epd.material.calls == [{"volume": 3.0, "mass": None}]
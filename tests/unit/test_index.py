@@ -0,0 +1,288 @@
+# tests/unit/test_index.py
+import os
+import sqlite3
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pytest
+
+from conftest import EPD_SPECS, ilcd_flow_xml, ilcd_process_xml
+from materia_epd.epd import extract
+from materia_epd.epd import filters as filters_mod
+from materia_epd.epd import index as mod
+from materia_epd.epd.filters import LocationFilter, UnitConformityFilter, UUIDFilter
+from materia_epd.epd.models import IlcdProcess
+
+UUID_DE, UUID_FR, UUID_DE2 = (spec[0] for spec in EPD_SPECS)
+
+
+@pytest.fixture
+def built_index(ilcd_folder):
+    idx = mod.EPDIndex.build(ilcd_folder)
+    yield idx
+    idx.close()
+
+
+def test_build_stores_one_record_per_process(built_index, ilcd_folder):
+    assert built_index.db_path == mod.default_index_path(ilcd_folder)
+    assert built_index.db_path.is_file()
+    assert len(built_index) == 3
+    assert [r.uuid for r in built_index] == [UUID_DE, UUID_FR, UUID_DE2]
+    assert "index.sqlite" in repr(built_index)
+
+
+def test_records_match_what_ilcdprocess_computes(built_index, ilcd_folder):
+    path = ilcd_folder / "processes" / f"{UUID_FR}.xml"
+    process = IlcdProcess(root=ET.parse(path).getroot(), path=path)
+    process.get_ref_flow()
+    process.get_declared_unit()
+    process.get_hs_class()
+
+    (record,) = built_index.records(uuids=[UUID_FR])
+    assert record.path == path
+    assert record.loc == process.loc == "FRA"
+    assert record.hs_class == process.hs_class == "6810"
+    assert record.dec_unit == process.dec_unit == "volume"
+    assert record.material_kwargs == process.material_kwargs
+
+    target = {"mass": 4.0}
+    record.get_ref_flow()
+    record.material.rescale(target)
+    process.material.rescale(target)
+    assert record.get_lcia_results() == pytest.approx(process.get_lcia_results())
+
+
+def test_candidates_push_uuid_and_location_filters_into_sql(built_index, monkeypatch):
+    monkeypatch.setattr(filters_mod, "FILTER_STATS", {})
+    filters = [
+        UUIDFilter({"uuids": [UUID_DE, UUID_FR, UUID_DE2]}),
+        UUIDFilter([UUID_DE, UUID_DE2, "missing"]),
+        LocationFilter({"DEU", "FRA"}),
+        LocationFilter({"DEU"}),
+        UnitConformityFilter({"mass": 1.0}),
+    ]
+    assert [r.uuid for r in built_index.candidates(filters)] == [UUID_DE, UUID_DE2]
+    assert len(built_index.candidates([])) == 3
+    stats = filters_mod.FILTER_STATS["Preselection"]
+    assert (stats.evaluated, stats.rejected) == (6, 1)
+
+
+def test_candidates_preselect_feasible_rescalings(built_index):
+    masks = {r.uuid: r.rescalings for r in built_index}
+    assert all(mask & 0b001 for mask in masks.values())
+    assert masks[UUID_FR] & 0b010
+
+    unit = UnitConformityFilter({"mass": 1.0})
+    assert len(built_index.candidates([unit])) == 3
+    impossible = UnitConformityFilter({"mass": 1.0, "volume": 1.0})
+    assert built_index.candidates([unit, impossible]) == []
+
+
+def test_build_replaces_previous_rows_and_tolerates_missing_flows(
+    built_index, ilcd_folder, tmp_path
+):
+    (ilcd_folder / "flows" / f"{EPD_SPECS[0][1]}.xml").unlink()
+    (ilcd_folder / "processes" / "broken.xml").write_text("<a>", encoding="utf-8")
+
+    db_path = tmp_path / "elsewhere" / "idx.sqlite"
+    rebuilt = mod.EPDIndex.build(ilcd_folder, db_path)
+    assert rebuilt.db_path == db_path
+    assert len(rebuilt) == 3
+
+    (record,) = rebuilt.records(uuids=[UUID_DE])
+    assert record.material_kwargs is None and record.dec_unit is None
+    with pytest.raises(ValueError, match="No reference flow"):
+        record.get_ref_flow()
+    rebuilt.close()
+
+
+# ------------------------------ refresh --------------------------------------
+
+
+def _bump(path, content=None):
+    """Rewrite (or just re-stamp) a file with a clearly newer mtime."""
+    if content is not None:
+        path.write_text(content, encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_refresh_without_changes_reads_nothing(built_index, ilcd_folder, monkeypatch):
+    monkeypatch.setattr(mod, "file_digest", lambda path: pytest.fail(f"read {path}"))
+    stats = built_index.refresh()
+    assert stats["flows"] == {"added": 0, "changed": 0, "removed": 0, "unchanged": 3}
+    assert stats["processes"]["unchanged"] == 3
+    assert stats["processes"]["dependent"] == 0
+
+
+def test_refresh_without_changes_does_not_wait_on_other_writers(
+    built_index, ilcd_folder, monkeypatch
+):
+    monkeypatch.setattr(mod, "INDEX_BUSY_TIMEOUT", 0.1)
+    writer = sqlite3.connect(built_index.db_path)
+    writer.execute("BEGIN IMMEDIATE")
+    writer.execute("INSERT OR REPLACE INTO meta VALUES ('other', 'writer')")
+    try:
+        index = mod.EPDIndex(built_index.db_path)
+        assert index.refresh(ilcd_folder)["processes"]["unchanged"] == 3
+        assert len(index.records(uuids=[UUID_DE])) == 1
+        index.close()
+    finally:
+        writer.rollback()
+        writer.close()
+    assert built_index.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_refresh_reparses_only_added_changed_and_removed(built_index, ilcd_folder):
+    processes = ilcd_folder / "processes"
+    _bump(processes / f"{UUID_DE}.xml")  # touched, same content
+    _bump(
+        processes / f"{UUID_FR}.xml",
+        ilcd_process_xml(UUID_FR, EPD_SPECS[1][1], loc="BE"),
+    )
+    (processes / f"{UUID_DE2}.xml").unlink()
+    new_uuid = "44444444-4444-4444-4444-444444444444"
+    (processes / f"{new_uuid}.xml").write_text(
+        ilcd_process_xml(new_uuid, EPD_SPECS[0][1], loc="NL"), encoding="utf-8"
+    )
+
+    stats = built_index.refresh(ilcd_folder)
+    assert stats["processes"] == {
+        "added": 1,
+        "changed": 1,
+        "removed": 1,
+        "unchanged": 1,
+        "dependent": 0,
+    }
+    assert {r.uuid: r.loc for r in built_index} == {
+        UUID_DE: "DEU",
+        UUID_FR: "BEL",
+        new_uuid: "NLD",
+    }
+
+
+def test_refresh_reextracts_processes_of_changed_flows(built_index, ilcd_folder):
+    flow_uuid = EPD_SPECS[0][1]
+    _bump(
+        ilcd_folder / "flows" / f"{flow_uuid}.xml",
+        ilcd_flow_xml(flow_uuid, density=3.0),
+    )
+    stats = built_index.refresh()
+    assert stats["flows"]["changed"] == 1
+    assert stats["processes"]["dependent"] == 1
+    (record,) = built_index.records(uuids=[UUID_DE])
+    assert record.material_kwargs["gross_density"] == 3.0
+
+    (ilcd_folder / "flows" / f"{flow_uuid}.xml").unlink()
+    stats = built_index.refresh()
+    assert stats["flows"]["removed"] == 1
+    (record,) = built_index.records(uuids=[UUID_DE])
+    assert record.material_kwargs is None
+
+
+def test_refresh_keys_files_on_resolved_paths(built_index, ilcd_folder, monkeypatch):
+    monkeypatch.chdir(ilcd_folder.parent)
+    stats = built_index.refresh(ilcd_folder.name)
+    assert stats["processes"] == {
+        "added": 0,
+        "changed": 0,
+        "removed": 0,
+        "unchanged": 3,
+        "dependent": 0,
+    }
+
+
+def test_refresh_without_a_known_folder_raises(tmp_path):
+    index = mod.EPDIndex(tmp_path / "empty.sqlite")
+    with pytest.raises(ValueError, match="No EPD folder"):
+        index.refresh()
+    index.close()
+
+
+def test_reopening_an_outdated_schema_clears_the_index(built_index, ilcd_folder):
+    with built_index.conn:
+        built_index.conn.execute(
+            "UPDATE meta SET value = '0' WHERE key = 'schema_version'"
+        )
+    built_index.conn.execute("ALTER TABLE epds DROP COLUMN rescalings")
+    reopened = mod.EPDIndex(built_index.db_path)
+    assert len(reopened) == 0 and reopened.epd_folder is None
+    reopened.refresh(ilcd_folder)
+    assert len(reopened) == 3
+    reopened.close()
+
+
+def test_sync_hands_paths_not_contents_to_handlers(built_index, ilcd_folder):
+    seen = []
+    built_index.clear()
+    built_index._sync(ilcd_folder / "processes", "processes", seen.extend)
+    assert len(seen) == 3
+    assert all(isinstance(path, str) and exists is True for path, exists in seen)
+
+
+def test_build_with_workers_stores_the_same_records(
+    built_index, ilcd_folder, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(extract, "PARALLEL_MIN_FILES", 2)
+    parallel = mod.EPDIndex.build(ilcd_folder, tmp_path / "p.sqlite", workers=2)
+    assert parallel.records() == built_index.records()
+    parallel.close()
+
+
+# ------------------------------ LCIA cache -----------------------------------
+
+
+def _rescaled(records):
+    for record in records:
+        record.get_ref_flow()
+        record.material.rescale({"mass": 2.0})
+    return records
+
+
+def test_refresh_writes_lcia_cache_once_and_after_changes(built_index, ilcd_folder):
+    meta = mod.read_tensor_meta(built_index.lcia_cache_path)
+    assert meta["keys"] == [str(r.path) for r in built_index]
+    assert built_index.refresh()["processes"]["unchanged"] == 3
+    assert mod.read_tensor_meta(built_index.lcia_cache_path)["token"] == meta["token"]
+
+    (ilcd_folder / "processes" / f"{UUID_DE2}.xml").unlink()
+    built_index.refresh()
+    assert len(mod.read_tensor_meta(built_index.lcia_cache_path)["keys"]) == 2
+
+
+def test_lcia_tensor_reads_the_memory_mapped_cache(built_index, monkeypatch):
+    epds = _rescaled(built_index.records()[::-1])
+    expected = mod.LCIATensor.from_results([e.get_lcia_results() for e in epds])
+
+    monkeypatch.setattr(
+        mod.LCIATensor, "from_results", lambda *a: pytest.fail("not cached")
+    )
+    tensor = built_index.lcia_tensor(epds)
+    assert isinstance(built_index._lcia[1].values, np.memmap)
+    np.testing.assert_array_equal(tensor.values, expected.values)
+    np.testing.assert_array_equal(tensor.owner, expected.owner)
+
+
+def test_lcia_tensor_remaps_after_a_refresh_elsewhere(built_index, ilcd_folder):
+    built_index.lcia_tensor(_rescaled(built_index.records()))
+    _bump(
+        ilcd_folder / "processes" / f"{UUID_DE}.xml",
+        ilcd_process_xml(UUID_DE, EPD_SPECS[0][1], gwp={"A1": 10.0}),
+    )
+    other = mod.EPDIndex(built_index.db_path)
+    other.refresh()
+    other.close()
+
+    epds = _rescaled(built_index.records())
+    expected = mod.LCIATensor.from_results([e.get_lcia_results() for e in epds])
+    tensor = built_index.lcia_tensor(epds)
+    assert isinstance(built_index._lcia[1].values, np.memmap)
+    np.testing.assert_array_equal(tensor.values, expected.values)
+
+
+def test_lcia_tensor_falls_back_without_cache(built_index):
+    epds = _rescaled(built_index.records())
+    for path in built_index.lcia_cache_path.iterdir():
+        path.unlink()
+    tensor = built_index.lcia_tensor(epds)
+    assert len(tensor) == 3 and built_index._lcia is None
@@ -1,11 +1,18 @@
 # tests/unit/test_locations.py
+import sys
 import types
+from itertools import islice
+
+import pytest
+
 import materia_epd.geo.locations as loc
 
 
 def test_locations_full_coverage(monkeypatch):
     # ---------- stubs for ilcd_to_iso_location ----------
-    loc.get_regions_mapping = lambda: {"R1": {"Regions": "REG-VAL"}}
+    monkeypatch.setattr(
+        loc, "get_regions_mapping", lambda: {"R1": {"Regions": "REG-VAL"}}
+    )
 
     class _C:
         def __init__(self, a3):
@@ -19,8 +26,10 @@ def test_locations_full_coverage(monkeypatch):
         def get(self, *, alpha_2=None):
             return _C("HST") if alpha_2 == "HX" else None
 
-    loc.pycountry = types.SimpleNamespace(
-        countries=_Countries(), historic_countries=_Historic()
+    monkeypatch.setattr(
+        loc,
+        "pycountry",
+        types.SimpleNamespace(countries=_Countries(), historic_countries=_Historic()),
     )
 
     # direct map, regions map, countries, historic, and miss
@@ -35,7 +44,7 @@ def test_locations_full_coverage(monkeypatch):
         "X": {"Foo": None},
         "Y": {"Bar": {"Bar": 123}},
     }
-    loc.get_location_data = lambda code: data[code]
+    monkeypatch.setattr(loc, "get_location_data", lambda code: data[code])
     assert loc.get_location_attribute("X", "Foo") is None
     # expect the first-level value (a dict), matching the implementation
     assert loc.get_location_attribute("Y", "Bar") == {"Bar": 123}
@@ -44,8 +53,42 @@ def test_locations_full_coverage(monkeypatch):
     parents = {"A": "P1", "B": "P1", "C": None}
     children = {"P1": ["Achild", "Bchild"]}
 
-    loc.get_location_attribute = lambda code, attr: (
-        parents if attr == "Parent" else children
-    ).get(code)
+    monkeypatch.setattr(
+        loc,
+        "get_location_attribute",
+        lambda code, attr: (parents if attr == "Parent" else children).get(code),
+    )
 
     assert loc.escalate_location_set({"A", "B", "C"}) == {"Achild", "Bchild"}
+
+
+def test_location_hierarchy_escalates_like_location_files():
+    hierarchy = loc.get_location_hierarchy()
+    assert hierarchy.parents["LUX"] == "Western Europe"
+    assert hierarchy.classes["Western Europe"] == "Sub-region"
+    assert "LUX" in hierarchy.children["Western Europe"]
+
+    for codes in ({"LUX"}, {"LUX", "JPN"}, {"Europe"}):
+        assert hierarchy.escalate(codes) == loc.escalate_location_set(codes)
+    assert frozenset({"LUX"}) in hierarchy._escalated  # precomputed
+    rungs = list(islice(hierarchy.ladder({"LUX"}), 3))
+    assert rungs[0] == {"LUX"} and "DEU" in rungs[1]
+    assert rungs[2] == hierarchy.escalate(rungs[1])
+
+    with pytest.raises(ValueError, match="XXX"):
+        hierarchy.escalate({"XXX"})
+
+
+def test_country_codes_resolve_from_the_bundle_without_pycountry(monkeypatch):
+    import pycountry
+
+    monkeypatch.setattr(loc, "pycountry", None)
+    monkeypatch.setitem(sys.modules, "pycountry", None)  # any import would fail
+    assert loc.ilcd_to_iso_location("LU") == "LUX"
+    assert loc.ilcd_to_iso_location("CS") == "SCG"
+    with pytest.raises(ImportError):
+        loc.ilcd_to_iso_location("ZZ")
+
+    monkeypatch.setitem(sys.modules, "pycountry", pycountry)
+    assert loc.ilcd_to_iso_location("lu") == "LUX"  # case-insensitive in pycountry
+    assert loc.pycountry is pycountry
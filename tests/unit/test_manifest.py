@@ -0,0 +1,137 @@
+# tests/unit/test_manifest.py
+import json
+from pathlib import Path
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from conftest import EPD_SPECS, ilcd_flow_xml
+from materia_epd import resources
+from materia_epd.core.cache import LRUCache
+from materia_epd.epd import manifest as mod
+from materia_epd.epd import pipeline
+from materia_epd.epd.corpus import EPDCorpus
+from materia_epd.epd.index import EPDIndex
+from materia_epd.epd.models import IlcdProcess
+
+UUID, FLOW_UUID = EPD_SPECS[0][:2]
+MATCHED = [EPD_SPECS[1][0], EPD_SPECS[2][0]]
+
+
+@pytest.fixture
+def generic(ilcd_folder, tmp_path, monkeypatch):
+    """Load the first process of the ILCD folder as a generic process."""
+    (ilcd_folder / "matches").mkdir()
+    (ilcd_folder / "matches" / f"{UUID}.json").write_text(
+        json.dumps({"uuids": MATCHED}), encoding="utf-8"
+    )
+    market = tmp_path / "market.json"
+    market.write_text('{"DE": 1.0}', encoding="utf-8")
+    monkeypatch.setattr(mod, "market_shares_file", lambda loc, hs: market)
+
+    def load():
+        path = ilcd_folder / "processes" / f"{UUID}.xml"
+        process = IlcdProcess(root=ET.parse(path).getroot(), path=path)
+        process.get_ref_flow()
+        process.get_hs_class()
+        process.get_matches()
+        return process
+
+    return load, market
+
+
+def test_fingerprints_follow_every_input(generic, ilcd_folder):
+    load, market = generic
+    corpus = EPDCorpus.from_folder(ilcd_folder / "processes")
+    inputs = mod.input_fingerprints(load(), corpus)
+    assert set(inputs) == {
+        "process",
+        "ref_flow",
+        "matches",
+        "market_shares",
+        "epds",
+        "epd_flows",
+    }
+    assert sorted(inputs["epds"]) == sorted(f"processes/{uuid}.xml" for uuid in MATCHED)
+    assert mod.input_fingerprints(load(), corpus) == inputs
+
+    changes = {
+        "ref_flow": (
+            ilcd_folder / "flows" / f"{FLOW_UUID}.xml",
+            ilcd_flow_xml(FLOW_UUID, density=5.0),
+        ),
+        "matches": (
+            ilcd_folder / "matches" / f"{UUID}.json",
+            json.dumps({"uuids": MATCHED[:1]}),
+        ),
+        "market_shares": (market, '{"DE": 0.5, "FR": 0.5}'),
+        "epd_flows": (
+            ilcd_folder / "flows" / f"{EPD_SPECS[1][1]}.xml",
+            ilcd_flow_xml(EPD_SPECS[1][1], density=7.0),
+        ),
+        "epds": (ilcd_folder / "processes" / f"{MATCHED[0]}.xml", "<changed/>"),
+    }
+    for key, (path, content) in changes.items():
+        path.write_text(content, encoding="utf-8")
+        updated = mod.input_fingerprints(load(), corpus)
+        assert updated[key] != inputs[key], key
+        inputs = updated
+
+
+def test_index_digests_match_the_files(generic, ilcd_folder):
+    load, _ = generic
+    index = EPDIndex.build(ilcd_folder)
+    corpus = EPDCorpus.from_folder(ilcd_folder / "processes")
+    assert index.file_digests(MATCHED) == corpus.file_digests(MATCHED)
+    assert index.file_digests([]) == {}
+    assert index.flow_digests(MATCHED) == corpus.flow_digests(MATCHED)
+    assert len(index.flow_digests(MATCHED)) == len(MATCHED)
+    assert index.flow_digests([]) == {}
+    index.close()
+
+
+def test_manifest_round_trip_and_stale_outputs(tmp_path):
+    manifest = mod.RunManifest(tmp_path)
+    inputs = {"process": "abc", "epds": {"e.xml": "def"}}
+    (tmp_path / "processes").mkdir()
+    (tmp_path / "processes" / "p.xml").write_text("<p/>")
+    manifest.record("p", inputs, ["processes/p.xml"])
+    manifest.record("q", inputs, [])
+    manifest.save()
+
+    reloaded = mod.RunManifest(tmp_path)
+    assert len(reloaded) == 2
+    assert reloaded.is_current("p", inputs) and reloaded.is_current("q", inputs)
+    assert not reloaded.is_current("p", {**inputs, "process": "changed"})
+    assert not reloaded.is_current("missing", inputs)
+
+    (tmp_path / "processes" / "p.xml").unlink()
+    assert not reloaded.is_current("p", inputs)
+
+    data = json.loads(reloaded.path.read_text())
+    reloaded.path.write_text(json.dumps({**data, "version": 0}))
+    assert len(mod.RunManifest(tmp_path)) == 0
+
+
+def test_runs_with_the_folder_spelled_differently_skip_unchanged_processes(
+    generic, ilcd_folder, tmp_path, monkeypatch
+):
+    computed = []
+
+    def fake_pipeline(process, corpus):
+        computed.append(process.uuid)
+        return {"mass": 1.0}, {}
+
+    monkeypatch.setattr(resources, "_load_market_shares", lambda loc, hs: {"DEU": 1})
+    monkeypatch.setattr(resources, "MARKET_CACHE", LRUCache())
+    monkeypatch.setattr(pipeline, "epd_pipeline", fake_pipeline)
+    monkeypatch.setattr(pipeline, "write_results", lambda *a: [])
+    monkeypatch.chdir(ilcd_folder.parent)
+    out = tmp_path / "out"
+
+    relative = Path(ilcd_folder.name)
+    pipeline.run_materia(ilcd_folder, relative, out)
+    pipeline.run_materia(ilcd_folder, relative.resolve(), out)
+    EPDIndex.build(relative).close()
+    pipeline.run_materia(ilcd_folder, relative, out)
+    assert computed == [UUID]
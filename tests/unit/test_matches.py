@@ -0,0 +1,40 @@
+# tests/unit/test_matches.py
+import json
+
+from materia_epd.epd import matches as mod
+
+
+def _write_matches(folder, matches):
+    folder.mkdir()
+    for generic_uuid, data in matches.items():
+        (folder / f"{generic_uuid}.json").write_text(json.dumps(data))
+    (folder / "broken.json").write_text("{")
+
+
+def test_reverse_matches_maps_epds_to_their_generic_processes(tmp_path):
+    folder = tmp_path / "matches"
+    _write_matches(
+        folder,
+        {
+            "g1": {"type": "average", "uuids": ["e1", "e2"]},
+            "g2": {"uuids": ["e2"]},
+            "g3": ["e3"],
+        },
+    )
+    assert mod.read_matches(folder) == {
+        "g1": ["e1", "e2"],
+        "g2": ["e2"],
+        "g3": ["e3"],
+    }
+    assert mod.reverse_matches(folder) == {
+        "e1": {"g1"},
+        "e2": {"g1", "g2"},
+        "e3": {"g3"},
+    }
+    assert mod.dependent_processes(folder, ["e2", "e3", "unknown"]) == {
+        "g1",
+        "g2",
+        "g3",
+    }
+    assert mod.dependent_processes(folder, ["unknown"]) == set()
+    assert mod.reverse_matches(tmp_path / "missing") == {}
@@ -1,15 +1,24 @@
 # test_models_full_coverage.py
 import xml.etree.ElementTree as ET
 from pathlib import Path
+import pytest
+
 from materia_epd.epd import models
 
 
-def test_models_full_coverage(tmp_path):
+@pytest.fixture(scope="module")
+def module_patch():
+    """Patches shared by the tests of this module, undone once they all ran."""
+    with pytest.MonkeyPatch.context() as mp:
+        yield mp
+
+
+def test_models_full_coverage(tmp_path, module_patch):
     # -------- Patch minimal constants & helpers (no namespaces) --------
-    models.FLOW_PROPERTY_MAPPING = {"kg": "UUID-MASS"}
-    models.UNIT_QUANTITY_MAPPING = {"kg": "mass"}
-    models.UNIT_PROPERTY_MAPPING = {"g/cm3": "gross_density"}
-    models.NS = {}
+    module_patch.setattr(models, "FLOW_PROPERTY_MAPPING", {"kg": "UUID-MASS"})
+    module_patch.setattr(models, "UNIT_QUANTITY_MAPPING", {"kg": "mass"})
+    module_patch.setattr(models, "UNIT_PROPERTY_MAPPING", {"g/cm3": "gross_density"})
+    module_patch.setattr(models, "NS", {})
 
     class XP:
         FLOW_PROPERTY = "flowProperty"
@@ -47,30 +56,36 @@ def test_models_full_coverage(tmp_path):
         NAME = "name"
         CLASS_ID = "classId"
 
-    models.XP = XP
-    models.ATTR = ATTR
+    module_patch.setattr(models, "XP", XP)
+    module_patch.setattr(models, "ATTR", ATTR)
 
-    models.to_float = lambda v, positive=False: float(v)
-    models.ilcd_to_iso_location = lambda code: code
+    module_patch.setattr(models, "to_float", lambda v, positive=False: float(v))
+    module_patch.setattr(models, "ilcd_to_iso_location", lambda code: code)
 
     class Material:
         def __init__(self, **kwargs):
             self.kwargs = kwargs
             self.scaling_factor = 2.0
 
-    models.Material = Material
-    models.normalize_module_values = lambda elems, scaling_factor=1.0: [10, 20, 30]
-    models.get_indicator_synonyms = lambda: {"GWP": ["Global Warming Potential"]}
-    models.get_market_shares = lambda _loc, _hs: {"EU": 0.7}
-    models.read_json_file = lambda _p: {"match": True}
-    models.MATCHES_FOLDER = str(tmp_path)
+    module_patch.setattr(models, "Material", Material)
+    module_patch.setattr(
+        models,
+        "normalize_module_values",
+        lambda elems, scaling_factor=1.0: [10, 20, 30],
+    )
+    module_patch.setattr(
+        models, "get_indicator_synonyms", lambda: {"GWP": ["Global Warming Potential"]}
+    )
+    module_patch.setattr(models, "get_market_shares", lambda _loc, _hs: {"EU": 0.7})
+    module_patch.setattr(models, "read_json_file", lambda _p: {"match": True})
+    module_patch.setattr(models, "MATCHES_FOLDER", str(tmp_path), raising=False)
 
     def _ilcdflow_init(self, root):
         self.root = root
         self._get_units()
         self._get_props()
 
-    models.IlcdFlow.__init__ = _ilcdflow_init
+    module_patch.setattr(models.IlcdFlow, "__init__", _ilcdflow_init)
 
     # -------- Tiny on-disk dataset --------
     base = tmp_path / "dataset"
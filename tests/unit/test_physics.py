@@ -189,3 +189,30 @@ def test_rescale_thickness_requires_density_when_surface_known():
     with pytest.raises(ValueError, match="density.*must be known"):
         # Still the accepted combo; thickness processed first
         m.rescale({"layer_thickness": 2.0, "surface": 1.0})
+
+
+def test_rescaling_bit_of_targets():
+    assert ph.rescaling_bit({"mass": 2.0, "volume": None}) == 0b001
+    assert ph.rescaling_bit({"volume": 1.0}) == 0b010
+    assert ph.rescaling_bit({"surface": 1.0, "layer_thickness": 0.01}) == 0b100
+    assert ph.rescaling_bit({"mass": 1.0, "volume": 1.0}) == 0
+    assert ph.rescaling_bit({"mass": 0.0}) == 0
+    assert ph.rescaling_bit({"foo": 1.0}) == 0
+
+
+@pytest.mark.parametrize(
+    "kwargs, mask",
+    [
+        ({"mass": 2.0}, 0b001),
+        ({"volume": 2.0, "gross_density": 500.0}, 0b011),
+        ({"surface": 2.0, "layer_thickness": 0.01}, 0b010),
+        ({"surface": 2.0, "grammage": 10.0, "gross_density": 1000.0}, 0b111),
+        ({}, 0),
+    ],
+)
+def test_feasible_rescalings_predicts_rescale_failures(kwargs, mask):
+    assert ph.feasible_rescalings(kwargs) == mask
+    for i, combo in enumerate(ph.ACCEPTED_RESCALINGS):
+        if not mask & 1 << i:
+            with pytest.raises(ValueError):
+                ph.Material(**kwargs).rescale({name: 1.0 for name in combo})
@@ -1,10 +1,14 @@
 # tests/unit/test_pipeline.py
 from pathlib import Path
+import re
 import types
 import xml.etree.ElementTree as ET
 import pytest
 
-from materia_epd.epd import pipeline as pl
+from materia_epd.core.cache import LRUCache
+from materia_epd.epd import filters, pipeline as pl
+from materia_epd.epd.filters import EPDFilter, FilterCost
+from materia_epd.geo.locations import LocationHierarchy
 
 
 # ------------------------------ gen_xml_objects ------------------------------
@@ -74,8 +78,9 @@ def test_gen_filtered_epds_applies_all_filters():
         def __init__(self, v):
             self.v = v
 
-    class F:
+    class F(EPDFilter):
         def __init__(self, ok):
+            super().__init__()
             self.ok = ok
 
         def matches(self, epd):
@@ -88,6 +93,36 @@ def test_gen_filtered_epds_applies_all_filters():
     assert [e.v for e in out] == [2, 4]
 
 
+def test_gen_filtered_epds_runs_cheap_filters_first_and_counts(monkeypatch):
+    monkeypatch.setattr(filters, "FILTER_STATS", {})
+    calls = []
+
+    class Expensive(EPDFilter):
+        cost = FilterCost.SOLVE
+
+        def matches(self, epd):
+            calls.append(epd.uuid)
+            return epd.uuid != "b"
+
+    epds = [types.SimpleNamespace(uuid=u) for u in "abx"]
+    expensive, cheap = Expensive(), pl.UUIDFilter(["a", "b", "c"])
+    out = list(pl.gen_filtered_epds(epds, [expensive, cheap]))
+    assert out == epds[:1] and calls == ["a", "b"]
+    assert (cheap.stats.evaluated, cheap.stats.rejected) == (3, 1)
+    assert (expensive.stats.evaluated, expensive.stats.rejected) == (2, 1)
+
+    filters.merge_filter_stats({"Expensive": filters.FilterStats(1, 1, 0.5)})
+    stats = filters.FILTER_STATS["Expensive"]
+    assert (stats.evaluated, stats.rejected) == (3, 2) and stats.seconds >= 0.5
+    assert filters.FILTER_STATS["UUIDFilter"].evaluated == 3
+    assert filters.FILTER_STATS["UUIDFilter"].seconds > 0.0
+
+
+def test_unchecked_filters_leave_out_what_corpora_answer():
+    uuid, unit = pl.UUIDFilter(["a"]), pl.UnitConformityFilter({"mass": 1.0})
+    assert pl.unchecked_filters([uuid, unit]) == [unit]
+
+
 # ---------------------------- gen_locfiltered_epds ---------------------------
 
 
@@ -124,10 +159,39 @@ def test_gen_locfiltered_epds_raises_when_not_found(monkeypatch):
         list(pl.gen_locfiltered_epds([1], [LF({"XX"})], max_attempts=2))
 
 
+def test_located_epds_merges_location_buckets(monkeypatch):
+    epds = [types.SimpleNamespace(loc=loc) for loc in ["FR", "DE", None, "FR", "BE"]]
+    by_location = pl.group_by_location(epds)
+    assert by_location == {"FR": [0, 3], "DE": [1], None: [2], "BE": [4]}
+
+    hierarchy = LocationHierarchy(
+        {
+            "BNL": {"Parent": "EU", "Children": ["BE", "NL", "LU"]},
+            "EU": {"Parent": "EU", "Children": ["BNL"]},
+            "IT": {"Parent": "EU"},
+            **{code: {"Parent": "BNL"} for code in ("BE", "NL", "LU")},
+        }
+    )
+    monkeypatch.setattr(pl, "get_location_hierarchy", lambda: hierarchy)
+    monkeypatch.setattr(pl, "escalate_location_set", hierarchy.escalate)
+    assert pl.located_epds(by_location, {"FR"}) == [0, 3]
+    assert pl.located_epds(by_location, {"BE", "FR"}) == [0, 3, 4]
+    assert pl.located_epds(by_location, {"LU"}) == [4]
+    for country in ("FR", "LU"):
+        expected = list(pl.gen_locfiltered_epds(epds, [pl.LocationFilter({country})]))
+        assert [epds[i] for i in pl.located_epds(by_location, {country})] == expected
+
+    with pytest.raises(pl.NoMatchingEPDError, match="BNL"):
+        pl.located_epds(by_location, {"IT"}, max_attempts=2)
+    with pytest.raises(ValueError, match="XX"):
+        pl.located_epds(by_location, {"XX"})
+
+
 # ------------------------------ epd_pipeline ------------------------------ #
 
 
 def test_epd_pipeline_happy_path(monkeypatch, tmp_path: Path):
+    monkeypatch.setattr(filters, "FILTER_STATS", {})
     process = types.SimpleNamespace(
         matches={"uuids": ["u1"]},
         material_kwargs={"mass": 1.0},
@@ -135,16 +199,14 @@ def test_epd_pipeline_happy_path(monkeypatch, tmp_path: Path):
     )
 
     class EPD:
-        def __init__(self, name):
-            self.name = name
+        def __init__(self, name, loc):
+            self.name = self.uuid = name
+            self.loc = loc
             self.lcia_results = {"GWP": 1}
 
         def get_lcia_results(self):
             self.lcia_results = {"GWP": 2}
-
-    monkeypatch.setattr(
-        pl, "gen_epds", lambda folder: [EPD("a"), EPD("b")], raising=True
-    )
+            return self.lcia_results
 
     monkeypatch.setattr(pl, "UUIDFilter", lambda m: ("UUIDFilter", m), raising=True)
     monkeypatch.setattr(
@@ -155,6 +217,7 @@ def test_epd_pipeline_happy_path(monkeypatch, tmp_path: Path):
     monkeypatch.setattr(
         pl, "gen_filtered_epds", lambda epds, f: list(epds), raising=True
     )
+    monkeypatch.setattr(pl, "unchecked_filters", lambda f: f, raising=True)
 
     monkeypatch.setattr(
         pl, "average_material_properties", lambda epds: {"mass": 2.0}, raising=True
@@ -172,28 +235,48 @@ def test_epd_pipeline_happy_path(monkeypatch, tmp_path: Path):
 
     monkeypatch.setattr(pl, "Material", FakeMat, raising=True)
 
-    monkeypatch.setattr(
-        pl, "gen_locfiltered_epds", lambda epds, filters: list(epds), raising=True
-    )
-
     monkeypatch.setattr(
         pl,
-        "average_impacts",
-        lambda lcia_list: {"GWP": sum(d["GWP"] for d in lcia_list) / len(lcia_list)},
+        "located_epds",
+        lambda by_location, locations: sorted(sum(by_location.values(), [])),
         raising=True,
     )
 
+    class FakeTensor:
+        def __init__(self, results):
+            self.results = results
+
+        def weighted_average(self, market, epds_by_country):
+            return {
+                "GWP": sum(
+                    w
+                    * sum(self.results[i]["GWP"] for i in epds_by_country[c])
+                    / len(epds_by_country[c])
+                    for c, w in market.items()
+                )
+            }
+
     monkeypatch.setattr(
-        pl,
-        "weighted_averages",
-        lambda market, imp: {"GWP": sum(imp[c]["GWP"] * w for c, w in market.items())},
+        pl.EPDCorpus,
+        "lcia_tensor",
+        lambda self, epds: FakeTensor([epd.get_lcia_results() for epd in epds]),
         raising=True,
     )
 
-    avg_props, avg_gwps = pl.epd_pipeline(process, tmp_path)
+    corpus = pl.EPDCorpus([EPD("a", "FR"), EPD("b", "DE")])
+    avg_props, avg_gwps = pl.epd_pipeline(process, corpus)
 
     assert avg_props == {"mass": 2.0}
     assert avg_gwps == {"GWP": 2.0}
+    assert process.used_epd_uuids == ["a", "b"]
+    stats = filters.FILTER_STATS["Location selection"]
+    assert (stats.evaluated, stats.rejected) == (4, 0)
+
+    monkeypatch.setattr(
+        pl.EPDCorpus, "from_folder", lambda folder: corpus, raising=True
+    )
+    avg_props, avg_gwps = pl.epd_pipeline(process, tmp_path)
+    assert avg_props == {"mass": 2.0}
 
 
 # ------------------------------ run_materia ------------------------------- #
@@ -226,7 +309,7 @@ def test_run_materia_executes_pipeline_and_writes(monkeypatch, tmp_path: Path):
             self._write_args = None
 
         def get_ref_flow(self):
-            pass
+            self.ref_flow = types.SimpleNamespace(uuid="flow-1")
 
         def get_declared_unit(self):
             pass
@@ -252,8 +335,17 @@ def test_run_materia_executes_pipeline_and_writes(monkeypatch, tmp_path: Path):
     epd_return_avg_props = {"mass": 42.0}
     epd_return_avg_gwps = {"GWP": 3.5}
 
-    def fake_epd_pipeline(process, path_to_epd_folder):
-        assert path_to_epd_folder == epd_dir / "processes"
+    loaded = []
+
+    def fake_load_corpus(folder, workers, index_path):
+        assert Path(folder) == epd_dir and workers == 1
+        loaded.append(folder)
+        return "CORPUS"
+
+    monkeypatch.setattr(pl, "load_corpus", fake_load_corpus, raising=True)
+
+    def fake_epd_pipeline(process, corpus):
+        assert corpus == "CORPUS"
         return epd_return_avg_props, epd_return_avg_gwps
 
     monkeypatch.setattr(pl, "epd_pipeline", fake_epd_pipeline, raising=True)
@@ -264,4 +356,290 @@ def test_run_materia_executes_pipeline_and_writes(monkeypatch, tmp_path: Path):
 
     monkeypatch.setattr(pl, "Material", FakeMaterial, raising=True)
 
+    inputs = {"process": "v1"}
+    monkeypatch.setattr(pl, "input_fingerprints", lambda process, corpus: inputs)
+    calls = []
+    monkeypatch.setattr(
+        pl, "epd_pipeline", lambda *a: calls.append(a) or fake_epd_pipeline(*a)
+    )
+
     pl.run_materia(prod_dir, epd_dir, out_dir)
+    assert len(loaded) == 1 and len(calls) == 1
+    assert pl.RunManifest(out_dir).entries["uuid-123"]["outputs"] == [
+        "processes/uuid-123.xml",
+        "flows/flow-1.xml",
+    ]
+
+    # outputs not written by the fake process: recomputed
+    pl.run_materia(prod_dir, epd_dir, out_dir)
+    assert len(calls) == 2
+
+    for out in ("processes/uuid-123.xml", "flows/flow-1.xml"):
+        (out_dir / out).parent.mkdir(exist_ok=True)
+        (out_dir / out).write_text("<done/>")
+    pl.run_materia(prod_dir, epd_dir, out_dir)
+    assert len(calls) == 2
+    pl.run_materia(prod_dir, epd_dir, out_dir, force=True)
+    inputs["process"] = "v2"
+    pl.run_materia(prod_dir, epd_dir, out_dir)
+    assert len(calls) == 4
+
+
+class InlinePool:
+    """ProcessPoolExecutor stand-in running jobs in this process."""
+
+    def __init__(self, jobs, initializer, initargs):
+        initializer(*initargs)
+
+    def map(self, fn, items):
+        return map(fn, items)
+
+    def shutdown(self, cancel_futures=False):
+        pass
+
+
+def test_run_materia_with_jobs_writes_and_reports_in_folder_order(
+    monkeypatch, tmp_path: Path, capsys
+):
+    gen, epd_dir, out_dir = tmp_path / "gen", tmp_path / "epds", tmp_path / "out"
+    (gen / "processes").mkdir(parents=True)
+    for name in ("a", "b", "c"):
+        (gen / "processes" / f"{name}.xml").write_text("<root/>")
+    (gen / "processes" / "bad.xml").write_text("<root>")
+
+    def fake_load_generic_process(path, root):
+        return types.SimpleNamespace(
+            uuid=path.stem, path=path, matches=path.stem != "c"
+        )
+
+    def fake_epd_pipeline(process, corpus):
+        assert corpus == ("CORPUS", epd_dir)  # the parent's, not reloaded
+        print(f"pipeline {process.uuid}")
+        return (None, None) if process.uuid == "b" else ({"mass": 1.0}, {})
+
+    written = []
+    monkeypatch.setattr(pl, "ProcessPoolExecutor", InlinePool)
+    monkeypatch.setattr(pl, "load_corpus", lambda folder, **kw: ("CORPUS", folder))
+    monkeypatch.setattr(pl, "read_generic_process", fake_load_generic_process)
+    monkeypatch.setattr(pl, "load_generic_process", fake_load_generic_process)
+    monkeypatch.setattr(pl, "epd_pipeline", fake_epd_pipeline)
+    monkeypatch.setattr(
+        pl,
+        "write_results",
+        lambda process, *results: written.append(process.uuid) or [],
+    )
+    monkeypatch.setattr(pl, "input_fingerprints", lambda process, corpus: {})
+
+    pl.run_materia(gen, epd_dir, out_dir, jobs=2)
+    order = [p.stem for p in (gen / "processes").glob("*.xml") if p.stem != "bad"]
+    assert written == [u for u in order if u != "c"]
+    out = capsys.readouterr().out
+    assert "Error reading bad.xml" in out
+    assert re.findall(r"pipeline (\w)", out) == [u for u in order if u != "c"]
+
+    def failing_pipeline(process, corpus):
+        raise pl.NoMatchingEPDError(["filters"])
+
+    monkeypatch.setattr(pl, "epd_pipeline", failing_pipeline)
+    pl.run_materia(gen, epd_dir, out_dir, jobs=2)  # unchanged inputs: skipped
+    assert "a: unchanged, skipped" in capsys.readouterr().out
+    with pytest.raises(pl.NoMatchingEPDError):
+        pl.run_materia(gen, epd_dir, out_dir, jobs=2, force=True)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_run_materia_resumes_after_a_crash(monkeypatch, tmp_path: Path, jobs):
+    gen, epd_dir, out_dir = tmp_path / "gen", tmp_path / "epds", tmp_path / "out"
+    (gen / "processes").mkdir(parents=True)
+    names = ["a", "b", "c"]
+    for name in names:
+        (gen / "processes" / f"{name}.xml").write_text(
+            f'<root xmlns:common="{pl.NS["common"]}">'
+            f"<common:UUID>{name}</common:UUID></root>"
+        )
+    order = [p.stem for p in (gen / "processes").glob("*.xml")]
+
+    computed, crash = [], [order[1]]
+
+    def fake_epd_pipeline(process, corpus):
+        if process.uuid in crash:
+            raise ValueError("Comtrade timeout")
+        computed.append(process.uuid)
+        return {"mass": 1.0}, {}
+
+    monkeypatch.setattr(pl, "ProcessPoolExecutor", InlinePool)
+    monkeypatch.setattr(pl, "load_corpus", lambda *a, **kw: "CORPUS")
+
+    def fake_process(path, root):
+        return types.SimpleNamespace(uuid=path.stem, path=path, matches=1)
+
+    monkeypatch.setattr(pl, "read_generic_process", fake_process)
+    monkeypatch.setattr(pl, "load_generic_process", fake_process)
+    monkeypatch.setattr(pl, "read_reference_flow", lambda process: process)
+    monkeypatch.setattr(pl, "epd_pipeline", fake_epd_pipeline)
+    monkeypatch.setattr(pl, "write_results", lambda *a: ["out.xml"])
+    monkeypatch.setattr(pl, "input_fingerprints", lambda process, corpus: {})
+
+    with pytest.raises(ValueError):
+        pl.run_materia(gen, epd_dir, out_dir, jobs=jobs)
+    assert computed == order[:1]
+    journal = out_dir / ".materia" / "journal.jsonl"
+    with journal.open("a") as f:
+        f.write('{"uuid": "cut sh')  # a line a crash cut short
+
+    crash.clear()
+    pl.run_materia(gen, epd_dir, out_dir, jobs=jobs, resume=True)
+    assert computed == order
+    assert pl.RunJournal(out_dir, resume=True).done == {
+        name: "completed" for name in names
+    }
+
+    pl.run_materia(gen, epd_dir, out_dir, jobs=jobs, force=True)
+    assert computed == order * 2
+
+
+def test_recompute_materia_runs_only_dependent_processes(monkeypatch, tmp_path, capsys):
+    gen = tmp_path / "gen"
+    (gen / "matches").mkdir(parents=True)
+    (gen / "matches" / "g1.json").write_text('{"uuids": ["e1", "e2"]}')
+    (gen / "matches" / "g2.json").write_text('{"uuids": ["e3"]}')
+
+    runs = []
+    monkeypatch.setattr(pl, "run_materia", lambda *a, **kw: runs.append(kw))
+
+    assert pl.recompute_materia(gen, "epds", "out", ["e2"], jobs=2) == {"g1"}
+    assert runs == [
+        {"workers": 1, "jobs": 2, "force": True, "uuids": {"g1"}, "index_path": None},
+    ]
+    assert pl.recompute_materia(gen, "epds", "out", ["unknown"]) == set()
+    assert len(runs) == 1
+    assert "No generic process" in capsys.readouterr().out
+
+
+def test_run_materia_with_uuids_writes_only_those(monkeypatch, tmp_path: Path):
+    gen, out_dir = tmp_path / "gen", tmp_path / "out"
+    (gen / "processes").mkdir(parents=True)
+    for name in ("a", "b"):
+        (gen / "processes" / f"{name}.xml").write_text(
+            f'<root xmlns:common="{pl.NS["common"]}">'
+            f"<common:UUID>{name}</common:UUID></root>"
+        )
+    written = []
+    monkeypatch.setattr(pl, "load_corpus", lambda *a, **kw: "CORPUS")
+
+    def fake_process(path, root):
+        return types.SimpleNamespace(uuid=path.stem, path=path, matches=1)
+
+    monkeypatch.setattr(pl, "read_generic_process", fake_process)
+    monkeypatch.setattr(pl, "load_generic_process", fake_process)
+    monkeypatch.setattr(pl, "read_reference_flow", lambda process: process)
+    monkeypatch.setattr(pl, "epd_pipeline", lambda process, corpus: ({}, {}))
+    monkeypatch.setattr(
+        pl, "write_results", lambda process, *a: written.append(process.uuid) or []
+    )
+    monkeypatch.setattr(pl, "input_fingerprints", lambda process, corpus: {})
+
+    (gen / "matches").mkdir()
+    for name in ("a", "b"):
+        (gen / "matches" / f"{name}.json").write_text('{"uuids": []}')
+    (gen / "other.txt").write_text("copied by full runs only")
+    journal = out_dir / ".materia" / "journal.jsonl"
+    journal.parent.mkdir(parents=True)
+    journal.write_text('{"uuid": "a", "outcome": "completed"}\n')
+
+    filters.FILTER_STATS["Stale"] = filters.FilterStats(1, 1, 0.0)
+    pl.run_materia(gen, tmp_path, out_dir, uuids={"b"})
+    assert written == ["b"]
+    assert "Stale" not in filters.FILTER_STATS
+    assert not (out_dir / "other.txt").exists()
+    assert sorted(p.name for p in (out_dir / "matches").iterdir()) == ["b.json"]
+    assert pl.RunJournal(out_dir, resume=True).done == {
+        "a": "completed",
+        "b": "incomplete",
+    }
+
+
+def test_compute_yields_results_without_writing(monkeypatch, tmp_path: Path):
+    gen = tmp_path / "gen"
+    (gen / "processes").mkdir(parents=True)
+    for name in ("a", "b", "c"):
+        (gen / "processes" / f"{name}.xml").write_text("<root/>")
+
+    def fake_epd_pipeline(process, corpus):
+        assert corpus == "CORPUS"
+        process.used_epd_uuids = [] if process.uuid == "b" else ["e1", "e2"]
+        return (None, None) if process.uuid == "b" else ({"mass": 1.0}, {"GWP": {}})
+
+    monkeypatch.setattr(pl, "load_corpus", lambda folder, **kw: "CORPUS")
+    monkeypatch.setattr(
+        pl,
+        "load_generic_process",
+        lambda path, root: types.SimpleNamespace(
+            uuid=path.stem, matches=path.stem != "c"
+        ),
+    )
+    monkeypatch.setattr(pl, "epd_pipeline", fake_epd_pipeline)
+
+    results = {r.uuid: r for r in pl.compute(gen, tmp_path / "epds")}
+    assert results == {
+        "a": pl.ProcessResult("a", {"mass": 1.0}, {"GWP": {}}, ["e1", "e2"]),
+        "b": pl.ProcessResult("b", None, None, []),
+    }
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["gen"]
+
+
+def test_init_job_opens_the_parent_index_or_takes_its_corpus(
+    ilcd_folder, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(pl, "_job_corpus", None)
+    index = pl.EPDIndex.build(ilcd_folder, tmp_path / "index.sqlite")
+    pl._init_job(index.db_path, workers=3)
+    assert isinstance(pl._job_corpus, pl.EPDIndex)
+    assert pl._job_corpus.workers == 3 and len(pl._job_corpus) == len(index)
+    pl._job_corpus.close()
+    index.close()
+
+    corpus = pl.EPDCorpus.from_folder(ilcd_folder / "processes")
+    monkeypatch.setattr(pl.FLOW_CACHE, "maxsize", pl.FLOW_CACHE_SIZE)
+    monkeypatch.setattr(pl.MARKET_CACHE, "maxsize", pl.MARKET_CACHE_SIZE)
+    pl._init_job(corpus, 1, 16, 8)
+    assert pl._job_corpus is corpus
+    assert (pl.FLOW_CACHE.maxsize, pl.MARKET_CACHE.maxsize) == (16, 8)
+
+
+def test_run_job_returns_the_flow_cache_counts_of_its_process(monkeypatch):
+    monkeypatch.setattr(pl, "FLOW_CACHE", LRUCache())
+    pl.FLOW_CACHE.add_counts(5, 5)  # earlier processes of the same worker
+    monkeypatch.setattr(pl, "read_xml_object", lambda path: None)
+    monkeypatch.setattr(
+        pl,
+        "load_generic_process",
+        lambda path, root: types.SimpleNamespace(uuid=path.stem),
+    )
+
+    def fake_epd_pipeline(process, corpus):
+        pl.FLOW_CACHE.get_or_set("flow", dict)
+        pl.FLOW_CACHE.get("flow")
+        pl.FLOW_CACHE.get("flow")
+        return {}, {}
+
+    monkeypatch.setattr(pl, "epd_pipeline", fake_epd_pipeline)
+    *_, error, stats, flow_counts = pl._run_job(Path("a.xml"))
+    assert error is None and flow_counts == (2, 1)
+
+
+def test_package_exports_compute_lazily():
+    import subprocess
+    import sys
+
+    import materia_epd
+
+    assert materia_epd.compute is pl.compute
+    assert materia_epd.ProcessResult is pl.ProcessResult
+    with pytest.raises(AttributeError):
+        materia_epd.missing
+    code = (
+        "import sys, materia_epd.resources; "
+        "sys.exit('materia_epd.epd.pipeline' in sys.modules)"
+    )
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
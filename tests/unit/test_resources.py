@@ -2,9 +2,24 @@ from unittest.mock import patch, MagicMock
 import sys
 import types
 
+import pytest
+
 import materia_epd.resources as res
 
 
+@pytest.fixture(autouse=True)
+def _clear_resource_caches():
+    """Do not leak the mocked resources of these tests to later modules."""
+    yield
+    for cached in (
+        res.load_json_from_package,
+        res.get_geo_bundle,
+        res.get_indicator_synonyms,
+        res.get_market_shares,
+    ):
+        cached.cache_clear()
+
+
 def test_load_json_from_package_success_and_cache():
     res.load_json_from_package.cache_clear()
 
@@ -59,16 +74,14 @@ def test_iter_json_from_package_folder(mock_files, mock_as_file, mock_gen):
     mock_gen.assert_called_once_with(fake_folder)
 
 
-@patch("materia_epd.resources.load_json_from_package")
-def test_get_regions_mapping(mock_load):
-    mock_load.return_value = {"EU": "Europe"}
-    result = res.get_regions_mapping()
-    assert result == {"EU": "Europe"}
-    mock_load.assert_called_once_with("regions_mapping.json")
+def test_get_regions_mapping(monkeypatch):
+    monkeypatch.setattr(res, "get_geo_bundle", lambda: {"regions": {"EU": "Europe"}})
+    assert res.get_regions_mapping() == {"EU": "Europe"}
 
 
 @patch("materia_epd.resources.load_json_from_package")
 def test_get_indicator_synonyms(mock_load):
+    res.get_indicator_synonyms.cache_clear()
     mock_load.return_value = {"GHG": "Greenhouse gases"}
     result = res.get_indicator_synonyms()
     assert result == {"GHG": "Greenhouse gases"}
@@ -184,9 +197,55 @@ def test_get_comtrade_api_key_empty_raises(tmp_path):
             res.get_comtrade_api_key()
 
 
-@patch("materia_epd.resources.load_json_from_package")
-def test_get_location_data(mock_load):
-    mock_load.return_value = {"name": "Luxembourg"}
-    result = res.get_location_data("LU")
-    assert result == {"name": "Luxembourg"}
-    mock_load.assert_called_once_with("locations", "LU.json")
+def test_get_location_data(monkeypatch):
+    bundle = {"locations": {"LUX": {"Name": "Luxembourg"}}}
+    monkeypatch.setattr(res, "get_geo_bundle", lambda: bundle)
+    assert res.get_location_data("LUX") == {"Name": "Luxembourg"}
+    with pytest.raises(ValueError, match="locations/LU.json"):
+        res.get_location_data("LU")
+
+
+def test_get_geo_bundle_reads_the_shipped_file_or_builds_it(monkeypatch):
+    bundle = res.get_geo_bundle()
+    assert bundle["version"] == res.GEO_BUNDLE_VERSION
+    assert bundle["aliases"]["UK"] == "GBR"
+    assert bundle["locations"]["LUX"]["Parent"] == "Western Europe"
+    assert bundle["regions"]["RER"] == {"Regions": "Europe"}
+
+    res.get_geo_bundle.cache_clear()
+    monkeypatch.setattr(res, "GEO_BUNDLE_FILENAME", "missing.json")
+    assert res.get_geo_bundle() == bundle
+
+
+def test_get_market_shares_caches_each_market_until_invalidated(monkeypatch):
+    loads = []
+    monkeypatch.setattr(
+        res, "_load_market_shares", lambda loc, hs: loads.append((loc, hs)) or {hs: 1}
+    )
+    for hs in ("0101", "0202", "0101", "0202"):
+        assert res.get_market_shares("LU", hs) == {hs: 1}
+    assert loads == [("LU", "0101"), ("LU", "0202")]
+    info = res.get_market_shares.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (2, 2, 2)
+
+    assert res.invalidate_market_shares("LU", "0101") is True
+    assert res.invalidate_market_shares("LU", "0101") is False
+    res.get_market_shares("LU", "0101")
+    res.get_market_shares("LU", "0202")
+    assert loads[2:] == [("LU", "0101")]
+
+    monkeypatch.setattr(res.MARKET_CACHE, "maxsize", 1)  # keeps 0202 only
+    res.get_market_shares("LU", "0202")
+    res.get_market_shares("LU", "0101")
+    assert loads[3:] == [("LU", "0101")]
+
+
+def test_market_shares_file_prefers_package_data_then_user_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(res, "USER_DATA_DIR", tmp_path)
+    assert res.market_shares_file("LUX", "0101").name == "0101.json"
+    assert res.market_shares_file("XXX", "0000") is None
+
+    user_file = tmp_path / "market_shares" / "XXX" / "0000.json"
+    user_file.parent.mkdir(parents=True)
+    user_file.write_text("{}")
+    assert res.market_shares_file("XXX", "0000") == user_file
@@ -0,0 +1,141 @@
+# tests/unit/test_server.py
+import http.client
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from conftest import EPD_SPECS, _uuid, ilcd_flow_xml, ilcd_process_xml
+from materia_epd import resources, server as mod
+from materia_epd.core.cache import LRUCache
+
+UUID_DE, UUID_FR, UUID_DE2 = (spec[0] for spec in EPD_SPECS)
+GEN_UUID, GEN_FLOW = _uuid("d"), _uuid("e")
+
+
+@pytest.fixture
+def service(ilcd_folder, tmp_path, monkeypatch):
+    calls = []
+
+    def fake_load_market_shares(loc, hs_code):
+        calls.append((loc, hs_code))
+        return {"DEU": 0.5, "FRA": 0.5}
+
+    monkeypatch.setattr(resources, "_load_market_shares", fake_load_market_shares)
+    monkeypatch.setattr(resources, "MARKET_CACHE", LRUCache())
+    monkeypatch.setattr(
+        resources, "market_shares_file", lambda loc, hs: tmp_path / "market.json"
+    )
+    gen = tmp_path / "gen"
+    (gen / "flows").mkdir(parents=True)
+    (gen / "flows" / f"{GEN_FLOW}.xml").write_text(ilcd_flow_xml(GEN_FLOW))
+    svc = mod.MateriaService(ilcd_folder, gen)
+    svc.market_calls = calls
+    return svc
+
+
+@pytest.fixture
+def url(service):
+    server = mod.MateriaHTTPServer(("127.0.0.1", 0), service)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+def _post(url, body):
+    data = body if isinstance(body, bytes) else json.dumps(body).encode()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data)) as resp:
+            return resp.status, json.load(resp)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def _payload(**extra):
+    return {
+        "process": ilcd_process_xml(GEN_UUID, GEN_FLOW),
+        "matches": {"uuids": [UUID_DE, UUID_FR]},
+        **extra,
+    }
+
+
+def test_aggregate_runs_the_pipeline_and_caches_markets(service):
+    result = service.aggregate(_payload(flow=ilcd_flow_xml(GEN_FLOW)))
+    assert result.uuid == GEN_UUID
+    assert result.used_epd_uuids == [UUID_DE, UUID_FR]
+    assert set(result.avg_gwps["Climate change-Total"]) == {"A1-A3", "C2"}
+    assert result.avg_properties
+
+    assert service.aggregate(_payload()) == result  # flow from gen_folder
+    assert service.market_calls == [("DEU", "6810")]
+
+
+def test_post_returns_json_results_and_errors(url, service):
+    with urllib.request.urlopen(url) as resp:
+        assert json.load(resp) == {"status": "ok"}
+
+    status, body = _post(url, _payload())
+    assert status == 200
+    assert body["uuid"] == GEN_UUID and body["used_epd_uuids"] == [UUID_DE, UUID_FR]
+
+    status, body = _post(url, _payload(matches={"uuids": ["unknown"]}))
+    assert status == 200 and body["avg_gwps"] is None
+
+    assert _post(url, b"not json")[0] == 400
+    assert _post(url, [1])[0] == 400
+    assert _post(url, {"matches": ["x"]})[0] == 400
+    assert _post(url, _payload(process="<broken"))[0] == 400
+
+    service.gen_folder = None
+    status, body = _post(url, _payload())
+    assert status == 400 and "reference flow" in body["error"]
+    status, body = _post(url, _payload(process="<processDataSet/>"))
+    assert status == 400 and "UUID" in body["error"]
+    status, body = _post(url, _payload(process="<a/>"))
+    assert status == 400 and "reference exchange" in body["error"]
+    assert _post(url, _payload(process=1))[0] == 400
+    assert _post(url, _payload(matches="x"))[0] == 400
+    assert _post(url, _payload(flow="<flowDataSet/>"))[0] == 400
+
+
+def test_post_survives_bad_headers_and_unexpected_errors(url, service, monkeypatch):
+    def post_raw(length):
+        conn = http.client.HTTPConnection(url.split("/")[2])
+        conn.putrequest("POST", "/")
+        conn.putheader("Content-Length", length)
+        conn.endheaders(b"{}")
+        resp = conn.getresponse()
+        status, body = resp.status, json.load(resp)
+        conn.close()
+        return status, body
+
+    assert post_raw("abc")[0] == 400
+    assert post_raw("-1")[0] == 400
+
+    def broken(payload):
+        raise KeyError("boom")
+
+    monkeypatch.setattr(service, "aggregate", broken)
+    status, body = _post(url, _payload())
+    assert status == 500 and body["error"] == "KeyError: 'boom'"
+
+
+def test_aggregate_refuses_markets_it_would_have_to_generate(service, monkeypatch):
+    monkeypatch.setattr(resources, "market_shares_file", lambda loc, hs: None)
+    with pytest.raises(ValueError, match="No market shares stored"):
+        service.aggregate(_payload())
+    assert service.market_calls == []
+
+
+def test_serve_stops_on_interrupt(service, monkeypatch, capsys):
+    def interrupt(self, *args):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(mod.MateriaHTTPServer, "serve_forever", interrupt)
+    mod.serve(service, "127.0.0.1", 0)
+    out = capsys.readouterr().out
+    assert "Serving on http://127.0.0.1:" in out and "Stopped serving" in out
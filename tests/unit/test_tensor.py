@@ -0,0 +1,187 @@
+# tests/unit/test_tensor.py
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from materia_epd.core.constants import LCIA_OUTPUT_MODULES
+from materia_epd.metrics import averaging as avg
+from materia_epd.metrics.tensor import LCIATensor
+from materia_epd.resources import get_indicator_synonyms
+
+GWP, FOSSIL = list(get_indicator_synonyms())[:2]
+
+
+def _results(values_by_indicator):
+    return [
+        {"name": name, "values": dict(zip(LCIA_OUTPUT_MODULES, values))}
+        for name, values in values_by_indicator
+    ]
+
+
+def test_from_results_builds_nan_padded_tensor():
+    tensor = LCIATensor.from_results(
+        [
+            _results([(GWP, [1.0, 2.0, None, None, None, 3.5])]),
+            [],
+            _results([(FOSSIL, [None] * 6), ("Other", [4.0])]),
+        ]
+    )
+    n_ind = len(get_indicator_synonyms()) + 1
+    assert tensor.values.shape == (3, n_ind, len(LCIA_OUTPUT_MODULES))
+    assert len(tensor) == 3
+    assert tensor.indicators["Other"] == n_ind - 1
+    assert tensor.values[0, tensor.indicators[GWP], 0] == 1.0
+    assert np.isnan(tensor.values[0, tensor.indicators[GWP], 2])
+    assert np.isnan(tensor.values[1]).all() and not tensor.present[1].any()
+    assert tensor.present[2, tensor.indicators[FOSSIL]]
+
+
+def test_average_matches_average_impacts():
+    results = [
+        _results([(GWP, [1.0, 2.0, None, 0.1, None, None])]),
+        _results([(GWP, [3.0, None, None, 0.2, None, None]), (FOSSIL, [None] * 6)]),
+    ]
+    tensor = LCIATensor.from_results(results)
+    means, present = tensor.average([0, 1])
+    expected = {r["name"]: r["values"] for r in avg.average_impacts(results)}
+
+    gwp = tensor.indicators[GWP]
+    assert {
+        mod: means[gwp, m]
+        for mod, m in tensor.modules.items()
+        if not np.isnan(means[gwp, m])
+    } == expected[GWP]
+    assert present[tensor.indicators[FOSSIL]] and expected[FOSSIL] == {}
+    assert np.isnan(tensor.average([])[0]).all()
+
+
+def _legacy(results, market, epds_by_country):
+    market_impacts = {
+        c: avg.average_impacts([results[i] for i in idx])
+        for c, idx in epds_by_country.items()
+    }
+    return avg.weighted_averages(market, market_impacts)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_weighted_average_is_identical_to_dict_based_averages(seed):
+    rng = random.Random(seed)
+    indicators = [GWP, FOSSIL, "Other"]
+
+    def value():
+        return rng.choice([None, rng.uniform(-5, 50), rng.uniform(0, 1e-3)])
+
+    results = []
+    for _ in range(rng.randint(1, 60)):
+        reported = rng.sample(indicators, rng.randint(0, 3))
+        if reported and rng.random() < 0.2:
+            reported.append(reported[0])  # same indicator reported twice
+        results.append(
+            _results([(ind, [value() for _ in range(6)]) for ind in reported])
+        )
+
+    countries = ["LU", "DE", "FR", "BE"]
+    market = {c: rng.random() for c in countries}
+    epds_by_country = {
+        c: sorted(rng.sample(range(len(results)), rng.randint(1, len(results))))
+        for c in countries[: rng.randint(1, 4)]
+    }
+
+    tensor = LCIATensor.from_results(results)
+    assert tensor.weighted_average(market, epds_by_country) == _legacy(
+        results, market, epds_by_country
+    )
+
+
+def test_weighted_average_without_market_overlap():
+    tensor = LCIATensor.from_results([_results([(GWP, [1.0] * 6)])])
+    assert tensor.weighted_average({"FR": 1.0}, {"DE": [0]}) == {}
+
+
+def _scaled(results, factor):
+    return [
+        {
+            "name": r["name"],
+            "values": {
+                m: v * factor if v is not None else None for m, v in r["values"].items()
+            },
+        }
+        for r in results
+    ]
+
+
+def test_take_matches_from_results_on_scaled_subset():
+    results = [
+        _results([(GWP, [1.0, 2.0, None, 0.1, None, None])]),
+        [],
+        _results([(GWP, [3.0] * 6), (GWP, [4.0] * 6), (FOSSIL, [0.5] * 6)]),
+        _results([(FOSSIL, [None, 7.0])]),
+    ]
+    picked, factors = [3, 2, 0], [2.0, 0.5, 3.0]
+    taken = LCIATensor.from_results(results).take(picked, factors)
+    expected = LCIATensor.from_results(
+        [_scaled(results[i], f) for i, f in zip(picked, factors)]
+    )
+    np.testing.assert_array_equal(taken.values, expected.values)
+    np.testing.assert_array_equal(taken.present, expected.present)
+    np.testing.assert_array_equal(taken.owner, expected.owner)
+    assert len(taken) == 3
+
+
+def test_save_and_load_memory_map_the_arrays(tmp_path):
+    tensor = LCIATensor.from_results(
+        [_results([(GWP, [1.0] * 6)]), _results([("Other", [2.0])])]
+    )
+    first = tensor.save(tmp_path, ["a.xml", "b.xml"])
+    second = tensor.save(tmp_path, ["a.xml", "b.xml"])
+    token = tensor.save(tmp_path, ["a.xml", "b.xml"])
+    assert len({first, second, token}) == 3
+    assert sorted(p.name for p in tmp_path.glob("*.npy")) == sorted(
+        f"{name}-{t}.npy"
+        for name in ("owner", "present", "values")
+        for t in (second, token)
+    )
+
+    loaded, keys = LCIATensor.load(tmp_path)
+    assert keys == ["a.xml", "b.xml"]
+    assert isinstance(loaded.values, np.memmap)
+    assert loaded.indicators == tensor.indicators
+    np.testing.assert_array_equal(loaded.values, tensor.values)
+    assert loaded.take([1]).indicators["Other"] == tensor.indicators["Other"]
+
+    with pytest.raises(FileNotFoundError):
+        LCIATensor.load(tmp_path / "missing")
+
+
+def test_save_ignores_arrays_it_cannot_delete(tmp_path, monkeypatch):
+    tensor = LCIATensor.from_results([_results([(GWP, [1.0] * 6)])])
+    first = tensor.save(tmp_path)
+    tensor.save(tmp_path)
+
+    def locked(self, missing_ok=False):
+        raise PermissionError(f"{self.name} is mapped")
+
+    monkeypatch.setattr(Path, "unlink", locked)
+    tensor.save(tmp_path)
+    assert len(list(tmp_path.glob(f"*-{first}.npy"))) == 3
+
+
+def test_load_rereads_meta_when_arrays_vanish(tmp_path, monkeypatch):
+    tensor = LCIATensor.from_results([_results([(GWP, [1.0] * 6)])])
+    tensor.save(tmp_path, ["a.xml"])
+    real_load = np.load
+    calls = []
+
+    def racing_load(path, *args, **kwargs):
+        if not calls:
+            calls.append(path)
+            tensor.save(tmp_path, ["b.xml"])
+            tensor.save(tmp_path, ["b.xml"])
+        return real_load(path, *args, **kwargs)
+
+    monkeypatch.setattr(np, "load", racing_load)
+    loaded, keys = LCIATensor.load(tmp_path)
+    assert keys == ["b.xml"]
+    np.testing.assert_array_equal(loaded.values, tensor.values)
@@ -0,0 +1,149 @@
+# tests/unit/test_watch.py
+import json
+import os
+
+import pytest
+
+from conftest import EPD_SPECS, _uuid, ilcd_flow_xml, ilcd_process_xml
+from materia_epd.epd import watch as mod
+from materia_epd.epd.index import EPDIndex
+
+UUID_DE, UUID_FR = EPD_SPECS[0][0], EPD_SPECS[1][0]
+FLOW_FR = EPD_SPECS[1][1]
+G1, G2, GF1, GF2 = _uuid("d"), _uuid("e"), _uuid("f"), _uuid("0")
+
+
+def _bump(path, content=None):
+    if content is not None:
+        path.write_text(content, encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+@pytest.fixture
+def gen_folder(tmp_path):
+    """Two generic processes matched to the German and French EPDs."""
+    gen = tmp_path / "gen"
+    for sub in ("processes", "flows", "matches"):
+        (gen / sub).mkdir(parents=True)
+    for uuid, flow_uuid, epd_uuid in ((G1, GF1, UUID_DE), (G2, GF2, UUID_FR)):
+        (gen / "processes" / f"{uuid}.xml").write_text(
+            ilcd_process_xml(uuid, flow_uuid), encoding="utf-8"
+        )
+        (gen / "flows" / f"{flow_uuid}.xml").write_text(
+            ilcd_flow_xml(flow_uuid), encoding="utf-8"
+        )
+        (gen / "matches" / f"{uuid}.json").write_text(
+            json.dumps({"uuids": [epd_uuid]}), encoding="utf-8"
+        )
+    return gen
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    calls = []
+    monkeypatch.setattr(mod, "run_materia", lambda *a, **kw: calls.append(kw))
+    return calls
+
+
+def test_poll_recomputes_only_what_a_change_affects(
+    gen_folder, ilcd_folder, tmp_path, runs
+):
+    watcher = mod.Watcher(gen_folder, ilcd_folder, tmp_path / "out")
+    assert watcher.poll() == set() and runs == []
+
+    processes = ilcd_folder / "processes"
+    _bump(processes / f"{UUID_DE}.xml")
+    assert watcher.poll() == {G1}
+    assert runs[-1]["uuids"] == {G1} and runs[-1]["force"]
+    assert runs[-1]["corpus"] is watcher.corpus
+
+    _bump(gen_folder / "matches" / f"{G2}.json")
+    assert watcher.poll() == {G2}
+
+    _bump(gen_folder / "flows" / f"{GF1}.xml")
+    assert watcher.poll() == {G1}
+
+    _bump(gen_folder / "processes" / f"{G2}.xml")
+    assert watcher.poll() == {G2}
+
+    (record,) = [r for r in watcher.corpus.epds if r.uuid == UUID_FR]
+    _bump(ilcd_folder / "flows" / f"{FLOW_FR}.xml", ilcd_flow_xml(FLOW_FR, 9.0))
+    assert watcher.poll() == {G2}
+    assert record.path not in watcher.corpus._parsed
+
+    (processes / f"{UUID_DE}.xml").unlink()
+    assert watcher.poll() == {G1}
+    assert UUID_DE not in watcher.corpus.files
+
+
+def test_poll_refreshes_an_index(gen_folder, ilcd_folder, tmp_path, runs):
+    EPDIndex.build(ilcd_folder).close()
+    watcher = mod.Watcher(gen_folder, ilcd_folder, tmp_path / "out")
+    assert isinstance(watcher.corpus, EPDIndex)
+
+    flow = ilcd_folder / "flows" / f"{FLOW_FR}.xml"
+    _bump(flow, ilcd_flow_xml(FLOW_FR, density=9.0))
+    assert watcher.poll() == {G2}
+    (record,) = watcher.corpus.records(uuids=[UUID_FR])
+    assert record.material_kwargs["gross_density"] == 9.0
+
+    _bump(
+        ilcd_folder / "processes" / f"{UUID_DE}.xml",
+        ilcd_process_xml(UUID_DE, EPD_SPECS[0][1], loc="FR"),
+    )
+    assert watcher.poll() == {G1}
+    watcher.corpus.close()
+
+
+def test_failed_polls_are_reported_and_retried(
+    gen_folder, ilcd_folder, tmp_path, monkeypatch, capsys
+):
+    calls = []
+
+    def run_materia(*args, **kwargs):
+        calls.append(kwargs["uuids"])
+        if len(calls) == 1:
+            raise ValueError("half-saved file")
+
+    monkeypatch.setattr(mod, "run_materia", run_materia)
+    watcher = mod.Watcher(gen_folder, ilcd_folder, tmp_path / "out")
+
+    _bump(gen_folder / "matches" / f"{G1}.json")
+    assert watcher.poll() == set()
+    assert "ValueError: half-saved file" in capsys.readouterr().out
+    assert watcher.poll() == set() and len(calls) == 1  # no change, no retry
+
+    _bump(gen_folder / "matches" / f"{G2}.json")
+    assert watcher.poll() == {G1, G2}
+    assert calls[-1] == {G1, G2} and watcher.pending == set()
+
+    def broken_refresh(*args):
+        raise OSError("locked")
+
+    monkeypatch.setattr(watcher.corpus, "refresh", broken_refresh)
+    _bump(ilcd_folder / "processes" / f"{UUID_DE}.xml")
+    assert watcher.poll() == set()
+    assert "Error reading changes: locked" in capsys.readouterr().out
+    monkeypatch.undo()
+    monkeypatch.setattr(mod, "run_materia", run_materia)
+    assert watcher.poll() == {G1}
+
+
+def test_watch_runs_once_then_polls_until_interrupted(
+    gen_folder, ilcd_folder, tmp_path, runs, monkeypatch, capsys
+):
+    watcher = mod.Watcher(gen_folder, ilcd_folder, tmp_path / "out")
+    polls = []
+    monkeypatch.setattr(watcher, "poll", lambda: polls.append(1))
+    monkeypatch.setattr(mod.time, "sleep", lambda s: None)
+    watcher.watch(interval=0.5, polls=2)
+    assert len(runs) == 1 and len(polls) == 2
+    assert "every 0.5s" in capsys.readouterr().out
+
+    def interrupt(seconds):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(mod.time, "sleep", interrupt)
+    watcher.watch()
+    assert "Stopped watching" in capsys.readouterr().out
@@ -0,0 +1,76 @@
+# tests/unit/test_xml_backend.py
+import io
+
+import pytest
+
+from conftest import EPD_SPECS, ilcd_process_xml
+from materia_epd.core.cache import LRUCache
+from materia_epd.core.constants import NS, XP
+from materia_epd.epd import extract
+from materia_epd.io import xml_backend as mod
+
+UUID, FLOW_UUID = EPD_SPECS[0][:2]
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """Switch the XML backend for one test only."""
+
+    def use(name):
+        if name == "lxml":
+            pytest.importorskip("lxml")
+        monkeypatch.setattr(mod, "_backend", mod.get_backend())
+        mod.set_backend(name)
+
+    return use
+
+
+def test_set_backend_rejects_unknown_and_missing_backends(monkeypatch):
+    with pytest.raises(ValueError, match="Unknown XML backend"):
+        mod.set_backend("expat")
+    monkeypatch.setattr(mod, "lxml_etree", None)
+    with pytest.raises(ImportError, match="lxml"):
+        mod.set_backend("lxml")
+
+
+@pytest.mark.parametrize("name", mod.BACKENDS)
+def test_lookups_behave_like_elementtree(backend, name):
+    backend(name)
+    root = mod.fromstring(ilcd_process_xml(UUID, FLOW_UUID).encode())
+
+    assert mod.find(root, XP.UUID, NS).text == UUID
+    assert mod.find(root, ".//common:missing", NS) is None
+    assert len(mod.findall(root, XP.LCIA_RESULT, NS)) == 2
+    assert mod.findall(root, ".//common:missing", NS) == []
+    assert mod.findtext(root, XP.QUANT_REF, namespaces=NS) == "1"
+    assert mod.findtext(root, ".//common:missing", "-", NS) == "-"
+    empty = mod.find(root, XP.LOCATION, NS)
+    assert mod.findtext(empty, ".", namespaces=NS) == ""
+
+
+def test_both_backends_extract_identical_records_and_flows(backend, ilcd_folder):
+    backend("lxml")
+    outputs = {}
+    for name in mod.BACKENDS:
+        mod.set_backend(name)
+        flows = extract.FolderFlows(ilcd_folder / "flows", cache=LRUCache())
+        paths = sorted((ilcd_folder / "processes").glob("*.xml"))
+        outputs[name] = (
+            extract.extract_records(paths, flows),
+            [flows.get(spec[1]) for spec in EPD_SPECS],
+        )
+    assert outputs["lxml"] == outputs["stdlib"]
+    assert outputs["lxml"][0][0].material_kwargs is not None
+
+
+@pytest.mark.parametrize("name", mod.BACKENDS)
+def test_parse_errors_are_reported_for_both_backends(backend, name, tmp_path):
+    backend(name)
+    broken = tmp_path / "broken.xml"
+    broken.write_text("<process>", encoding="utf-8")
+    with pytest.raises(mod.PARSE_ERRORS):
+        mod.parse(str(broken))
+    with pytest.raises(mod.PARSE_ERRORS):
+        extract.extract_record("p.xml", {}, io.BytesIO(b"<process>"))
+    (result,) = extract.extract_records([broken], {})
+    assert isinstance(result, extract.ET.ParseError)